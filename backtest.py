@@ -0,0 +1,403 @@
+"""
+Vectorized backtester for the towesif.py strategies.
+
+Replays long M1 histories (one file per pair) through RSI, ZIGZAG,
+COLOR_PATTERN and EMA at every bar (ZIGZAG as one linear pass of the
+same incremental pivot engine), the way the live bot sees them:
+a window of the last WINDOW closed bars, trade on the bar after the
+running one, one MTG1 step on loss. Like live, a pair is busy until its
+trade (and MTG step) resolves, and windows with missing bars give no
+signal.
+
+    python backtest.py history/ --strategies all --window 59
+
+History files: <PAIR>.csv (time,open,high,low,close) or <PAIR>.json
+(the /otcx.php payload: {"data": [{"time","open","high","low","close"}]}),
+or the bots' candle archive (candles.db) instead of a directory.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from candle_archive import CandleArchive
+from indicators import ZigZag
+
+ALL_STRATS = ["RSI", "ZIGZAG", "COLOR_PATTERN", "EMA"]
+
+# towesif.py defaults
+RSI_PERIOD = 3
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+RSI_MAX_PERIOD = 3
+ZIGZAG_DEPTH = 20
+ZIGZAG_DEVIATION = 20
+ZIGZAG_BACKSTEP = 20
+EMA_PERIOD = 20
+EMA_TREND_FILTER = True
+WINDOW = 59                  # closed bars seen by generate_signal_for_asset (60 fetched - running)
+
+# outcome codes
+NONE, WIN0, WIN1, LOSS, UNRESOLVED = 0, 1, 2, 3, 4
+
+
+# =============== History Loading ===============
+def _norm_time(s: str) -> str:
+    s = s.replace("T", " ").split(".")[0]
+    return s[:16].replace(" ", "T")             # 'YYYY-MM-DDTHH:MM'
+
+
+def load_history(path: str):
+    """Return (t, o, h, l, c): epoch minutes (int64) and OHLC (float64), sorted, deduped."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)["data"]
+        times = [r["time"] for r in rows]
+        ohlc = [(r["open"], r["high"], r["low"], r["close"]) for r in rows]
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        times = [r["time"] for r in rows]
+        ohlc = [(r["open"], r["high"], r["low"], r["close"]) for r in rows]
+
+    t = np.array([_norm_time(s) for s in times], dtype="datetime64[m]").astype(np.int64)
+    a = np.array(ohlc, dtype=np.float64).reshape(-1, 4)
+    # keep the last row per minute, oldest first
+    order = np.argsort(t, kind="stable")
+    t, a = t[order], a[order]
+    keep = np.ones(len(t), dtype=bool)
+    keep[:-1] = t[1:] != t[:-1]
+    t, a = t[keep], a[keep]
+    return t, a[:, 0].copy(), a[:, 1].copy(), a[:, 2].copy(), a[:, 3].copy()
+
+
+def load_archive(path: str, pairs=None):
+    archive = CandleArchive(path)
+    data = {}
+    for pair in archive.pairs():
+        if pairs and pair not in pairs:
+            continue
+        s = archive.load(pair)
+        data[pair] = (np.frombuffer(s.t, dtype=np.int64).copy(),
+                      *(np.frombuffer(col, dtype=np.float64).copy() for col in (s.o, s.h, s.l, s.c)))
+    archive.close()
+    return data
+
+
+def load_dir(path: str, pairs=None):
+    if path.endswith(".db"):
+        return load_archive(path, pairs)
+    data = {}
+    for fn in sorted(glob.glob(os.path.join(path, "*.csv")) + glob.glob(os.path.join(path, "*.json"))):
+        pair = os.path.splitext(os.path.basename(fn))[0]
+        if pairs and pair not in pairs:
+            continue
+        data[pair] = load_history(fn)
+    return data
+
+
+# =============== Vectorized Strategies ===============
+# Each returns int8 per bar e (signal using bars up to and including e):
+# +1 CALL, -1 PUT, 0 none. Bars without a full window are 0.
+
+def _shift(x, n, fill=np.nan):
+    out = np.full_like(x, fill)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+
+def direction(o, c):
+    return np.sign(c - o).astype(np.int8)
+
+
+def rsi_signals(c, window=WINDOW, period=RSI_PERIOD, max_period=RSI_MAX_PERIOD,
+                oversold=RSI_OVERSOLD, overbought=RSI_OVERBOUGHT):
+    n = len(c)
+    sig = np.zeros(n, dtype=np.int8)
+    if window < period + max_period:
+        return sig
+    diff = c - _shift(c, 1)
+    gain = np.maximum(diff, 0.0)
+    loss = np.abs(np.minimum(diff, 0.0))
+    # same summation order as rsi_series: newest diff first
+    g_sum = gain.copy()
+    l_sum = loss.copy()
+    for lag in range(1, period):
+        g_sum = g_sum + _shift(gain, lag)
+        l_sum = l_sum + _shift(loss, lag)
+    avg_gain = g_sum / period
+    avg_loss = l_sum / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+    rsi[np.isnan(avg_gain) | np.isnan(avg_loss)] = np.nan
+
+    decided = np.zeros(n, dtype=bool)
+    for back in range(max_period):
+        r = _shift(rsi, back)
+        call = ~decided & (r < oversold)
+        put = ~decided & ~call & (r > overbought)
+        sig[call] = 1
+        sig[put] = -1
+        decided |= call | put
+    sig[:window - 1] = 0
+    return sig
+
+
+def zigzag_signals(h, l, c, window=WINDOW, depth=ZIGZAG_DEPTH,
+                   deviation=ZIGZAG_DEVIATION, backstep=ZIGZAG_BACKSTEP):
+    """
+    One linear pass of indicators.ZigZag over the whole history (like the
+    live bot's per-asset state): signal at bar e when bar e-1 is a swing
+    point and close[e] turned away from close[e-1].
+    """
+    n = len(c)
+    sig = np.zeros(n, dtype=np.int8)
+    if window < depth + backstep or n < max(depth, 2):
+        return sig
+    zz = ZigZag(depth, deviation, backstep, keep=2)
+    for e, (high, low) in enumerate(zip(h.tolist(), l.tolist())):
+        zz.update(high, low)
+        if e < window - 1:
+            continue
+        kinds = [kind for i, kind, _ in zz.recent(2) if i == e - 1]
+        if "H" in kinds and c[e] < c[e - 1]:
+            sig[e] = -1
+        elif "L" in kinds and c[e] > c[e - 1]:
+            sig[e] = 1
+    return sig
+
+
+def color_pattern_signals(o, c, window=WINDOW):
+    n = len(c)
+    sig = np.zeros(n, dtype=np.int8)
+    if window < 4:
+        return sig
+    d = direction(o, c).astype(np.int16)
+    d1, d2, d3 = (_shift(d, k, 0) for k in (1, 2, 3))
+    # [RED, GREEN, RED, GREEN] -> PUT ; [GREEN, RED, GREEN, RED] -> CALL
+    sig[(d3 == -1) & (d2 == 1) & (d1 == -1) & (d == 1)] = -1
+    sig[(d3 == 1) & (d2 == -1) & (d1 == 1) & (d == -1)] = 1
+    sig[:window - 1] = 0
+    return sig
+
+
+def ema_signals(o, c, window=WINDOW, period=EMA_PERIOD, trend_filter=EMA_TREND_FILTER):
+    """EMA re-seeded on every window like calculate_ema_trend; folds all windows at once."""
+    n = len(c)
+    sig = np.zeros(n, dtype=np.int8)
+    if window < period + 1 or n < window:
+        return sig
+    X = sliding_window_view(c, window)           # row r = bars r .. r+window-1
+    k = 2 / (period + 1)
+    seed = X[:, 0] + 0.0
+    for j in range(1, period):
+        seed = seed + X[:, j]
+    ema = seed / period
+    prev = ema
+    for j in range(period, window):
+        prev = ema
+        ema = (X[:, j] - ema) * k + ema
+    trend = np.where(ema > prev, 1, np.where(ema < prev, -1, 0)).astype(np.int8)
+
+    d = direction(o, c)[window - 1:]
+    out = np.where(d != 0, d, 0).astype(np.int8)
+    out[trend == 0] = 0
+    if trend_filter:
+        out[(out == 1) & (trend == -1)] = 0
+        out[(out == -1) & (trend == 1)] = 0
+    sig[window - 1:] = out
+    return sig
+
+
+# =============== Outcome Resolution ===============
+def full_windows(t, window=WINDOW):
+    """True at bars e whose last `window` bars are consecutive minutes (no gap)."""
+    ok = np.zeros(len(t), dtype=bool)
+    if len(t) >= window:
+        ok[window - 1:] = t[window - 1:] - t[:len(t) - window + 1] == window - 1
+    return ok
+
+
+def resolve(t, o, c, sig, mtg=1):
+    """
+    Resolve signals like process_asset: signal after bar e closes, the
+    running bar e+1 is skipped, trade on bar e+2, MTG steps on e+3...
+    Missing bars (gaps) make the trade UNRESOLVED. One trade per pair
+    at a time: signals while the previous trade is running are dropped.
+    """
+    n = len(c)
+    out = np.zeros(n, dtype=np.int8)
+    has = sig != 0
+    d = direction(o, c)
+    pending = has.copy()
+    last_step = np.full(n, mtg, dtype=np.int64)    # step the trade ended on
+    for step in range(mtg + 1):
+        off = 2 + step
+        idx = np.arange(n) + off
+        ok_idx = idx < n
+        bar_dir = np.zeros(n, dtype=np.int8)
+        bar_dir[ok_idx] = d[idx[ok_idx]]
+        contiguous = np.zeros(n, dtype=bool)
+        contiguous[ok_idx] = t[idx[ok_idx]] == t[ok_idx] + off
+        missing = pending & ~contiguous
+        out[missing] = UNRESOLVED
+        pending &= contiguous
+        win = pending & (bar_dir == sig)
+        out[win] = WIN0 if step == 0 else WIN1
+        last_step[win] = step
+        pending &= ~win
+    out[pending] = LOSS
+    return gate_busy(out, last_step)
+
+
+def gate_busy(out, last_step):
+    """
+    Drop signals that come while the pair is busy, like the live bots
+    (and simulate_zz.gated_trades): after a signal at bar e the next one
+    can come from bar e+3+step on, step being the MTG step it ended on.
+    """
+    free_from = 0
+    for e in np.flatnonzero(out).tolist():
+        if e < free_from:
+            out[e] = NONE
+        else:
+            free_from = e + 3 + int(last_step[e])
+    return out
+
+
+# =============== Runner / Report ===============
+def evaluate_pair(t, o, h, l, c, strategies, args):
+    sigs = {}
+    if "RSI" in strategies:
+        sigs["RSI"] = rsi_signals(c, args.window)
+    if "ZIGZAG" in strategies:
+        sigs["ZIGZAG"] = zigzag_signals(h, l, c, args.window, args.zz_depth, args.zz_dev, args.zz_back)
+    if "COLOR_PATTERN" in strategies:
+        sigs["COLOR_PATTERN"] = color_pattern_signals(o, c, args.window)
+    if "EMA" in strategies:
+        sigs["EMA"] = ema_signals(o, c, args.window, args.ema_period)
+    ok = full_windows(t, args.window)
+    for s in sigs.values():
+        s[~ok] = 0
+    if args.select and sigs:
+        sigs[f"SELECT:{args.select}"] = select_signals(sigs, args.select, args.weights)
+    return {name: resolve(t, o, c, s, args.mtg) for name, s in sigs.items()}
+
+
+def select_signals(sigs, mode, weights=None):
+    """
+    One signal per bar from all strategies' votes, like StrategyEngine.select:
+    priority = first voter in ALL_STRATS order, majority / weighted = side
+    with more (weighted) votes, a tie is no signal.
+    """
+    names = [s for s in ALL_STRATS if s in sigs]
+    if mode == "priority":
+        out = np.zeros_like(sigs[names[0]])
+        for name in reversed(names):
+            s = sigs[name]
+            out[s != 0] = s[s != 0]
+        return out
+    score = np.zeros(len(sigs[names[0]]), dtype=np.float64)
+    for name in names:
+        w = (weights or {}).get(name, 1.0) if mode == "weighted" else 1.0
+        score += w * sigs[name]
+    return np.sign(score).astype(np.int8)
+
+
+def parse_weights(s: str) -> dict:
+    """'RSI=2,EMA=0.5' -> {'RSI': 2.0, 'EMA': 0.5}"""
+    out = {}
+    for item in filter(None, (x.strip() for x in s.split(","))):
+        name, _, w = item.partition("=")
+        out[name.strip().upper()] = float(w)
+    return out
+
+
+def tally(outcomes):
+    w0 = int(np.count_nonzero(outcomes == WIN0))
+    w1 = int(np.count_nonzero(outcomes == WIN1))
+    ls = int(np.count_nonzero(outcomes == LOSS))
+    un = int(np.count_nonzero(outcomes == UNRESOLVED))
+    total = w0 + w1 + ls
+    return {
+        "signals": total, "win_nonmtg": w0, "win_mtg1": w1, "loss": ls, "unresolved": un,
+        "wr_nonmtg": round(w0 / total * 100, 1) if total else 0.0,
+        "wr_mtg": round((w0 + w1) / total * 100, 1) if total else 0.0,
+    }
+
+
+def _row(label, s):
+    return (f"{label:<28} {s['signals']:>8} {s['win_nonmtg']:>8} {s['win_mtg1']:>8} "
+            f"{s['loss']:>8} {s['wr_nonmtg']:>7}% {s['wr_mtg']:>7}%")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest towesif.py strategies on M1 history")
+    ap.add_argument("history", help="directory with <PAIR>.csv / <PAIR>.json files, or candles.db")
+    ap.add_argument("--pairs", default="", help="comma separated subset of pairs")
+    ap.add_argument("--strategies", default="all", help="comma list or 'all' [RSI,ZIGZAG,COLOR_PATTERN,EMA]")
+    ap.add_argument("--window", type=int, default=WINDOW)
+    ap.add_argument("--mtg", type=int, default=1, help="MTG steps after the first trade (live: 1)")
+    ap.add_argument("--zz-depth", type=int, default=ZIGZAG_DEPTH)
+    ap.add_argument("--zz-dev", type=float, default=ZIGZAG_DEVIATION)
+    ap.add_argument("--zz-back", type=int, default=ZIGZAG_BACKSTEP)
+    ap.add_argument("--ema-period", type=int, default=EMA_PERIOD)
+    ap.add_argument("--select", choices=["priority", "majority", "weighted"],
+                    help="also backtest the combined signal picked from all strategies' votes")
+    ap.add_argument("--weights", type=parse_weights, default={}, help="--select weighted: e.g. RSI=2,EMA=0.5")
+    ap.add_argument("--json", help="also write the report as JSON here")
+    args = ap.parse_args()
+
+    strategies = ALL_STRATS if args.strategies.lower() in ("all", "a", "") else \
+        [s.strip().upper() for s in args.strategies.split(",") if s.strip().upper() in ALL_STRATS]
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+
+    t0 = time.perf_counter()
+    data = load_dir(args.history, pairs)
+    t1 = time.perf_counter()
+
+    per_pair = {}
+    per_strat = {s: [] for s in strategies}
+    if args.select:
+        per_strat[f"SELECT:{args.select}"] = []
+    bars = 0
+    for pair, (t, o, h, l, c) in data.items():
+        bars += len(t)
+        res = evaluate_pair(t, o, h, l, c, strategies, args)
+        per_pair[pair] = {name: tally(out) for name, out in res.items()}
+        for name, out in res.items():
+            per_strat[name].append(out)
+    t2 = time.perf_counter()
+
+    report = {
+        "pairs": len(data), "bars": bars,
+        "load_s": round(t1 - t0, 3), "eval_s": round(t2 - t1, 3),
+        "per_strategy": {s: tally(np.concatenate(v)) if v else tally(np.zeros(0, np.int8))
+                         for s, v in per_strat.items()},
+        "per_pair": per_pair,
+    }
+
+    header = f"{'':<28} {'signals':>8} {'win':>8} {'win mtg1':>8} {'loss':>8} {'non-mtg':>8} {'w/ mtg':>8}"
+    print(f"{report['pairs']} pairs, {bars} bars | load {report['load_s']}s, eval {report['eval_s']}s")
+    print(header)
+    for s, st in report["per_strategy"].items():
+        print(_row(s, st))
+    print()
+    print(header)
+    for pair, by in per_pair.items():
+        for s, st in by.items():
+            print(_row(f"{pair} / {s}", st))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Micro-benchmarks for the bots' hot paths (no network, no prompts).
+
+    python bench.py                      # run, compare with bench_baseline.json
+    python bench.py --save               # run and store as the new baseline
+    python bench.py --only rsi,zigzag    # subset (substring match)
+    python bench.py record PAIR1,PAIR2   # record real /otcx.php bodies to replay
+
+The bot modules are executed from source with their input() prompts
+answered, the expiry exit() disabled and the archive created in a temp
+dir; FEED is swapped for a replay feed over the recorded payloads.
+Payloads are synthetic (fake_otc, fixed minutes) unless --payloads is
+given. Bar times are re-labelled to end at the current minute so
+only_closed() sees a running bar like it does live.
+
+Each case reports the best per-call time over --repeat rounds. With a
+baseline present, cases slower than baseline * (1 + --threshold) are
+flagged and the exit code is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+import pytz
+
+import fake_otc
+from candle_series import epoch_minute, now_minute
+from otc_client import parse_candles
+from trade_stats import TradeStats
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TIMEZONE = pytz.timezone("Asia/Dhaka")
+BASE_MINUTE = 29_000_000          # fixed synthetic data (2025-02-20)
+DEFAULT_PAIRS = ["EURUSD_otc", "GBPJPY_otc", "USDBRL_otc", "AUDCAD_otc"]
+
+
+# =============== Payloads ===============
+def synthetic_payloads(pairs, count: int = 60) -> dict:
+    """pair -> raw /otcx.php body built by fake_otc at fixed minutes."""
+    out = {}
+    for pair in pairs:
+        bars = [fake_otc.make_candle(pair, m) for m in range(BASE_MINUTE - count + 1, BASE_MINUTE)]
+        bars.append(fake_otc.make_candle(pair, BASE_MINUTE, 0.5))
+        out[pair] = json.dumps({"data": bars}).encode()
+    return out
+
+
+def rebase(body: bytes, end_minute: int) -> bytes:
+    """Re-label bar times so the last bar opens at end_minute (Dhaka time)."""
+    data = json.loads(body)
+    bars = data["data"]
+    for i, bar in enumerate(bars):
+        ts = datetime.datetime.fromtimestamp((end_minute - len(bars) + 1 + i) * 60, TIMEZONE)
+        bar["time"] = ts.strftime("%Y-%m-%dT%H:%M:%S.000") if i % 2 else ts.strftime("%Y-%m-%d %H:%M")
+    return json.dumps(data).encode()
+
+
+def load_payloads(path):
+    with open(path) as f:
+        return {pair: body.encode() for pair, body in json.load(f).items()}
+
+
+def record(pairs, path, count: int = 60):
+    import requests
+    url = os.environ.get("OTC_API_URL", "https://freegiveway.net/otcx.php")
+    out = {}
+    for pair in pairs:
+        r = requests.get(url, params={"pair": pair, "count": count}, timeout=15)
+        r.raise_for_status()
+        out[pair] = r.text
+        print(f"recorded {pair}: {len(r.content)} bytes")
+    with open(path, "w") as f:
+        json.dump(out, f)
+
+
+class ReplayFeed:
+    """Stands in for CandleFeed.candles() over pre-parsed series."""
+
+    def __init__(self, series: dict):
+        self.series = series
+
+    async def candles(self, asset: str, count: int = 60):
+        return self.series[asset].tail(count)
+
+    def now_minute(self) -> int:
+        return now_minute()
+
+
+# =============== Bot Loading ===============
+def load_bot(name: str, answers) -> dict:
+    """Execute <name>.py as a module namespace without prompts or side effects."""
+    path = os.path.join(HERE, f"{name}.py")
+    with open(path, encoding="utf-8") as f:
+        code = compile(f.read(), path, "exec")
+    it = iter(answers)
+    ns = {
+        "__name__": f"bench_{name}",
+        "__file__": path,
+        "input": lambda prompt="": next(it),
+        "exit": lambda *a: None,
+    }
+    cwd = os.getcwd()
+    sys.path.insert(0, HERE)
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        try:
+            os.chdir(tmp)
+            with contextlib.redirect_stdout(io.StringIO()):
+                exec(code, ns)
+            if ns.get("ARCHIVE") is not None:
+                ns["ARCHIVE"].close()
+        finally:
+            os.chdir(cwd)
+    return ns
+
+
+def trade_history(pairs, n: int = 200):
+    rng = random.Random(7)
+    start = datetime.datetime(2025, 2, 20, 9, 0)
+    return [{
+        "time": (start + datetime.timedelta(minutes=3 * i)).strftime("%H:%M"),
+        "asset": rng.choice(pairs),
+        "dir": rng.choice(["CALL", "PUT"]),
+        "outcome": "WIN" if rng.random() < 0.6 else "LOSS",
+    } for i in range(n)]
+
+
+# =============== Cases ===============
+def build_cases(payloads: dict) -> dict:
+    pairs = list(payloads)
+    now_min = int(time.time() // 60)
+    live = {p: rebase(b, now_min) for p, b in payloads.items()}
+    series = {p: parse_candles(p, b, TIMEZONE) for p, b in live.items()}
+    asset = pairs[0]
+    raw = series[asset]
+    closed = raw[:len(raw) - 1]
+    time_str = json.loads(live[asset])["data"][-2]["time"]
+    history = trade_history(pairs)
+    signal_time = datetime.datetime.now(TIMEZONE)
+
+    tw = load_bot("towesif", ["TOKEN", "1", "@bench", ",".join(pairs), "all", "", "", ""])
+    zz = load_bot("zz", ["BENCH", "TOKEN", "1", "@bench", ",".join(pairs), "1"])
+    for ns in (tw, zz):
+        ns["FEED"] = ReplayFeed(series)
+        ns["STATS"] = TradeStats()
+        for trade in history:
+            ns["STATS"].add(trade)
+    zz_depth, zz_dev, zz_back = tw["ZIGZAG_DEPTH"], tw["ZIGZAG_DEVIATION"], tw["ZIGZAG_BACKSTEP"]
+    enabled = tw["ENABLED_STRATS"]
+
+    loop = asyncio.new_event_loop()
+
+    def run_async(fn, *args):
+        return lambda: loop.run_until_complete(fn(*args))
+
+    ind = tw["indicators_for"](asset).sync(closed)
+
+    def choose():
+        random.seed(1)
+        return tw["choose_strategy"](asset, closed, enabled, ind)
+
+    return {
+        "parse_candles":            lambda: parse_candles(asset, live[asset], TIMEZONE),
+        "epoch_minute":             lambda: epoch_minute(time_str, TIMEZONE),
+        "towesif.only_closed":      lambda: tw["only_closed"](raw),
+        "zz.only_closed":           lambda: zz["only_closed"](raw),
+        "towesif.rsi_strategy":     lambda: tw["rsi_strategy"](closed),
+        "towesif.zigzag_strategy":  lambda: tw["zigzag_strategy"](closed, zz_depth, zz_dev, zz_back, ind),
+        "towesif.color_pattern":    lambda: tw["color_pattern_strategy"](closed),
+        "towesif.ema_strategy":     lambda: tw["ema_strategy"](closed),
+        "towesif.choose_strategy":  choose,
+        "zz.generate_3candle":      run_async(zz["generate_3candle_signal"], asset),
+        "towesif.format_result":    lambda: tw["format_result"](asset, signal_time, "CALL", "WIN", "@bench", 1),
+        "towesif.format_summary":   lambda: tw["format_summary"](),
+        "zz.format_result":         lambda: zz["format_result"](asset, signal_time, "CALL", "WIN", "@bench", 1),
+        "zz.format_summary":        lambda: zz["format_summary"](),
+        "zz.to_mono":               lambda: zz["to_mono"]("12:34 ╏ EURUSD_otc ╏ CALL  ✅"),
+        "towesif.log_info":         lambda: tw["info"](f"📊 Processing {asset}... (fetched in 12 ms)"),
+    }
+
+
+def measure(fn, repeat: int, min_time: float) -> float:
+    """Best per-call time in microseconds."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+# =============== Main ===============
+def main():
+    ap = argparse.ArgumentParser(description="Hot path micro-benchmarks")
+    ap.add_argument("cmd", nargs="?", default="run", choices=["run", "record"])
+    ap.add_argument("pairs", nargs="?", help="record: comma separated pairs")
+    ap.add_argument("--payloads", help="recorded payload JSON (pair -> body)")
+    ap.add_argument("--baseline", default=os.path.join(HERE, "bench_baseline.json"))
+    ap.add_argument("--save", action="store_true", help="store results as the baseline")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    ap.add_argument("--only", help="comma separated substrings of case names")
+    args = ap.parse_args()
+
+    if args.cmd == "record":
+        pairs = (args.pairs or ",".join(DEFAULT_PAIRS)).split(",")
+        record(pairs, args.payloads or os.path.join(HERE, "bench_payloads.json"))
+        return
+
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(DEFAULT_PAIRS)
+    cases = build_cases(payloads)
+    if args.only:
+        keys = args.only.split(",")
+        cases = {k: v for k, v in cases.items() if any(s in k for s in keys)}
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results, regressions = {}, []
+    sink = io.StringIO()
+    for name, fn in cases.items():
+        with contextlib.redirect_stdout(sink):   # strategies log to console
+            us = measure(fn, args.repeat, args.min_time)
+        sink.seek(0); sink.truncate()
+        results[name] = round(us, 3)
+        line = f"{name:28s} {us:10.2f} µs"
+        base = baseline.get(name)
+        if base:
+            change = us / base - 1
+            line += f"   {change:+7.1%} vs {base:.2f}"
+            if change > args.threshold:
+                line += "   ❌ REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "saved": time.strftime("%Y-%m-%d %H:%M"),
+                       "results": results}, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
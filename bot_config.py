@@ -0,0 +1,149 @@
+"""
+Bot settings from CLI flags, environment, a JSON config file or (for
+anything still missing) the interactive prompts, in that order.
+
+    python towesif.py --config bot.json              # no prompts if complete
+    TELEGRAM_BOT_TOKEN=... OTC_PAIRS=EURUSD_otc,... python zz.py --headless
+
+All values are parsed and validated together before the bot starts, so a
+bad config fails once with every problem listed. --headless never
+prompts: a missing value is an error instead.
+"""
+import argparse
+import json
+import os
+
+
+class ConfigError(Exception):
+    """One or more settings are missing or invalid (message lists them all)."""
+
+
+class Option:
+    """One setting: config key, prompt text, env var, parser and default."""
+
+    def __init__(self, name: str, prompt: str, env: str, parse=str, default=None, help: str = ""):
+        self.name = name
+        self.prompt = prompt         # None = never asked (flag / env / file only)
+        self.env = env
+        self.parse = parse           # raw value -> value, raises ValueError with a message
+        self.default = default       # used for blank answers / values; None = required
+        self.help = help or (prompt or name).strip(" :")
+
+    @property
+    def flag(self) -> str:
+        return "--" + self.name.replace("_", "-")
+
+
+# =============== Parsers ===============
+def non_empty(s) -> str:
+    s = str(s).strip()
+    if not s:
+        raise ValueError("must not be empty")
+    return s
+
+
+def text(s) -> str:
+    return str(s).strip()
+
+
+def pair_list(v) -> list:
+    items = v if isinstance(v, list) else str(v).split(",")
+    pairs = [str(p).strip() for p in items if str(p).strip()]
+    if not pairs:
+        raise ValueError("need at least one pair")
+    return pairs
+
+
+def int_in(lo: int, hi: int = None):
+    def parse(v) -> int:
+        n = int(str(v).strip())
+        if n < lo or (hi is not None and n > hi):
+            raise ValueError(f"must be {lo}..{hi}" if hi is not None else f"must be >= {lo}")
+        return n
+    return parse
+
+
+def float_min(lo: float):
+    def parse(v) -> float:
+        x = float(str(v).strip())
+        if x < lo:
+            raise ValueError(f"must be >= {lo}")
+        return x
+    return parse
+
+
+# =============== Loading ===============
+def parse_args(options, argv=None, description: str = ""):
+    ap = argparse.ArgumentParser(description=description)
+    ap.add_argument("--config", default=os.environ.get("BOT_CONFIG"),
+                    help="JSON file with settings (env BOT_CONFIG)")
+    ap.add_argument("--headless", action="store_true", default=os.environ.get("BOT_HEADLESS") == "1",
+                    help="never prompt; missing settings are an error (env BOT_HEADLESS=1)")
+    for opt in options:
+        ap.add_argument(opt.flag, dest=opt.name, help=f"{opt.help} (env {opt.env})")
+    return ap.parse_args(argv)
+
+
+def load_config(options, argv=None, env=None, ask=None, warn=print, description: str = "") -> dict:
+    """
+    Resolve every option: CLI flag > env var > config file > ask(prompt).
+    `ask` is only used when not headless, and with a config file only for
+    required settings (the rest take their defaults). Raises ConfigError listing
+    all problems.
+    """
+    env = os.environ if env is None else env
+    args = parse_args(options, argv or [], description)
+    file_values = {}
+    if args.config:
+        try:
+            with open(args.config, encoding="utf-8") as f:
+                file_values = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"config file {args.config}: {e}")
+        if not isinstance(file_values, dict):
+            raise ConfigError(f"config file {args.config}: expected a JSON object")
+        unknown = set(file_values) - {o.name for o in options}
+        if unknown:
+            warn(f"⚠️ Ignoring unknown config keys: {', '.join(sorted(unknown))}")
+
+    headless = args.headless or ask is None
+    values, errors = {}, []
+    for opt in options:
+        raw, source = getattr(args, opt.name), opt.flag
+        if raw is None and env.get(opt.env) is not None:
+            raw, source = env[opt.env], opt.env
+        if raw is None and opt.name in file_values:
+            raw, source = file_values[opt.name], f"{args.config}:{opt.name}"
+        # with a config file, only required settings it lacks are asked for
+        interactive = (raw is None and not headless and opt.prompt is not None
+                       and (opt.default is None or not args.config))
+        if interactive:
+            raw, source = ask(opt.prompt), "prompt"
+        if raw is None or (isinstance(raw, str) and not raw.strip() and opt.default is not None):
+            if opt.default is None:
+                errors.append(f"{opt.name}: missing (use {opt.flag}, {opt.env} or the config file)")
+                continue
+            values[opt.name] = opt.default
+            continue
+        try:
+            values[opt.name] = opt.parse(raw)
+        except (TypeError, ValueError) as e:
+            if interactive and opt.default is not None:
+                warn(f"⚠️ {opt.name}: {e}; using default {opt.default}")
+                values[opt.name] = opt.default
+            else:
+                errors.append(f"{opt.name}: invalid value {raw!r} from {source}: {e}")
+    if errors:
+        raise ConfigError("Invalid configuration:\n  " + "\n  ".join(errors))
+    return values
+
+
+def to_env(options, values: dict) -> dict:
+    """Resolved values as the options' env vars (lists comma joined), e.g. for child processes."""
+    env = {}
+    for opt in options:
+        v = values.get(opt.name)
+        if v is None:
+            continue
+        env[opt.env] = ",".join(str(x) for x in v) if isinstance(v, (list, tuple)) else str(v)
+    return env
@@ -0,0 +1,200 @@
+"""
+Console log for the bots: leveled records queued by the caller and
+formatted + written by a background thread, so a slow terminal or pipe
+never stalls the event loop.
+
+    LOG = BotLog(level="info", fmt="auto")   # info = quiet: no per-poll / per-pair chatter
+    LOG.debug("Attempt 2 to get candle ...")  # dropped unless level is debug
+    LOG.ok("signal sent")
+
+Formats (sinks): "color" (bold ANSI colours per level, rainbow banners),
+"plain" (time + level, for files and pipes), "json" (one object per line
+with ts, level, msg and any keyword fields). "auto" picks color on a
+terminal (or with FORCE_COLOR set) and plain otherwise.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from metrics import REGISTRY
+
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "quiet": INFO, "warn": WARN, "warning": WARN, "error": ERROR}
+FORMATS = ("auto", "color", "plain", "json")
+
+# record kind -> level
+KIND_LEVEL = {"debug": DEBUG, "info": INFO, "ok": INFO, "banner": INFO, "warn": WARN, "error": ERROR, "raw": INFO}
+
+COLORS = {"debug": "white", "info": "white", "ok": "cyan", "warn": "yellow", "error": "red"}
+ANSI = {"red": 31, "green": 32, "yellow": 33, "blue": 34, "magenta": 35, "cyan": 36, "white": 37}
+RAINBOW = ("\033[31m", "\033[33m", "\033[32m", "\033[36m", "\033[34m", "\033[35m")
+RESET = "\033[0m"
+
+
+def parse_level(v) -> str:
+    s = str(v).strip().lower()
+    if s not in LEVELS:
+        raise ValueError(f"one of {', '.join(LEVELS)}")
+    return s
+
+
+def parse_format(v) -> str:
+    s = str(v).strip().lower()
+    if s not in FORMATS:
+        raise ValueError(f"one of {', '.join(FORMATS)}")
+    return s
+
+
+def rainbow(text: str) -> str:
+    """One colour per word (not per character), cycling red..magenta."""
+    return " ".join(RAINBOW[i % len(RAINBOW)] + w for i, w in enumerate(text.split(" "))) + RESET
+
+
+# =============== Log ===============
+class BotLog:
+    """
+    Leveled console log. debug/info/ok/warn/err/banner only check the level
+    and append (time, kind, text, fields) to a deque; every `tick` seconds
+    the writer thread formats everything pending and writes it in one
+    go. If `max_pending` lines are waiting (output blocked) new lines are
+    dropped and counted instead of piling up.
+
+    text may also be a zero-argument callable returning the line; it is
+    only called on the writer thread, so costly debug lines are built
+    only when they are actually written.
+    """
+
+    def __init__(self, level: str = "debug", fmt: str = "auto", colors=None, stream=None,
+                 max_pending: int = 10000, tick: float = 0.05):
+        self.stream = stream or sys.stdout
+        self.colors = dict(COLORS, **(colors or {}))
+        self.context = {}            # extra fields on every json record (e.g. shard)
+        self.written = 0
+        self.filtered = 0
+        self.dropped = 0
+        self.max_pending = max_pending
+        self.tick = tick
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self.configure(level, fmt)
+        atexit.register(self.flush)
+        REGISTRY.gauge("log_lines", "Console log lines (written / filtered below the level / dropped)",
+                       ("state",), fn=lambda: {("written",): self.written, ("filtered",): self.filtered,
+                                                ("dropped",): self.dropped})
+
+    def configure(self, level: str = None, fmt: str = None):
+        if level is not None:
+            self.level_name = parse_level(level)
+            self.level = LEVELS[self.level_name]
+        if fmt is not None:
+            fmt = parse_format(fmt)
+            if fmt == "auto":
+                tty = getattr(self.stream, "isatty", lambda: False)()
+                fmt = "color" if (tty or os.environ.get("FORCE_COLOR")) and not os.environ.get("NO_COLOR") else "plain"
+            if fmt == "color" and os.name == "nt":
+                _windows_ansi()
+            self.fmt = fmt
+            self._paint = {k: f"\033[1;{ANSI.get(c, 37)}m" for k, c in self.colors.items()}
+
+    @property
+    def quiet(self) -> bool:
+        return self.level > DEBUG
+
+    # ----- producers (event loop side) -----
+    def _put(self, kind: str, text: str, fields):
+        if KIND_LEVEL[kind] < self.level:
+            self.filtered += 1
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), kind, text, fields))
+        if self._thread is None:
+            self._start()
+
+    def debug(self, text: str, **fields): self._put("debug", text, fields)
+    def info(self, text: str, **fields): self._put("info", text, fields)
+    def ok(self, text: str, **fields): self._put("ok", text, fields)
+    def warn(self, text: str, **fields): self._put("warn", text, fields)
+    def err(self, text: str, **fields): self._put("error", text, fields)
+    def banner(self, text: str, **fields): self._put("banner", text, fields)
+
+    def raw(self, text: str, source=None):
+        """An already formatted line (e.g. a shard worker's output), tagged [source]."""
+        self._put("raw", text, {"source": source} if source is not None else {})
+
+    def prompt(self, text: str) -> str:
+        """Prompt text for input(), painted like a banner in color mode. Flushes first."""
+        self.flush()
+        return rainbow(text) if self.fmt == "color" else text
+
+    # ----- writer thread -----
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="bot-log", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        pending = self._pending
+        while True:
+            self._wake.wait(self.tick)
+            self._wake.clear()
+            lines, marks = [], []
+            while pending:
+                rec = pending.popleft()
+                if isinstance(rec, threading.Event):
+                    marks.append(rec)
+                else:
+                    lines.append(self._format(rec))
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except (OSError, ValueError):   # closed / broken stdout: nothing to do
+                    pass
+                self.written += len(lines)
+            for m in marks:
+                m.set()
+
+    def _format(self, rec) -> str:
+        ts, kind, text, fields = rec
+        if callable(text):
+            text = text()
+        if self.fmt == "json":
+            if kind == "raw" and text.startswith("{"):
+                return text
+            return json.dumps(dict(self.context, **fields, ts=round(ts, 3), level=kind, msg=text),
+                              ensure_ascii=False, default=str)
+        if kind == "raw":
+            src = fields.get("source")
+            return text if src is None else f"[{src}] {text}"
+        if self.fmt == "color":
+            if kind == "banner":
+                return rainbow(text)
+            return self._paint.get(kind, "") + text + RESET
+        stamp = time.strftime("%H:%M:%S", time.localtime(ts))
+        return f"{stamp} {kind.upper():<6} {text}"
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (up to timeout) until everything logged so far is written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        mark = threading.Event()
+        self._pending.append(mark)
+        self._wake.set()
+        mark.wait(timeout)
+
+
+def _windows_ansi():
+    try:
+        import colorama
+    except ImportError:          # Windows 10+ terminals mostly handle ANSI anyway
+        return
+    if hasattr(colorama, "just_fix_windows_console"):
+        colorama.just_fix_windows_console()
+    else:
+        colorama.init()
@@ -0,0 +1,81 @@
+import sqlite3
+import time
+
+from candle_series import CandleSeries
+
+
+# =============== On-Disk Candle Archive ===============
+class CandleArchive:
+    """
+    Append-only local archive of closed candles per pair (SQLite, WAL,
+    primary key (pair, t) so reads by time range use the index; reads go
+    through mmap). Only closed bars are written, so a stored bar is final.
+
+    Writes are buffered and committed in batches (every `flush_every`
+    rows or `flush_secs` seconds) to keep the event loop free.
+    """
+
+    def __init__(self, path: str, flush_every: int = 500, flush_secs: float = 5.0,
+                 mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_secs = flush_secs
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS candles ("
+            " pair TEXT NOT NULL, t INTEGER NOT NULL,"
+            " o REAL NOT NULL, h REAL NOT NULL, l REAL NOT NULL, c REAL NOT NULL,"
+            " PRIMARY KEY (pair, t)) WITHOUT ROWID"
+        )
+        self.db.commit()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._last_t = {}            # pair -> newest t written (skip re-writing old bars)
+
+    def append(self, pair: str, series: CandleSeries, before_t: int):
+        """Queue bars of series with t < before_t (i.e. closed) not written yet."""
+        last = self._last_t.get(pair, -1)
+        rows = [(pair, t, o, h, l, c) for t, o, h, l, c in series.rows() if last < t < before_t]
+        if rows:
+            self._pending.extend(rows)
+            self._last_t[pair] = rows[-1][1]
+        if len(self._pending) >= self.flush_every or \
+                (self._pending and time.monotonic() - self._last_flush >= self.flush_secs):
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO candles (pair, t, o, h, l, c) VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+            self.db.commit()
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def load(self, pair: str, since_t: int = None, limit: int = None, tz=None) -> CandleSeries:
+        """Bars for pair (oldest first); the newest `limit` if given."""
+        sql = "SELECT t, o, h, l, c FROM candles WHERE pair = ?"
+        args = [pair]
+        if since_t is not None:
+            sql += " AND t >= ?"
+            args.append(since_t)
+        if limit:
+            sql = f"SELECT * FROM ({sql} ORDER BY t DESC LIMIT ?) ORDER BY t"
+            args.append(limit)
+        else:
+            sql += " ORDER BY t"
+        rows = self.db.execute(sql, args).fetchall()
+        if rows:
+            self._last_t[pair] = max(self._last_t.get(pair, -1), rows[-1][0])
+        return CandleSeries.from_rows(rows, tz)
+
+    def pairs(self):
+        return [r[0] for r in self.db.execute("SELECT DISTINCT pair FROM candles ORDER BY pair")]
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,166 @@
+import asyncio
+import datetime
+import time
+
+from candle_series import now_minute
+from candle_store import CandleStore
+from metrics import REGISTRY
+from scheduler import as_completed_bounded
+
+POLLS = REGISTRY.histogram("candle_polls", "Polls needed per resolved candle",
+                           buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50))
+READY_SECONDS = REGISTRY.histogram("candle_ready_seconds", "Bar close until the bar was confirmed final",
+                                   buckets=(0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120, 180))
+WAIT_TIMEOUTS = REGISTRY.counter("candle_wait_timeouts_total", "Candles never found before timeout")
+
+
+# =============== Candle Feed ===============
+class CandleFeed:
+    """
+    Async access to OTC candles on top of a fetch coroutine
+    (fetch(asset, count) -> CandleSeries). All reads go through
+    a per-asset CandleStore; once it is warm only the newest few bars
+    are requested from the API. With an archive, closed bars are written
+    through to disk and preload() warms the store on startup.
+
+    With a ServerTiming (OTCClient.timing), "now" is the server's clock and
+    wait_for_candle() sleeps until the pair's predicted publication time
+    instead of a fixed delay after our own minute boundary.
+    """
+
+    def __init__(self, fetch, tz, first_delay: float = 0.5, min_interval: float = 1.0,
+                 max_interval: float = 5.0, backoff: float = 1.5, timeout: float = 180.0,
+                 store_size: int = 240, refresh_count: int = 3, archive=None, timing=None,
+                 settle: float = 5.0):
+        self.fetch = fetch
+        self.tz = tz
+        self.store = CandleStore(store_size)
+        self.archive = archive              # CandleArchive or None
+        self.refresh_count = refresh_count  # bars asked for when the store is warm
+        self.first_delay = first_delay      # grace after expected close before 1st poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout              # give up this long after expected close
+        self.timing = timing                # ServerTiming or None (local clock, first_delay)
+        self.settle = settle                # trust a bar this long after close even if no newer bar
+
+    def now_minute(self) -> int:
+        return now_minute(self.timing.offset if self.timing else 0.0)
+
+    def minute_key(self, minute: datetime.datetime) -> str:
+        return minute.astimezone(self.tz).strftime("%Y-%m-%d %H:%M:00")
+
+    @staticmethod
+    def epoch_minute(minute: datetime.datetime) -> int:
+        return int(minute.timestamp()) // 60
+
+    async def candles(self, asset: str, count: int = 60):
+        """
+        Return the newest `count` candles for asset as a CandleSeries
+        (oldest first). Returns [] if the refresh fetch failed, like
+        fetch_otc_candles.
+        """
+        latest = self.store.latest_time(asset)
+        if latest is None or self.store.size(asset) < count:
+            need = count
+        else:
+            gap = self.now_minute() - latest
+            need = min(count, max(self.refresh_count, gap + 2))
+        fresh = await self.fetch(asset, need)
+        if not fresh:
+            return []
+        self._merge(asset, fresh)
+        window = self.store.last(asset, count)
+        if need < count and window.t[0] != window.t[-1] - count + 1:
+            # the top-up left a hole (downtime) inside the window: fetch it whole
+            fresh = await self.fetch(asset, count)
+            if not fresh:
+                return []
+            self._merge(asset, fresh)
+            window = self.store.last(asset, count)
+        return window
+
+    def _merge(self, asset: str, fresh):
+        self.store.merge(asset, fresh)
+        if self.archive is not None:
+            # the newest bar of a response may still be running on the server
+            self.archive.append(asset, fresh, before_t=min(self.now_minute(), fresh.t[-1]))
+
+    async def candles_many(self, assets, count: int = 60, concurrency: int = 16):
+        """
+        candles() for many assets at once (at most `concurrency` fetches in
+        flight); yields (asset, candles, seconds) as each one lands, so
+        callers can start on the first pairs while the rest are in flight.
+        """
+        async for asset, result, took in as_completed_bounded(
+                assets, lambda a: self.candles(a, count), concurrency):
+            yield asset, ([] if isinstance(result, Exception) else result), took
+
+    def preload(self, assets, count: int = None):
+        """
+        Warm the store from the archive; returns number of bars loaded.
+        Only the contiguous newest run of bars is loaded, so holes from
+        earlier downtime never end up inside a candles() window.
+        """
+        if self.archive is None:
+            return 0
+        count = count or self.store.maxlen
+        since = self.now_minute() - count
+        loaded = 0
+        for asset in assets:
+            series = self.archive.load(asset, since_t=since, limit=count, tz=self.tz)
+            t = series.t
+            start = len(t) - 1
+            while start > 0 and t[start - 1] == t[start] - 1:
+                start -= 1
+            series = series[max(start, 0):]
+            self.store.merge(asset, series)
+            loaded += len(series)
+        return loaded
+
+    async def wait_for_candle(self, asset: str, minute: datetime.datetime, on_poll=None, count: int = 5):
+        """
+        Wait for the candle that opens at `minute` to close and return it.
+        Sleeps until it is expected to be published (server clock + the
+        pair's learned lag, or close + first_delay without timing), then
+        polls with a short adaptive backoff. The bar counts as final once
+        a newer bar has shown up, or `settle` seconds after close.
+        Returns None if it never shows up before timeout.
+        """
+        minute = minute.replace(second=0, microsecond=0)
+        key = self.minute_key(minute)
+        tmin = self.epoch_minute(minute)
+        close_s = (tmin + 1) * 60
+        # a bar that closed a while ago (trade resumed after a restart) needs a deeper fetch
+        count = max(count, min(60, self.now_minute() - tmin + 2))
+
+        if self.timing is not None:
+            ready_at = self.timing.available_at(asset, tmin)
+        else:
+            ready_at = close_s + self.first_delay
+        delay = ready_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, self.timeout - max(0.0, time.time() - ready_at))
+        interval = self.min_interval
+        attempt = 0
+        while True:
+            attempt += 1
+            if on_poll:
+                on_poll(attempt, key)
+            # only trust the store after a fetch made past the close time
+            if await self.candles(asset, count):
+                candle = self.store.get(asset, tmin)
+                server_now = self.timing.now() if self.timing else time.time()
+                if candle and (self.store.latest_time(asset) > tmin or server_now - close_s >= self.settle):
+                    POLLS.observe(attempt)
+                    READY_SECONDS.observe(server_now - close_s)
+                    return candle
+            if loop.time() + interval > deadline:
+                WAIT_TIMEOUTS.inc()
+                return None
+            await asyncio.sleep(interval)
+            interval = min(interval * self.backoff, self.max_interval)
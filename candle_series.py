@@ -0,0 +1,170 @@
+import datetime
+import time
+from array import array
+from bisect import bisect_left
+
+
+# =============== Time Keys ===============
+_HOUR_START = {}                     # (tz, "YYYY-MM-DD HH") -> epoch minute of that hour
+
+
+def _slow_epoch_minute(s: str, tz) -> int:
+    dt = datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+    if hasattr(tz, "localize"):      # pytz
+        dt = tz.localize(dt)
+    else:
+        dt = dt.replace(tzinfo=tz)
+    return int(dt.timestamp()) // 60
+
+
+def epoch_minute(s: str, tz) -> int:
+    """
+    'YYYY-MM-DD HH:MM[:SS]' (or the API's 'YYYY-MM-DDTHH:MM:SS.fff') in tz
+    -> minutes since epoch (UTC). The zone offset is resolved once per
+    hour of wall time and cached, so a batch of bars costs a dict lookup
+    and an int() each instead of strptime + localize.
+    """
+    if len(s) >= 16 and s[13] == ":" and s[10] in " T":
+        hour = s[:10] + " " + s[11:13]
+        key = (tz, hour)
+        start = _HOUR_START.get(key)
+        if start is None:
+            if len(_HOUR_START) > 4096:
+                _HOUR_START.clear()
+            start = _HOUR_START[key] = _slow_epoch_minute(hour + ":00:00", tz)
+        return start + int(s[14:16])
+    return _slow_epoch_minute(s, tz)
+
+
+def now_minute(offset: float = 0.0) -> int:
+    """Current epoch minute (the bar opening now is still running); offset = server skew."""
+    return int(time.time() + offset) // 60
+
+
+def minute_str(tmin: int, tz) -> str:
+    """Minutes since epoch -> 'YYYY-MM-DD HH:MM:SS' in tz."""
+    return datetime.datetime.fromtimestamp(tmin * 60, tz).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# =============== Columnar Candles ===============
+class CandleSeries:
+    """
+    Candles stored column-wise: epoch-minute times (t) and OHLC floats
+    (o, h, l, c) in typed arrays, oldest first. Columns are memoryviews,
+    so slicing (`series[-20:]`, `tail(n)`) is zero-copy. Arrays are never
+    resized once built; the store builds new ones on merge.
+
+    Indexing with an int returns a CandleView, which supports the old
+    dict access (candle["time"], candle["mid"]["c"], ...).
+    """
+
+    __slots__ = ("t", "o", "h", "l", "c", "tz")
+
+    def __init__(self, t, o, h, l, c, tz=None):
+        self.t = memoryview(t)
+        self.o = memoryview(o)
+        self.h = memoryview(h)
+        self.l = memoryview(l)
+        self.c = memoryview(c)
+        self.tz = tz
+
+    @classmethod
+    def empty(cls, tz=None):
+        return cls(array("q"), array("d"), array("d"), array("d"), array("d"), tz)
+
+    @classmethod
+    def from_rows(cls, rows, tz=None):
+        """rows: iterable of (tmin, o, h, l, c); sorted and deduped by time (last wins)."""
+        by_t = {}
+        for r in rows:
+            by_t[r[0]] = r
+        t, o, h, l, c = array("q"), array("d"), array("d"), array("d"), array("d")
+        for k in sorted(by_t):
+            r = by_t[k]
+            t.append(r[0]); o.append(r[1]); h.append(r[2]); l.append(r[3]); c.append(r[4])
+        return cls(t, o, h, l, c, tz)
+
+    @classmethod
+    def from_candles(cls, candles, tz):
+        """Build from legacy candle dicts."""
+        return cls.from_rows(
+            ((epoch_minute(x["time"], tz), float(x["mid"]["o"]), float(x["mid"]["h"]),
+              float(x["mid"]["l"]), float(x["mid"]["c"])) for x in candles),
+            tz,
+        )
+
+    @classmethod
+    def concat(cls, *parts):
+        """New series owning fresh arrays with the parts' bars in order."""
+        cols = []
+        for name, code in (("t", "q"), ("o", "d"), ("h", "d"), ("l", "d"), ("c", "d")):
+            arr = array(code)
+            for p in parts:
+                arr.frombytes(getattr(p, name).cast("B"))
+            cols.append(arr)
+        tz = next((p.tz for p in parts if p.tz is not None), None)
+        return cls(*cols, tz=tz)
+
+    def rows(self):
+        return zip(self.t, self.o, self.h, self.l, self.c)
+
+    def __len__(self):
+        return len(self.t)
+
+    def __bool__(self):
+        return len(self.t) > 0
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CandleSeries(self.t[i], self.o[i], self.h[i], self.l[i], self.c[i], self.tz)
+        n = len(self.t)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("candle index out of range")
+        return CandleView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.t)):
+            yield CandleView(self, i)
+
+    def tail(self, n: int):
+        return self[-n:] if n < len(self) else self
+
+    def index_of(self, tmin: int) -> int:
+        """Index of the bar opening at tmin, or -1."""
+        i = bisect_left(self.t, tmin)
+        return i if i < len(self.t) and self.t[i] == tmin else -1
+
+
+class CandleView:
+    """One bar of a CandleSeries with the legacy candle-dict interface."""
+
+    __slots__ = ("series", "i")
+
+    def __init__(self, series: CandleSeries, i: int):
+        self.series = series
+        self.i = i
+
+    @property
+    def tmin(self) -> int:
+        return self.series.t[self.i]
+
+    def __getitem__(self, key):
+        s, i = self.series, self.i
+        if key == "time":
+            return minute_str(s.t[i], s.tz)
+        if key == "mid":
+            return {"o": s.o[i], "h": s.h[i], "l": s.l[i], "c": s.c[i]}
+        if key == "complete":
+            return True
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"CandleView({self['time']!r}, {self['mid']!r})"
@@ -0,0 +1,61 @@
+from bisect import bisect_left
+
+from candle_series import CandleSeries
+
+
+# =============== Per-Asset Candle Store ===============
+class CandleStore:
+    """
+    Bounded in-memory candle buffer per asset, keyed by epoch minute.
+    Every API response is merged in, so readers share one copy instead
+    of re-downloading the same bars.
+
+    Each asset holds one CandleSeries that is replaced (never mutated)
+    on merge, so slices handed out to readers stay valid.
+    """
+
+    def __init__(self, maxlen: int = 240):
+        self.maxlen = maxlen
+        self._series = {}            # asset -> CandleSeries, oldest first
+
+    def merge(self, asset: str, fresh: CandleSeries):
+        """Merge a response into the buffer (newer data wins), trim to maxlen."""
+        if not fresh:
+            return
+        old = self._series.get(asset)
+        if not old:
+            merged = CandleSeries.concat(fresh)
+        elif fresh.t[0] >= old.t[0]:
+            # usual case: response overlaps/extends the tail of the buffer
+            cut = bisect_left(old.t, fresh.t[0])
+            after = bisect_left(old.t, fresh.t[-1] + 1)
+            merged = CandleSeries.concat(old[:cut], fresh, old[after:])
+        else:
+            rows = list(old.rows()) + list(fresh.rows())
+            merged = CandleSeries.from_rows(rows, old.tz)
+        if len(merged) > self.maxlen:
+            merged = CandleSeries.concat(merged[-self.maxlen:])
+        self._series[asset] = merged
+
+    def series(self, asset: str) -> CandleSeries:
+        s = self._series.get(asset)
+        return s if s is not None else CandleSeries.empty()
+
+    def last(self, asset: str, n: int) -> CandleSeries:
+        return self.series(asset).tail(n)
+
+    def get(self, asset: str, tmin: int):
+        """CandleView for the bar opening at tmin, or None."""
+        s = self._series.get(asset)
+        if not s:
+            return None
+        i = s.index_of(tmin)
+        return s[i] if i >= 0 else None
+
+    def latest_time(self, asset: str):
+        s = self._series.get(asset)
+        return s.t[-1] if s else None
+
+    def size(self, asset: str) -> int:
+        s = self._series.get(asset)
+        return len(s) if s is not None else 0
@@ -0,0 +1,96 @@
+import email.utils
+import statistics
+import time
+from collections import deque
+
+
+# =============== Server Clock / Publication Lag ===============
+class ServerTiming:
+    """
+    What we learn about the OTC server's timing from its responses:
+
+    offset  server clock minus ours, from HTTP Date headers (median of
+            recent samples; Date has 1 s resolution, so take it as ±0.5 s)
+    lag     per pair, how long after a minute boundary (server time) the
+            new bar shows up. Each response is a bound: if it already has
+            the bar for the current server minute the lag was at most the
+            elapsed seconds, otherwise at least. The estimate is the middle
+            of the tightest recent bounds, so it keeps probing downwards.
+            An upper bound more than `bound_window` s above the lower one
+            (e.g. the startup scan, mid-minute) is too loose to use; until
+            a tighter one shows up the pair gets default_lag.
+    """
+
+    def __init__(self, samples: int = 31, lag_samples: int = 20, default_lag: float = 0.5,
+                 horizon: float = 20.0, margin: float = 0.2, bound_window: float = 3.0):
+        self.default_lag = default_lag
+        self.horizon = horizon       # ignore responses later than this into the minute
+        self.margin = margin         # added to the predicted availability
+        self.bound_window = bound_window
+        self._offsets = deque(maxlen=samples)
+        self._lag_samples = lag_samples
+        self._lag = {}               # pair -> deque of (elapsed, published)
+        self.offset = 0.0
+
+    def now(self) -> float:
+        """Current time on the server clock (epoch seconds)."""
+        return time.time() + self.offset
+
+    def observe(self, pair: str, date_header, sent: float, received: float, newest_t: int = None):
+        """Record one response: Date header, local send/receive times, newest bar's minute."""
+        if date_header:
+            try:
+                server = email.utils.parsedate_to_datetime(date_header).timestamp() + 0.5
+            except (TypeError, ValueError):
+                server = None
+            if server is not None:
+                self._offsets.append(server - (sent + received) / 2)
+                self.offset = statistics.median(self._offsets)
+        if newest_t is None:
+            return
+        # the server built the response somewhere between sent and received
+        lo_s, hi_s = sent + self.offset, received + self.offset
+        minute = int(hi_s // 60)
+        if newest_t >= minute:
+            elapsed, published = hi_s - minute * 60, True
+        else:
+            elapsed, published = lo_s - minute * 60, False
+        if 0 <= elapsed <= self.horizon:
+            obs = self._lag.get(pair)
+            if obs is None:
+                obs = self._lag[pair] = deque(maxlen=self._lag_samples)
+            obs.append((elapsed, published))
+
+    def lag(self, pair: str = None) -> float:
+        """Estimated publication lag in seconds (all pairs' median if pair is None)."""
+        if pair is None:
+            lags = [self.lag(p) for p in self._lag]
+            return statistics.median(lags) if lags else self.default_lag
+        obs = self._lag.get(pair)
+        if not obs:
+            return self.default_lag
+        lo = max((e for e, p in obs if not p), default=None)
+        base = lo if lo is not None else 0.0
+        hi = min((e for e, p in obs if p and base <= e <= base + self.bound_window), default=None)
+        if hi is None:
+            return self.default_lag if lo is None else lo + self.margin
+        return (base + hi) / 2
+
+    def pairs(self):
+        return list(self._lag)
+
+    def available_at(self, pair: str, tmin: int) -> float:
+        """Local epoch seconds when the bar opening at tmin should be final."""
+        return (tmin + 1) * 60 + self.lag(pair) + self.margin - self.offset
+
+    def until_next_minute(self) -> float:
+        """Seconds until the next minute boundary on the server clock."""
+        return 60 - self.now() % 60
+
+    def snapshot(self) -> dict:
+        return {
+            "clock_offset_s": round(self.offset, 3),
+            "offset_samples": len(self._offsets),
+            "lag_s": round(self.lag(), 3),
+            "lag_by_pair_s": {p: round(self.lag(p), 3) for p in sorted(self.pairs())},
+        }
@@ -0,0 +1,217 @@
+"""
+Local stand-in for the OTC candle API (and optionally Telegram).
+
+    python fake_otc.py --port 8088 --latency-ms 80 --error-rate 0.02
+
+Serves GET /otcx.php?pair=&count= with deterministic synthetic M1 candles
+(same pair + minute -> same bar on every run), including the running bar.
+Knobs (CLI flags, or POST JSON to /_ctl at runtime):
+
+    latency_ms / jitter_ms   response delay
+    lag_s                    seconds after close before a bar is published
+    clock_offset_s           server clock skew (also sent in the Date header)
+    error_rate               HTTP 500
+    empty_rate               empty body
+    invalid_rate             non-JSON body
+    nodata_rate              JSON without "data"
+
+POST /bot<token>/sendMessage is a Telegram stub (429 with retry_after at
+`tg_429_rate`). GET /_stats returns request counters and received messages.
+Point the bots at it with OTC_API_URL / TELEGRAM_API_URL.
+"""
+import argparse
+import asyncio
+import datetime
+import email.utils
+import hashlib
+import math
+import random
+import time
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+TZ = datetime.timezone(datetime.timedelta(hours=6))   # Asia/Dhaka, like the real API
+
+
+# =============== Synthetic Candles ===============
+def _noise(pair: str, minute: int, salt: str = "") -> float:
+    """Deterministic value in [-1, 1) for (pair, minute)."""
+    h = hashlib.blake2b(f"{pair}|{minute}|{salt}".encode(), digest_size=8).digest()
+    return int.from_bytes(h, "big") / 2 ** 63 - 1.0
+
+
+def _price(pair: str, minute: int) -> float:
+    seed = (_noise(pair, 0, "seed") + 1) * 1000
+    base = 1.0 + (_noise(pair, 0, "base") + 1) * 0.5
+    wave = 0.002 * math.sin(minute / 37 + seed) + 0.001 * math.sin(minute / 7.3 + seed / 3)
+    return round(base * (1 + wave + 0.0008 * _noise(pair, minute)), 5)
+
+
+def make_candle(pair: str, minute: int, progress: float = 1.0) -> dict:
+    """Bar opening at epoch-minute `minute`; progress < 1 gives the running bar."""
+    o = _price(pair, minute - 1)
+    full_c = _price(pair, minute)
+    c = round(o + (full_c - o) * progress, 5)
+    wick = abs(_noise(pair, minute, "wick")) * 0.0004 * max(o, c)
+    h = round(max(o, c) + wick * progress, 5)
+    l = round(min(o, c) - wick * progress, 5)
+    ts = datetime.datetime.fromtimestamp(minute * 60, TZ)
+    # mix both time formats the real API has been seen to use
+    t = ts.strftime("%Y-%m-%dT%H:%M:%S.000") if minute % 2 else ts.strftime("%Y-%m-%d %H:%M")
+    return {"time": t, "open": o, "high": h, "low": l, "close": c}
+
+
+# =============== Server ===============
+class FakeOTC:
+    def __init__(self, **knobs):
+        self.knobs = {
+            "latency_ms": 0.0, "jitter_ms": 0.0, "lag_s": 0.0, "clock_offset_s": 0.0,
+            "error_rate": 0.0, "empty_rate": 0.0, "invalid_rate": 0.0, "nodata_rate": 0.0,
+            "tg_429_rate": 0.0,
+        }
+        self.knobs.update({k: v for k, v in knobs.items() if v is not None})
+        self.rng = random.Random(1234)
+        self.started = time.time()
+        self.requests = Counter()            # pair -> count
+        self.per_minute = defaultdict(set)   # epoch minute -> pairs that fetched
+        self.responses = Counter()           # ok / error / empty / invalid / nodata
+        self.messages = []                   # telegram: {"at": epoch, "text": ...}
+        self.tg_429 = 0
+
+    def now(self) -> float:
+        return time.time() + self.knobs["clock_offset_s"]
+
+    def _date_header(self) -> str:
+        return email.utils.formatdate(self.now(), usegmt=True)
+
+    async def _delay(self):
+        ms = self.knobs["latency_ms"] + self.rng.uniform(0, self.knobs["jitter_ms"])
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+
+    def _roll(self, knob: str) -> bool:
+        return self.knobs[knob] > 0 and self.rng.random() < self.knobs[knob]
+
+    async def otcx(self, request):
+        pair = request.query.get("pair", "")
+        count = max(1, min(int(request.query.get("count", "60") or 60), 1000))
+        self.requests[pair] += 1
+        self.per_minute[int(time.time()) // 60].add(pair)
+        await self._delay()
+        headers = {"Date": self._date_header()}
+
+        if self._roll("error_rate"):
+            self.responses["error"] += 1
+            return web.Response(status=500, text="server error", headers=headers)
+        if self._roll("empty_rate"):
+            self.responses["empty"] += 1
+            return web.Response(body=b"", headers=headers)
+        if self._roll("invalid_rate"):
+            self.responses["invalid"] += 1
+            return web.Response(text="<html>Bad Gateway</html>", headers=headers)
+        if self._roll("nodata_rate"):
+            self.responses["nodata"] += 1
+            return web.json_response({"error": "no data"}, headers=headers)
+
+        now = self.now()
+        running = int(now // 60)
+        progress = (now % 60) / 60
+        # the newest closed bar only shows up lag_s after it closed
+        if now - running * 60 < self.knobs["lag_s"]:
+            running -= 1
+            progress = 1.0
+        bars = [make_candle(pair, m) for m in range(running - count + 1, running)]
+        bars.append(make_candle(pair, running, progress))
+        self.responses["ok"] += 1
+        return web.json_response({"data": bars}, headers=headers)
+
+    async def telegram(self, request):
+        data = await request.post()
+        await self._delay()
+        if self._roll("tg_429_rate"):
+            self.tg_429 += 1
+            return web.json_response(
+                {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}, status=429)
+        self.messages.append({"at": time.time(), "text": data.get("text", "")})
+        return web.json_response({"ok": True, "result": {"message_id": len(self.messages)}})
+
+    async def ctl(self, request):
+        body = await request.json()
+        for k, v in body.items():
+            if k in self.knobs:
+                self.knobs[k] = float(v)
+        return web.json_response(self.knobs)
+
+    async def stats(self, request):
+        return web.json_response(self.snapshot())
+
+    def snapshot(self) -> dict:
+        elapsed_min = max((time.time() - self.started) / 60, 1e-9)
+        total = sum(self.requests.values())
+        return {
+            "knobs": self.knobs,
+            "requests_total": total,
+            "requests_per_minute": round(total / elapsed_min, 1),
+            "requests_per_pair": dict(self.requests),
+            "responses": dict(self.responses),
+            "pairs_per_minute": {str(m): len(p) for m, p in sorted(self.per_minute.items())},
+            "telegram_messages": len(self.messages),
+            "telegram_429": self.tg_429,
+        }
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/otcx.php", self.otcx)
+        app.router.add_post("/bot{token}/sendMessage", self.telegram)
+        app.router.add_post("/_ctl", self.ctl)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+
+async def start(fake: FakeOTC, host: str = "127.0.0.1", port: int = 8088) -> web.AppRunner:
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def add_knob_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--latency-ms", type=float)
+    ap.add_argument("--jitter-ms", type=float)
+    ap.add_argument("--lag-s", type=float)
+    ap.add_argument("--clock-offset-s", type=float)
+    ap.add_argument("--error-rate", type=float)
+    ap.add_argument("--empty-rate", type=float)
+    ap.add_argument("--invalid-rate", type=float)
+    ap.add_argument("--nodata-rate", type=float)
+    ap.add_argument("--tg-429-rate", type=float)
+
+
+def knobs_from(args) -> dict:
+    names = ["latency_ms", "jitter_ms", "lag_s", "clock_offset_s", "error_rate",
+             "empty_rate", "invalid_rate", "nodata_rate", "tg_429_rate"]
+    return {n: getattr(args, n) for n in names}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake OTC candle API + Telegram stub")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8088)
+    add_knob_args(ap)
+    args = ap.parse_args()
+
+    async def serve():
+        fake = FakeOTC(**knobs_from(args))
+        await start(fake, args.host, args.port)
+        print(f"Fake OTC on http://{args.host}:{args.port}/otcx.php  (stats: /_stats)")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
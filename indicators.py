@@ -0,0 +1,232 @@
+from collections import deque
+
+
+# =============== Streaming Indicators ===============
+class EMA:
+    """
+    EMA seeded with the SMA of the first `period` values, then updated in
+    O(1) per value. Same arithmetic as towesif.ema_value/calculate_ema_trend,
+    so the same input sequence gives bit-identical values.
+    """
+
+    def __init__(self, period: int, keep: int = 3):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self._seed = []
+        self.value = None
+        self.values = deque(maxlen=keep)      # last few EMA values, newest last
+
+    def update(self, x: float):
+        if self.value is None:
+            self._seed.append(x)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+                self._seed = []
+                self.values.append(self.value)
+            return self.value
+        self.value = (x - self.value) * self.k + self.value
+        self.values.append(self.value)
+        return self.value
+
+    def trend(self) -> str:
+        """BULLISH / BEARISH / NEUTRAL from the last two values, NO_DATA before that."""
+        if len(self.values) < 2:
+            return "NO_DATA"
+        if self.values[-1] > self.values[-2]:
+            return "BULLISH"
+        if self.values[-1] < self.values[-2]:
+            return "BEARISH"
+        return "NEUTRAL"
+
+
+class RSI:
+    """
+    RSI over the last `period` close-to-close changes, matching
+    towesif.rsi_series exactly (same summation order). O(period) per
+    update, independent of history length; keeps the last `keep` values.
+    """
+
+    def __init__(self, period: int, keep: int = 3):
+        self.period = period
+        self._prev = None
+        self._gains = deque(maxlen=period)    # newest first, like rsi_series
+        self._losses = deque(maxlen=period)
+        self.values = deque(maxlen=keep)      # newest last
+
+    def update(self, x: float):
+        if self._prev is not None:
+            diff = x - self._prev
+            self._gains.appendleft(max(diff, 0.0))
+            self._losses.appendleft(abs(min(diff, 0.0)))
+        self._prev = x
+        if len(self._gains) < self.period:
+            return None
+        avg_gain = sum(self._gains) / self.period
+        avg_loss = sum(self._losses) / self.period
+        if avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+        self.values.append(rsi)
+        return rsi
+
+
+class RollingHighLow:
+    """Max high / min low of the last `window` bars via monotonic deques (amortized O(1))."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._n = 0
+        self._max = deque()                   # (index, high), highs decreasing
+        self._min = deque()                   # (index, low), lows increasing
+
+    def update(self, high: float, low: float):
+        i = self._n
+        self._n += 1
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((i, low))
+        cutoff = i - self.window
+        while self._max[0][0] <= cutoff:
+            self._max.popleft()
+        while self._min[0][0] <= cutoff:
+            self._min.popleft()
+
+    @property
+    def high(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def low(self):
+        return self._min[0][1] if self._min else None
+
+
+class ZigZag:
+    """
+    MT4-style ZigZag fed one bar at a time, amortized O(1) per bar (the
+    depth-bar extremes come from RollingHighLow's monotonic deques).
+
+    A bar is marked as a swing high (low) when its high (low) is the new
+    extreme of the last `depth` bars; marking also removes weaker marks of
+    the same kind from the previous `backstep` bars. A bar that is not the
+    extreme but within `deviation` (absolute price) of a new extreme only
+    does the removing. Marks older than `backstep` bars are final and go
+    through the alternation pass into `pivots`: consecutive marks of the
+    same kind keep the more extreme one (the first on a tie).
+
+    Pivots are (bar_index, "H" | "L", price), bar_index counting bars fed.
+    Every pivot in `pivots` except the last is confirmed; recent() also
+    includes the tentative marks of the last `backstep` bars.
+    """
+
+    def __init__(self, depth: int, deviation: float, backstep: int, keep: int = 50):
+        self.depth = depth
+        self.deviation = deviation
+        self.backstep = backstep
+        self.hl = RollingHighLow(depth)
+        self.n = 0                            # bars fed
+        self._last_high = None                # depth-window extremes at the previous bar
+        self._last_low = None
+        self._pending = deque()               # marks of the last `backstep` bars, oldest first
+        self.pivots = deque(maxlen=keep)      # final marks after alternation, oldest first
+
+    @property
+    def params(self) -> tuple:
+        return self.depth, self.deviation, self.backstep
+
+    def feed(self, highs, lows):
+        for high, low in zip(highs, lows):
+            self.update(high, low)
+        return self
+
+    def update(self, high: float, low: float):
+        i = self.n
+        self.n += 1
+        self.hl.update(high, low)
+        if i >= self.depth - 1:
+            val = self.hl.high
+            if val != self._last_high:
+                self._last_high = val
+                if val - high <= self.deviation:
+                    self._drop_weaker("H", val)
+                    if high == val:
+                        self._pending.append((i, "H", high))
+            val = self.hl.low
+            if val != self._last_low:
+                self._last_low = val
+                if low - val <= self.deviation:
+                    self._drop_weaker("L", val)
+                    if low == val:
+                        self._pending.append((i, "L", low))
+        cutoff = i - self.backstep
+        while self._pending and self._pending[0][0] <= cutoff:
+            _alternate(self.pivots, self._pending.popleft())
+
+    def _drop_weaker(self, kind: str, val: float):
+        # pending marks are exactly the previous `backstep` bars
+        if any(m[1] == kind and (m[2] < val if kind == "H" else m[2] > val) for m in self._pending):
+            self._pending = deque(m for m in self._pending
+                                  if m[1] != kind or not (m[2] < val if kind == "H" else m[2] > val))
+
+    def confirmed(self) -> list:
+        return list(self.pivots)[:-1]
+
+    def recent(self, count: int = 2) -> list:
+        """Newest `count` pivots including tentative ones, oldest first (O(backstep))."""
+        tail = deque(list(self.pivots)[-count:])
+        for m in self._pending:
+            _alternate(tail, m)
+        return list(tail)[-count:]
+
+
+def _alternate(pivots, mark):
+    """Append a mark to the pivot list keeping highs and lows alternating."""
+    if pivots and pivots[-1][1] == mark[1]:
+        prev = pivots[-1][2]
+        if mark[2] > prev if mark[1] == "H" else mark[2] < prev:
+            pivots[-1] = mark
+        return
+    pivots.append(mark)
+
+
+# =============== Per-Asset Indicator State ===============
+class AssetIndicators:
+    """
+    Indicator state for one asset, fed each newly closed bar once.
+    sync(series) feeds only bars newer than the last one seen; if the
+    series no longer contains that bar (gap/restart) the state is rebuilt.
+    """
+
+    def __init__(self, ema_period: int, rsi_period: int, zigzag: tuple, keep: int = 3):
+        self.ema_period = ema_period
+        self.rsi_period = rsi_period
+        self.zigzag = tuple(zigzag)           # (depth, deviation, backstep)
+        self.keep = keep
+        self.reset()
+
+    def reset(self):
+        self.ema = EMA(self.ema_period, self.keep)
+        self.rsi = RSI(self.rsi_period, self.keep)
+        self.zz = ZigZag(*self.zigzag)
+        self.count = 0                        # bars fed
+        self.last_t = None                    # epoch minute of the last bar fed
+
+    def sync(self, series):
+        if not series:
+            return self
+        if self.last_t is None or series.index_of(self.last_t) < 0:
+            self.reset()
+            start = 0
+        else:
+            start = series.index_of(self.last_t) + 1
+        t, h, l, c = series.t, series.h, series.l, series.c
+        for i in range(start, len(t)):
+            self.ema.update(c[i])
+            self.rsi.update(c[i])
+            self.zz.update(h[i], l[i])
+            self.count += 1
+            self.last_t = t[i]
+        return self
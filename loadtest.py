@@ -0,0 +1,166 @@
+"""
+Load harness: run a bot against the local fake OTC/Telegram server.
+
+    python loadtest.py --bot towesif --pairs 40 --minutes 5 --latency-ms 120
+
+Starts fake_otc in-process, spawns the bot with its prompts answered
+and OTC_API_URL / TELEGRAM_API_URL pointed at the fake, stops it with
+SIGINT after --minutes and reports:
+
+    upstream requests/minute, responses by kind
+    signal latency (seconds after the scan minute started)
+    missed windows (signal delivered after its entry minute began,
+                    pairs not scanned in a full minute)
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+import signal
+import statistics
+import sys
+import time
+
+import fake_otc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SIG_PAIR = re.compile(r"(?:𝙿𝙰𝙸𝚁 :>|ASSET&lt;⊱|ASSET<⊱)\s*(\S+)")
+SIG_ENTRY = re.compile(r"(?:𝚃𝙸𝙼𝙴 :>|ENTRY&lt;⊱|ENTRY<⊱)\s*(\d\d):(\d\d)")
+RESULT_MARK = "𝗥𝗘𝗦𝗨𝗟𝗧𝗔𝗗𝗢"
+
+
+def bot_answers(bot: str, pairs, args) -> str:
+    """stdin lines for the bot's input() prompts."""
+    if bot == "zz":
+        lines = ["LOAD", "TEST", "1", "@load", ",".join(pairs), str(args.mtg)]
+    else:
+        lines = ["TEST", "1", "@load", ",".join(pairs), args.strategies, "", "", ""]
+    return "\n".join(lines) + "\n"
+
+
+def entry_time(at: float, hh: int, mm: int) -> float:
+    """Epoch of the HH:MM entry (Dhaka time) closest to `at`."""
+    local = datetime.datetime.fromtimestamp(at, fake_otc.TZ)
+    cand = local.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if (cand - local).total_seconds() > 12 * 3600:
+        cand -= datetime.timedelta(days=1)
+    elif (local - cand).total_seconds() > 12 * 3600:
+        cand += datetime.timedelta(days=1)
+    return cand.timestamp()
+
+
+def analyse(fake: fake_otc.FakeOTC, n_pairs: int, t_start: float, t_stop: float) -> dict:
+    latencies, slacks, missed = [], [], 0
+    signals = results = 0
+    for m in fake.messages:
+        text = m["text"]
+        if RESULT_MARK in text:
+            results += 1
+            continue
+        e = SIG_ENTRY.search(text)
+        if not (e and SIG_PAIR.search(text)):
+            continue
+        signals += 1
+        entry = entry_time(m["at"], int(e.group(1)), int(e.group(2)))
+        latencies.append(m["at"] - (entry - 60))
+        slack = entry - m["at"]
+        slacks.append(slack)
+        if slack < 0:
+            missed += 1
+
+    # full minutes only: every pair should have been fetched at least once
+    first_full = int(t_start // 60) + 2        # allow the first minute for startup
+    last_full = int(t_stop // 60) - 1
+    short_minutes = 0
+    for minute in range(first_full, last_full + 1):
+        if len(fake.per_minute.get(minute, ())) < n_pairs:
+            short_minutes += 1
+
+    def pct(xs, q):
+        return round(sorted(xs)[min(len(xs) - 1, int(q * len(xs)))], 2) if xs else None
+
+    snap = fake.snapshot()
+    return {
+        "pairs": n_pairs,
+        "minutes": round((t_stop - t_start) / 60, 2),
+        "upstream_requests": snap["requests_total"],
+        "upstream_requests_per_minute": round(snap["requests_total"] / max((t_stop - t_start) / 60, 1e-9), 1),
+        "responses": snap["responses"],
+        "signals": signals,
+        "results": results,
+        "signal_latency_s": {
+            "p50": pct(latencies, 0.5), "p95": pct(latencies, 0.95),
+            "max": round(max(latencies), 2) if latencies else None,
+            "mean": round(statistics.mean(latencies), 2) if latencies else None,
+        },
+        "entry_slack_min_s": round(min(slacks), 2) if slacks else None,
+        "missed_signal_windows": missed,
+        "minutes_with_unscanned_pairs": short_minutes,
+        "telegram_429": snap["telegram_429"],
+    }
+
+
+async def run(args) -> dict:
+    fake = fake_otc.FakeOTC(**fake_otc.knobs_from(args))
+    runner = await fake_otc.start(fake, "127.0.0.1", args.port)
+    base = f"http://127.0.0.1:{args.port}"
+    pairs = [f"PAIR{i:03d}_otc" for i in range(1, args.pairs + 1)]
+
+    env = dict(os.environ, OTC_API_URL=f"{base}/otcx.php", TELEGRAM_API_URL=base,
+               PYTHONUNBUFFERED="1")
+    log = open(args.bot_log, "w") if args.bot_log else asyncio.subprocess.DEVNULL
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(HERE, f"{args.bot}.py"), *(["--shards", str(args.shards)] if args.shards else []),
+        stdin=asyncio.subprocess.PIPE, stdout=log, stderr=asyncio.subprocess.STDOUT, env=env,
+    )
+    proc.stdin.write(bot_answers(args.bot, pairs, args).encode())
+    await proc.stdin.drain()
+
+    t_start = time.time()
+    try:
+        await asyncio.wait_for(proc.wait(), args.minutes * 60)
+        print(f"⚠️ bot exited early with code {proc.returncode}")
+    except asyncio.TimeoutError:
+        proc.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(proc.wait(), 30)
+        except asyncio.TimeoutError:
+            proc.kill()
+    t_stop = time.time()
+
+    report = analyse(fake, len(pairs), t_start, t_stop)
+    report["bot"] = args.bot
+    report["shards"] = args.shards
+    report["knobs"] = fake.knobs
+    await runner.cleanup()
+    if args.bot_log:
+        log.close()
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Drive a bot against the fake OTC server")
+    ap.add_argument("--bot", choices=["towesif", "zz"], default="towesif")
+    ap.add_argument("--pairs", type=int, default=20)
+    ap.add_argument("--minutes", type=float, default=5)
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--strategies", default="all", help="towesif strategy prompt answer")
+    ap.add_argument("--mtg", type=int, default=1, help="zz MTG step prompt answer")
+    ap.add_argument("--shards", type=int, default=0, help="run the bot as N worker processes")
+    ap.add_argument("--bot-log", help="write the bot's console output here")
+    ap.add_argument("--json", help="also write the report as JSON here")
+    fake_otc.add_knob_args(ap)
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import asyncio
+import bisect
+import json
+import math
+import os
+import time
+
+# Default buckets (seconds) for latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# =============== Metric Types ===============
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}            # label values tuple -> value / state
+
+    def _key(self, kw) -> tuple:
+        return tuple([str(kw.get(label, "")) for label in self.labels])
+
+    def _fmt_labels(self, key, extra=()) -> str:
+        pairs = [(n, v) for n, v in zip(self.labels, key)] + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{n}="{_escape(v)}"' for n, v in pairs)
+        return "{" + body + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{self._fmt_labels(key)} {_num(v)}"
+
+    def snapshot(self):
+        return {",".join(k) or "_": v for k, v in sorted(self._values.items())}
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at read time when built with fn."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn                 # () -> value, or {label values tuple: value}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def _items(self):
+        if self.fn is None:
+            return sorted(self._values.items())
+        v = self.fn()
+        return sorted(v.items()) if isinstance(v, dict) else [((), v)]
+
+    def render(self):
+        for key, v in self._items():
+            yield f"{self.name}{self._fmt_labels(key)} {_num(v)}"
+
+    def snapshot(self):
+        return {",".join(k) or "_": v for k, v in self._items()}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        st = self._values.get(key)
+        if st is None:
+            st = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        st[0][bisect.bisect_left(self.buckets, value)] += 1   # first bound >= value, else +Inf
+        st[1] += value
+        st[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        for key, (counts, total, n) in sorted(self._values.items()):
+            cum = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le = "+Inf" if bound == math.inf else _num(bound)
+                yield f"{self.name}_bucket{self._fmt_labels(key, [('le', le)])} {cum}"
+            yield f"{self.name}_sum{self._fmt_labels(key)} {_num(total)}"
+            yield f"{self.name}_count{self._fmt_labels(key)} {n}"
+
+    def quantile(self, q: float, key=()):
+        """Bucket-interpolated quantile (like Prometheus histogram_quantile)."""
+        st = self._values.get(key)
+        if not st or not st[2]:
+            return None
+        counts, _, n = st
+        rank = q * n
+        cum = 0
+        lower = min(0.0, self.buckets[0])
+        for bound, c in zip(self.buckets + (math.inf,), counts):
+            if c and cum + c >= rank:
+                if bound == math.inf:
+                    return self.buckets[-1]
+                return lower + (bound - lower) * (rank - cum) / c
+            cum += c
+            lower = bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        out = {}
+        for key, (counts, total, n) in sorted(self._values.items()):
+            out[",".join(key) or "_"] = {
+                "count": n,
+                "mean": round(total / n, 6) if n else None,
+                "p50": _round(self.quantile(0.5, key)),
+                "p95": _round(self.quantile(0.95, key)),
+                "p99": _round(self.quantile(0.99, key)),
+            }
+        return out
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "started")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def _round(v):
+    return None if v is None else round(v, 6)
+
+
+# =============== Registry ===============
+class Registry:
+    """
+    In-process metrics, kept as plain dicts (no locking: the bots are
+    single-threaded asyncio). Metrics are created once at import time
+    by the module that owns them; asking again for the same name
+    returns the existing one.
+    """
+
+    def __init__(self, prefix: str = "otcbot_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self.started = time.time()
+
+    def _get(self, cls, name, help, labels, **kw):
+        full = self.prefix + name
+        m = self._metrics.get(full)
+        if m is None:
+            m = self._metrics[full] = cls(full, help, labels, **kw)
+        return m
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels=(), fn=None) -> Gauge:
+        return self._get(Gauge, name, help, labels, fn=fn)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        for name, m in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {m.kind}")
+            try:
+                lines.extend(m.render())
+            except Exception as e:   # a broken gauge callback must not kill the endpoint
+                lines.append(f"# error rendering {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        out = {"time": time.time(), "uptime_s": round(time.time() - self.started, 1)}
+        for name, m in sorted(self._metrics.items()):
+            try:
+                out[name] = m.snapshot()
+            except Exception as e:
+                out[name] = {"error": str(e)}
+        return out
+
+    def write_json(self, path: str):
+        """Write snapshot() atomically (readers never see a half-written file)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=1, default=str)
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+# =============== Exporters ===============
+async def serve(registry: Registry = REGISTRY, host: str = "127.0.0.1", port: int = 9108):
+    """Serve /metrics (Prometheus text) and /metrics.json; returns the aiohttp runner."""
+    from aiohttp import web
+
+    async def prom(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def as_json(request):
+        return web.json_response(registry.snapshot(), dumps=lambda o: json.dumps(o, default=str))
+
+    app = web.Application()
+    app.router.add_get("/metrics", prom)
+    app.router.add_get("/metrics.json", as_json)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def snapshot_loop(path: str, every: float = 30.0, registry: Registry = REGISTRY):
+    """Rewrite the JSON snapshot file every `every` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(every)
+        try:
+            registry.write_json(path)
+        except OSError:
+            pass
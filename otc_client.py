@@ -0,0 +1,202 @@
+import asyncio
+import json
+import time
+
+from candle_series import CandleSeries, epoch_minute
+from clock_sync import ServerTiming
+from metrics import REGISTRY
+from scheduler import as_completed_bounded
+
+
+FETCH_SECONDS = REGISTRY.histogram("otc_fetch_seconds", "OTC candle request latency (upstream only)", ("pair",))
+FETCH_ERRORS = REGISTRY.counter("otc_fetch_errors_total", "OTC candle requests that failed", ("pair", "kind"))
+
+
+class OTCFetchError(Exception):
+    """Raised when the OTC API returns nothing usable for a pair."""
+
+    def __init__(self, message: str, kind: str = "error"):
+        super().__init__(message)
+        self.kind = kind             # empty / invalid / nodata (metrics label)
+
+
+# =============== Response Parsing ===============
+def parse_candles(instrument: str, body: bytes, tz):
+    """
+    Turn a raw /otcx.php body into a CandleSeries (times parsed once as
+    epoch minutes in tz, either API time format, OHLC kept as floats).
+    """
+    if not body:
+        raise OTCFetchError(f"Empty response for {instrument}", "empty")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        text = body[:100].decode("utf-8", "replace")
+        raise OTCFetchError(f"Invalid JSON response for {instrument}: {text}", "invalid")
+    if not isinstance(data, dict) or "data" not in data:
+        raise OTCFetchError(f"No data for {instrument}", "nodata")
+
+    return CandleSeries.from_rows(
+        ((epoch_minute(item["time"], tz),
+          float(item["open"]), float(item["high"]), float(item["low"]), float(item["close"]))
+         for item in data["data"]),
+        tz,
+    )
+
+
+# =============== Single-Flight Coalescing ===============
+class SingleFlight:
+    """
+    Share one upstream request between concurrent callers for the same pair.
+    A caller joins an in-flight request (or one that finished less than
+    `window` seconds ago) started in the same minute if it asked for at
+    least as many candles, and gets the newest `count` of them. Results
+    never cross a minute boundary, so a poll after candle close can't be
+    answered with data fetched before it. With a ServerTiming the minute
+    is the server's, shifted by the pair's publication lag, like the
+    candle waits.
+    """
+
+    def __init__(self, window: float = 1.0, timing=None):
+        self.window = window
+        self.timing = timing         # ServerTiming or None (local clock)
+        self._inflight = {}          # pair -> (count, minute, task)
+        self._recent = {}            # pair -> (count, finished_at, minute, result)
+        self.upstream = 0            # requests actually sent
+        self.shared = 0              # requests answered from another caller's result
+
+    def minute(self, pair: str, now: float) -> int:
+        if self.timing is None:
+            return int(now // 60)
+        return int((now + self.timing.offset - self.timing.lag(pair)) // 60)
+
+    async def do(self, pair: str, count: int, fn):
+        now = time.time()
+        minute = self.minute(pair, now)
+        hit = self._recent.get(pair)
+        if hit and hit[0] >= count and now - hit[1] <= self.window and hit[2] == minute:
+            self.shared += 1
+            return hit[3][-count:]
+
+        entry = self._inflight.get(pair)
+        if entry and entry[0] >= count and entry[1] == minute:
+            self.shared += 1
+            result = await asyncio.shield(entry[2])
+            return result[-count:]
+
+        self.upstream += 1
+        task = asyncio.ensure_future(fn(pair, count))
+        self._inflight[pair] = (count, minute, task)
+        try:
+            # shield: one caller being cancelled must not cancel the others
+            result = await asyncio.shield(task)
+        finally:
+            if self._inflight.get(pair, (0, 0, None))[2] is task:
+                del self._inflight[pair]
+        self._recent[pair] = (count, time.time(), minute, result)
+        return result[-count:]
+
+    def stats(self) -> dict:
+        total = self.upstream + self.shared
+        saved = round(self.shared / total * 100, 1) if total else 0.0
+        return {"upstream": self.upstream, "shared": self.shared, "saved_pct": saved}
+
+
+# =============== Async OTC Client ===============
+class OTCClient:
+    """
+    Async candle client on one pooled aiohttp session.
+    Keep-alive connections are reused per host, so polling many pairs
+    doesn't pay a new TCP+TLS handshake on every request. Every response
+    also feeds `timing` (server clock offset, per-pair publication lag).
+    """
+
+    def __init__(self, base_url: str, tz, limit: int = 32, limit_per_host: int = 16,
+                 timeout: float = 15.0, connect_timeout: float = 5.0,
+                 keepalive_timeout: float = 30.0, coalesce_window: float = 1.0, timing=None):
+        self.base_url = base_url
+        self.tz = tz                 # timezone of the API's candle times
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self.timing = timing or ServerTiming()  # server clock offset / publication lag
+        self.flight = SingleFlight(coalesce_window, self.timing)
+        REGISTRY.gauge("otc_requests_shared_total", "Candle requests answered by single-flight",
+                       fn=lambda: self.flight.shared)
+        REGISTRY.gauge("otc_clock_offset_seconds", "Server clock minus local clock",
+                       fn=lambda: self.timing.offset)
+        REGISTRY.gauge("otc_publish_lag_seconds", "Estimated candle publication lag", ("pair",),
+                       fn=lambda: {(p,): self.timing.lag(p) for p in self.timing.pairs()})
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # Session must be created inside the running loop
+        if self._session is None or self._session.closed:
+            import aiohttp   # deferred: ~0.3 s to import, not needed until the first request
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+            )
+        return self._session
+
+    async def fetch_raw(self, instrument: str, count: int = 60) -> bytes:
+        body, _ = await self._request(instrument, count)
+        return body
+
+    async def _request(self, instrument: str, count: int):
+        """GET one pair; returns (body, (Date header, sent, received))."""
+        params = {"pair": instrument, "count": str(count)}
+        sent = time.time()
+        async with self._get_session().get(self.base_url, params=params) as r:
+            body = await r.read()
+            return body, (r.headers.get("Date"), sent, time.time())
+
+    async def _fetch_parsed(self, instrument: str, count: int):
+        started = time.perf_counter()
+        try:
+            body, (date, sent, received) = await self._request(instrument, count)
+        except Exception as e:
+            FETCH_ERRORS.inc(pair=instrument, kind=type(e).__name__)
+            raise
+        newest = None
+        try:
+            series = parse_candles(instrument, body, self.tz)
+            newest = series.t[-1] if series else None
+            return series
+        except OTCFetchError as e:
+            FETCH_ERRORS.inc(pair=instrument, kind=e.kind)
+            raise
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - started, pair=instrument)
+            self.timing.observe(instrument, date, sent, received, newest)
+
+    async def fetch_candles(self, instrument: str, count: int = 60):
+        """
+        Fetch and parse candles, coalesced with identical concurrent calls.
+        Raises OTCFetchError / aiohttp errors.
+        """
+        return await self.flight.do(instrument, count, self._fetch_parsed)
+
+    async def fetch_many(self, pairs, count: int = 60, concurrency: int = 16):
+        """
+        Fetch many pairs at once, at most `concurrency` in flight, and yield
+        (pair, CandleSeries | exception, seconds) as each one completes.
+        """
+        async for item in as_completed_bounded(
+                pairs, lambda pair: self.fetch_candles(pair, count), concurrency):
+            yield item
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # let the connector finish closing SSL transports
+            await asyncio.sleep(0.25)
+        self._session = None
@@ -0,0 +1,240 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import select
+import sys
+import time
+import tracemalloc
+
+from metrics import REGISTRY
+
+LOOP_LAG = REGISTRY.histogram("event_loop_lag_seconds", "Event loop heartbeat overshoot (stall monitor on)",
+                              buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+HELP = """Console commands:
+  off                 send summary (bot specific)
+  prof on|off|dump    cProfile the live process; dump = ranked hotspots to a file
+  mem on|off|dump     tracemalloc; dump = top allocation sites (+ growth since 'mem on')
+  stall on [ms]|off|dump
+                      report callbacks/coroutine steps that block the loop longer than ms (default 100)
+  help                this text"""
+
+
+# =============== Event Loop Stall Monitor ===============
+class StallMonitor(logging.Handler):
+    """
+    Uses asyncio debug mode's slow-callback warnings ("Executing <handle>
+    took N seconds") and groups them per coroutine / callback, plus a
+    heartbeat task that measures how late the loop wakes up. Debug mode
+    costs some speed, so it is only on between 'stall on' and 'stall off'.
+    """
+
+    CORO = re.compile(r"coro=<([\w.<>]+)\(")
+    TASK = re.compile(r"name='([^']+)'")
+    CALLBACK = re.compile(r"^<\w*Handle (?:when=\S+ )?([\w.<>]+)\(")
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.loop = None
+        self.stats = {}              # name -> [count, total_s, max_s]
+        self.lag_max = 0.0
+        self._heartbeat = None
+        self._prev = None
+
+    @property
+    def active(self) -> bool:
+        return self.loop is not None
+
+    def start(self, threshold: float = 0.1, heartbeat: float = 0.05):
+        if self.active:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._prev = (self.loop.get_debug(), self.loop.slow_callback_duration)
+        self.loop.set_debug(True)
+        self.loop.slow_callback_duration = threshold
+        logging.getLogger("asyncio").addHandler(self)
+        self._heartbeat = self.loop.create_task(self._beat(heartbeat), name="stall-heartbeat")
+
+    def stop(self):
+        if not self.active:
+            return
+        logging.getLogger("asyncio").removeHandler(self)
+        self.loop.set_debug(self._prev[0])
+        self.loop.slow_callback_duration = self._prev[1]
+        self._heartbeat.cancel()
+        self.loop = None
+
+    async def _beat(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.observe(lag)
+            self.lag_max = max(self.lag_max, lag)
+
+    def emit(self, record):
+        if not record.msg.startswith("Executing") or len(record.args or ()) < 2:
+            return
+        handle, took = record.args[0], float(record.args[1])
+        text = str(handle)
+        coro = self.CORO.search(text)
+        task = self.TASK.search(text)
+        if coro:
+            name = coro.group(1) + (f" [{task.group(1).split(':')[0]}]" if task else "")
+            if name.startswith("StallMonitor._beat"):
+                return
+        else:
+            cb = self.CALLBACK.search(text)
+            name = f"callback {cb.group(1)}" if cb else text[:120]
+        st = self.stats.setdefault(name, [0, 0.0, 0.0])
+        st[0] += 1
+        st[1] += took
+        st[2] = max(st[2], took)
+
+    def report(self) -> str:
+        lines = [f"Slow callbacks (> {self.loop.slow_callback_duration * 1000:.0f} ms)" if self.active
+                 else "Slow callbacks", f"max loop lag: {self.lag_max * 1000:.1f} ms", "",
+                 f"{'count':>7} {'total_s':>9} {'max_ms':>9}  coroutine / callback"]
+        for name, (n, total, worst) in sorted(self.stats.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"{n:7d} {total:9.3f} {worst * 1000:9.1f}  {name}")
+        if not self.stats:
+            lines.append("(none)")
+        return "\n".join(lines) + "\n"
+
+
+# =============== Profiler Console ===============
+class ProfilerConsole:
+    """
+    Runtime profiling switched from stdin, without restarting the bot.
+    run() polls stdin in the background; profiling commands are handled
+    here and any other line (e.g. 'off') is queued for the bot's loop,
+    read with pop().
+    """
+
+    def __init__(self, out_dir: str = "profiles", log=print, poll: float = 0.25):
+        self.out_dir = out_dir
+        self.log = log
+        self.poll = poll
+        self.pending = []
+        self.cpu = None
+        self.mem_base = None
+        self.stalls = StallMonitor()
+
+    def pop(self):
+        """Next non-profiling command line, or None."""
+        return self.pending.pop(0) if self.pending else None
+
+    async def run(self):
+        while True:
+            try:
+                if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
+                    line = sys.stdin.readline()
+                    if not line:         # stdin closed
+                        return
+                    cmd = line.strip().lower()
+                    if cmd and not self.handle(cmd):
+                        self.pending.append(cmd)
+            except (OSError, ValueError):
+                # Some environments may not support select on stdin
+                return
+            await asyncio.sleep(self.poll)
+
+    def _path(self, kind: str, ext: str = "txt") -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        return os.path.join(self.out_dir, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.{ext}")
+
+    def handle(self, cmd: str) -> bool:
+        parts = cmd.split()
+        if not parts:
+            return False
+        what, arg = parts[0], (parts[1] if len(parts) > 1 else "")
+        if what in ("prof", "mem", "stall") and arg not in ("on", "off", "dump"):
+            self.log(HELP)
+            return True
+        try:
+            if what == "help":
+                self.log(HELP)
+            elif what == "prof":
+                self._prof(arg)
+            elif what == "mem":
+                self._mem(arg)
+            elif what == "stall":
+                self._stall(arg, parts[2] if len(parts) > 2 else "")
+            else:
+                return False
+        except Exception as e:
+            self.log(f"❌ {cmd}: {e}")
+        return True
+
+    def _prof(self, arg: str):
+        if arg == "on":
+            if self.cpu is None:
+                self.cpu = cProfile.Profile()
+                self.cpu.enable()
+            self.log("🔬 cProfile on ('prof dump' / 'prof off' to write hotspots)")
+        elif arg in ("off", "dump"):
+            if self.cpu is None:
+                self.log("cProfile is not running ('prof on')")
+                return
+            self.cpu.disable()
+            path = self._path("cpu")
+            self.cpu.dump_stats(path[:-4] + ".prof")
+            out = io.StringIO()
+            stats = pstats.Stats(self.cpu, stream=out).strip_dirs()
+            out.write("=== by cumulative time ===\n")
+            stats.sort_stats("cumulative").print_stats(40)
+            out.write("=== by own time ===\n")
+            stats.sort_stats("tottime").print_stats(40)
+            with open(path, "w") as f:
+                f.write(out.getvalue())
+            if arg == "off":
+                self.cpu = None
+            else:
+                self.cpu.enable()
+            self.log(f"🔬 CPU hotspots written to {path}")
+
+    def _mem(self, arg: str):
+        if arg == "on":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            self.mem_base = tracemalloc.take_snapshot()
+            self.log("🧠 tracemalloc on ('mem dump' / 'mem off')")
+        elif arg in ("off", "dump"):
+            if not tracemalloc.is_tracing():
+                self.log("tracemalloc is not running ('mem on')")
+                return
+            snap = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [f"traced: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)", "",
+                     "=== top allocation sites ==="]
+            lines += [str(s) for s in snap.statistics("lineno")[:30]]
+            if self.mem_base is not None:
+                lines += ["", "=== growth since 'mem on' ==="]
+                lines += [str(s) for s in snap.compare_to(self.mem_base, "lineno")[:30]]
+            path = self._path("mem")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            if arg == "off":
+                tracemalloc.stop()
+                self.mem_base = None
+            self.log(f"🧠 Allocation report written to {path}")
+
+    def _stall(self, arg: str, ms: str):
+        if arg == "on":
+            self.stalls.start(threshold=float(ms) / 1000 if ms else 0.1)
+            self.log(f"🐢 Stall monitor on (> {self.stalls.loop.slow_callback_duration * 1000:.0f} ms)")
+        elif arg in ("off", "dump"):
+            path = self._path("stalls")
+            with open(path, "w") as f:
+                f.write(self.stalls.report())
+            if arg == "off":
+                self.stalls.stop()
+            self.log(f"🐢 Stall report written to {path}")
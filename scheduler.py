@@ -0,0 +1,106 @@
+import asyncio
+import inspect
+
+
+# =============== Per-Asset Task Scheduler ===============
+class AssetScheduler:
+    """
+    Run one task per asset with a global concurrency cap.
+    An asset that still has a trade in flight is never started twice,
+    so a pair can't have two overlapping trades.
+
+    The cap only covers worker(asset) itself. If the worker returns an
+    awaitable (e.g. the wait for the trade result) it is awaited after
+    the slot is released, so long waits don't starve the other pairs.
+    on_start(asset, queued_seconds) is called when a worker gets a slot.
+    """
+
+    def __init__(self, worker, max_concurrent: int = 8, on_error=None, on_start=None):
+        self.worker = worker
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.on_error = on_error
+        self.on_start = on_start
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self._tasks = {}             # asset -> asyncio.Task
+
+    def busy(self, asset: str) -> bool:
+        return asset in self._tasks
+
+    def in_flight(self):
+        return list(self._tasks)
+
+    def submit(self, asset: str, job=None) -> bool:
+        """
+        Start a task for asset unless one is already running/queued.
+        job: zero-argument coroutine function to run instead of
+        worker(asset), outside the cap (e.g. resuming a trade after a
+        restart, which only waits for candles).
+        Returns True if a new task was started.
+        """
+        if asset in self._tasks:
+            return False
+        task = asyncio.create_task(self._run(asset, job), name=f"asset:{asset}")
+        self._tasks[asset] = task
+        task.add_done_callback(lambda t, a=asset: self._done(a, t))
+        return True
+
+    async def _run(self, asset: str, job=None):
+        if job is not None:
+            return await job()
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        async with self._sem:
+            if self.on_start:
+                self.on_start(asset, loop.time() - queued)
+            result = await self.worker(asset)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _done(self, asset: str, task: asyncio.Task):
+        self._tasks.pop(asset, None)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None and self.on_error:
+            self.on_error(asset, exc)
+
+    async def drain(self, timeout: float = None):
+        """Wait for all in-flight tasks (used on shutdown)."""
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+# =============== Bounded Fan-Out ===============
+async def as_completed_bounded(items, worker, limit: int = 16):
+    """
+    Run worker(item) for every item, at most `limit` at a time, and yield
+    (item, result, seconds) in completion order. A failed call yields its
+    exception as the result. Leaving the loop early cancels what's left.
+    """
+    sem = asyncio.Semaphore(max(1, int(limit)))
+    loop = asyncio.get_running_loop()
+
+    async def one(item):
+        async with sem:
+            started = loop.time()
+            try:
+                result = await worker(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = e
+            return item, result, loop.time() - started
+
+    tasks = [asyncio.ensure_future(one(item)) for item in items]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
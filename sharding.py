@@ -0,0 +1,311 @@
+"""
+Split the pair list over worker processes for very large pair lists:
+
+    python towesif.py --shards 4 --config bot.json
+
+The process started by the user becomes the supervisor. It runs one
+worker per shard (the same script, same settings, headless), owns the
+Telegram sender and the trade history, and restarts a worker that dies.
+Workers scan and resolve only their slice of ASSETS and report signals
+and results back over a local TCP connection, one JSON object per line.
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+from metrics import REGISTRY
+
+HELP = """Shard commands:
+  shards              worker status
+  restart <n>         restart worker n (its in-flight trades are dropped)
+  shard <n> <command> run a console command in worker n (e.g. shard 0 prof dump)"""
+
+SHARD_ENV = "BOT_SHARD"          # "index/count", set for worker processes
+IPC_ENV = "BOT_SHARD_IPC"        # "host:port" of the supervisor
+
+RESTARTS = REGISTRY.counter("shard_restarts_total", "Worker processes restarted", ("shard",))
+IPC_MESSAGES = REGISTRY.counter("shard_messages_total", "Messages received from workers", ("op",))
+
+
+def shard_of(items, index: int, count: int) -> list:
+    """Items for shard `index` of `count` (round robin, so shards stay balanced)."""
+    return list(items)[index::count]
+
+
+def worker_shard(env=None):
+    """(index, count, (host, port)) when this process is a shard worker, else None."""
+    env = os.environ if env is None else env
+    spec, addr = env.get(SHARD_ENV), env.get(IPC_ENV)
+    if not spec or not addr:
+        return None
+    index, count = (int(x) for x in spec.split("/"))
+    host, port = addr.rsplit(":", 1)
+    return index, count, (host, int(port))
+
+
+# =============== Worker Side ===============
+class ShardLink:
+    """
+    The worker's connection to the supervisor. send() has the same shape as
+    TelegramSender.send, so it can stand in for it; result() reports a
+    resolved trade. Both only enqueue. Lines from the supervisor go to
+    on_command; on_lost is called if the supervisor goes away.
+    """
+
+    def __init__(self, index: int, addr, on_command=None, on_lost=None, log=print):
+        self.index = index
+        self.addr = addr
+        self.on_command = on_command
+        self.on_lost = on_lost
+        self.log = log
+        self._queue = None
+        self._worker = None
+        self._closing = False
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run(), name=f"shard-link:{self.index}")
+
+    def start(self):
+        """Connect now (commands from the supervisor need the connection)."""
+        self._ensure_started()
+
+    def _put(self, msg: dict):
+        self._ensure_started()
+        self._queue.put_nowait(msg)
+
+    def send(self, text: str, priority: int = 1):
+        self._put({"op": "send", "text": text, "priority": priority})
+
+    def result(self, **fields):
+        self._put(dict(fields, op="result"))
+
+    async def _run(self):
+        reader, writer = None, None
+        for _ in range(20):
+            try:
+                reader, writer = await asyncio.open_connection(*self.addr)
+                break
+            except OSError:
+                await asyncio.sleep(0.25)
+        if writer is None:
+            self.log(f"❌ Shard {self.index}: supervisor at {self.addr[0]}:{self.addr[1]} unreachable")
+            self._lost()
+            return
+        listener = asyncio.create_task(self._listen(reader), name=f"shard-listen:{self.index}")
+        try:
+            writer.write(_line({"op": "hello", "shard": self.index, "pid": os.getpid()}))
+            while True:
+                msg = await self._queue.get()
+                try:
+                    writer.write(_line(msg))
+                    await writer.drain()
+                finally:
+                    self._queue.task_done()
+        except (ConnectionError, OSError):
+            self._lost()
+        finally:
+            listener.cancel()
+            writer.close()
+
+    async def _listen(self, reader):
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                self._lost()
+                return
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            if msg.get("op") == "cmd" and self.on_command:
+                self.on_command(msg.get("line", ""))
+
+    def _lost(self):
+        if not self._closing and self.on_lost:
+            self.on_lost()
+
+    async def close(self, timeout: float = 5.0):
+        """Flush what's queued (up to timeout) and disconnect."""
+        self._closing = True
+        if self._worker is None or self._worker.done():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.log(f"⚠️ Shard {self.index}: {self._queue.qsize()} message(s) not delivered")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+
+def stop_self():
+    """on_lost for workers: leave like Ctrl+C would (the supervisor is gone)."""
+    os.kill(os.getpid(), signal.SIGINT)
+
+
+# =============== Supervisor Side ===============
+class ShardSupervisor:
+    """
+    Runs `count` workers of `script` and keeps them running. Each worker
+    gets `env` plus its shard number and the IPC address; each line of
+    its output goes to echo(line, shard) (default: printed with a [shard]
+    prefix). on_send(text, priority) and on_result(fields) receive what
+    the workers report.
+    """
+
+    def __init__(self, script: str, count: int, env: dict, on_send, on_result, log=print, echo=None,
+                 args=("--headless",), restart_delay: float = 1.0, max_delay: float = 60.0):
+        self.script = script
+        self.count = count
+        self.env = env
+        self.on_send = on_send
+        self.on_result = on_result
+        self.log = log
+        self.echo = echo or (lambda line, shard: print(f"[{shard}] {line}"))
+        self.args = list(args)
+        self.restart_delay = restart_delay
+        self.max_delay = max_delay
+        self.procs = [None] * count
+        self.restarts = [0] * count
+        self.started = [0.0] * count
+        self._writers = {}           # shard -> StreamWriter
+        self._tasks = []
+        self._server = None
+        self._stopping = False
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        for i in range(self.count):
+            env = dict(os.environ, **self.env)
+            env.update({SHARD_ENV: f"{i}/{self.count}", IPC_ENV: f"127.0.0.1:{port}",
+                        "PYTHONUNBUFFERED": "1"})
+            if sys.stdout.isatty():
+                env.setdefault("FORCE_COLOR", "1")
+            self._tasks.append(asyncio.create_task(self._keep(i, env), name=f"shard:{i}"))
+        REGISTRY.gauge("shard_workers_up", "Worker processes running",
+                       fn=lambda: sum(1 for p in self.procs if p is not None and p.returncode is None))
+
+    async def _keep(self, i: int, env: dict):
+        delay = self.restart_delay
+        while not self._stopping:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, self.script, *self.args, env=env,
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT, start_new_session=True,   # Ctrl+C reaches only us
+            )
+            self.procs[i] = proc
+            self.started[i] = time.monotonic()
+            self.log(f"🧩 Shard {i}: worker pid {proc.pid} started")
+            async for raw in proc.stdout:
+                self.echo(raw.decode(errors="replace").rstrip(), i)
+            code = await proc.wait()
+            self._writers.pop(i, None)
+            if self._stopping:
+                return
+            if time.monotonic() - self.started[i] > 60:
+                delay = self.restart_delay
+            self.restarts[i] += 1
+            RESTARTS.inc(shard=i)
+            self.log(f"⚠️ Shard {i}: worker exited ({code}), restarting in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    async def _client(self, reader, writer):
+        shard = None
+        try:
+            async for raw in reader:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                op = msg.pop("op", "")
+                IPC_MESSAGES.inc(op=op)
+                if op == "hello":
+                    shard = msg.get("shard")
+                    self._writers[shard] = writer
+                elif op == "send":
+                    self.on_send(msg["text"], msg.get("priority", 1))
+                elif op == "result":
+                    self.on_result(msg)
+        except ConnectionError:
+            pass
+        finally:
+            if self._writers.get(shard) is writer:
+                self._writers.pop(shard)
+            writer.close()
+
+    def command(self, i: int, line: str) -> bool:
+        """Forward a console line (e.g. 'prof on') to worker i."""
+        writer = self._writers.get(i)
+        if writer is None:
+            return False
+        writer.write(_line({"op": "cmd", "line": line}))
+        return True
+
+    def restart(self, i: int) -> bool:
+        """Stop worker i; _keep starts a fresh one."""
+        proc = self.procs[i] if 0 <= i < self.count else None
+        if proc is None or proc.returncode is not None:
+            return False
+        proc.send_signal(signal.SIGINT)
+        return True
+
+    def handle(self, cmd: str) -> bool:
+        """Console line for the supervisor; False if it isn't a shard command."""
+        parts = cmd.split()
+        if not parts or parts[0] not in ("shards", "restart", "shard"):
+            return False
+        if parts[0] == "shards":
+            for line in self.status():
+                self.log(line)
+        elif len(parts) < 2 or not parts[1].isdigit() or (parts[0] == "shard" and len(parts) < 3):
+            self.log(HELP)
+        elif parts[0] == "restart":
+            ok = self.restart(int(parts[1]))
+            self.log(f"🔄 Restarting shard {parts[1]}" if ok else f"Shard {parts[1]} is not running")
+        else:
+            ok = self.command(int(parts[1]), " ".join(parts[2:]))
+            self.log(f"➡️ Sent to shard {parts[1]}" if ok else f"Shard {parts[1]} is not connected")
+        return True
+
+    def status(self) -> list:
+        lines = []
+        for i, proc in enumerate(self.procs):
+            up = proc is not None and proc.returncode is None
+            state = f"pid {proc.pid}, up {time.monotonic() - self.started[i]:.0f}s" if up else "down"
+            lines.append(f"shard {i}: {state}, restarts {self.restarts[i]}, "
+                         f"ipc {'ok' if i in self._writers else '-'}")
+        return lines
+
+    async def stop(self, timeout: float = 15.0):
+        """SIGINT every worker (they flush their queues), kill stragglers."""
+        self._stopping = True
+        live = [p for p in self.procs if p is not None and p.returncode is None]
+        for p in live:
+            p.send_signal(signal.SIGINT)
+        if live:
+            await asyncio.wait([asyncio.ensure_future(p.wait()) for p in live], timeout=timeout)
+            for p in live:
+                if p.returncode is None:
+                    p.kill()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=5)
+            for t in self._tasks:
+                t.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+def _line(msg: dict) -> bytes:
+    return (json.dumps(msg, ensure_ascii=False) + "\n").encode()
@@ -0,0 +1,182 @@
+"""
+Offline simulator for the zz.py 3-candle trend signal.
+
+Replays stored M1 history through the generate_3candle_signal rule
+(more UP than DOWN bodies in the last 3 candles -> CALL, more DOWN -> PUT)
+and resolves every signal for MTG step 0, 1 and 2 in one pass.
+
+Live timing is kept: the signal uses the last closed bar e, the trade is
+on bar e+2 (bar e+1 is running when the signal goes out), MTG steps on
+e+3 / e+4. A pair is busy until its trade resolves, so the next signal
+for that pair can only come from bar e+3+step onwards.
+
+Note: live zz.py also counts the few-seconds-old running candle as one of
+the 3; history only has final bars, so `--running doji` (treat it as
+flat) is the closest replay, `--running closed` uses 3 closed bars.
+
+    python simulate_zz.py history/ --running doji
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+import numpy as np
+
+from backtest import load_dir, direction
+
+MTG_DEPTHS = (0, 1, 2)
+
+
+# =============== Signal + Outcome (vectorized) ===============
+def three_candle_signals(o, c, running="closed"):
+    """+1 CALL / -1 PUT / 0 none for every last-closed bar e."""
+    d = direction(o, c)
+    up = (d == 1).astype(np.int8)
+    down = (d == -1).astype(np.int8)
+    bars = 2 if running == "doji" else 3       # running bar counts as DOJI
+    up_n = up.copy()
+    down_n = down.copy()
+    for k in range(1, bars):
+        up_n[k:] += up[:-k]
+        down_n[k:] += down[:-k]
+    sig = np.sign(up_n.astype(np.int16) - down_n).astype(np.int8)
+    sig[:bars - 1] = 0
+    return sig
+
+
+def first_win_step(t, o, c, sig, max_step=2):
+    """
+    Step (0..max_step) at which each signal first wins, -1 if it never
+    wins within max_step, -2 if a needed bar is missing.
+    """
+    n = len(c)
+    d = direction(o, c)
+    res = np.full(n, -1, dtype=np.int8)
+    pending = sig != 0
+    for step in range(max_step + 1):
+        off = 2 + step
+        idx = np.arange(n) + off
+        inside = idx < n
+        contiguous = np.zeros(n, dtype=bool)
+        contiguous[inside] = t[idx[inside]] == t[inside] + off
+        res[pending & ~contiguous] = -2
+        pending &= contiguous
+        bar_dir = np.zeros(n, dtype=np.int8)
+        bar_dir[inside] = d[idx[inside]]
+        win = pending & (bar_dir == sig)
+        res[win] = step
+        pending &= ~win
+    res[sig == 0] = -3
+    return res
+
+
+# =============== Live Gating + Stats ===============
+def gated_trades(step_at, depth):
+    """
+    Walk signals in time order with the one-trade-per-pair rule.
+    Returns list of outcomes ('WIN'/'LOSS'); unresolved trades are skipped
+    but still keep the pair busy.
+    """
+    out = []
+    free_from = 0
+    for e in np.flatnonzero(step_at != -3).tolist():
+        if e < free_from:
+            continue
+        s = int(step_at[e])
+        if s == -2:
+            free_from = e + 3 + depth
+            continue
+        if 0 <= s <= depth:
+            out.append("WIN")
+            free_from = e + 3 + s
+        else:
+            out.append("LOSS")
+            free_from = e + 3 + depth
+    return out
+
+
+def loss_streaks(outcomes):
+    streaks = Counter()
+    run = 0
+    for r in outcomes:
+        if r == "LOSS":
+            run += 1
+        elif run:
+            streaks[run] += 1
+            run = 0
+    if run:
+        streaks[run] += 1
+    return streaks
+
+
+def summarize(outcomes, hours, streaks=None):
+    wins = outcomes.count("WIN")
+    total = len(outcomes)
+    if streaks is None:
+        streaks = loss_streaks(outcomes)
+    return {
+        "signals": total, "wins": wins, "losses": total - wins,
+        "win_rate": round(wins / total * 100, 1) if total else 0.0,
+        "signals_per_hour": round(total / hours, 2) if hours else 0.0,
+        "max_loss_streak": max(streaks) if streaks else 0,
+        "loss_streaks": dict(sorted(streaks.items())),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulate the zz.py 3-candle signal for MTG 0/1/2")
+    ap.add_argument("history", help="directory with <PAIR>.csv / <PAIR>.json files, or candles.db")
+    ap.add_argument("--pairs", default="", help="comma separated subset of pairs")
+    ap.add_argument("--running", choices=["closed", "doji"], default="doji",
+                    help="how to stand in for the running candle zz.py counts")
+    ap.add_argument("--per-pair", action="store_true", help="print every pair, not only totals")
+    ap.add_argument("--json", help="also write the report as JSON here")
+    args = ap.parse_args()
+
+    pairs = [p.strip() for p in args.pairs.split(",") if p.strip()]
+    t0 = time.perf_counter()
+    data = load_dir(args.history, pairs)
+    t1 = time.perf_counter()
+
+    per_pair = {}
+    totals = {d: [] for d in MTG_DEPTHS}
+    total_streaks = {d: Counter() for d in MTG_DEPTHS}
+    total_hours = 0.0
+    bars = 0
+    for pair, (t, o, h, l, c) in data.items():
+        bars += len(t)
+        hours = (int(t[-1]) - int(t[0]) + 1) / 60 if len(t) else 0.0
+        total_hours += hours
+        step_at = first_win_step(t, o, c, three_candle_signals(o, c, args.running))
+        per_pair[pair] = {}
+        for depth in MTG_DEPTHS:
+            outcomes = gated_trades(step_at, depth)
+            per_pair[pair][f"MTG{depth}"] = summarize(outcomes, hours)
+            totals[depth].extend(outcomes)
+            total_streaks[depth].update(loss_streaks(outcomes))
+    t2 = time.perf_counter()
+
+    report = {
+        "pairs": len(data), "bars": bars, "running": args.running,
+        "load_s": round(t1 - t0, 3), "eval_s": round(t2 - t1, 3),
+        "total": {f"MTG{d}": summarize(totals[d], total_hours, total_streaks[d]) for d in MTG_DEPTHS},
+        "per_pair": per_pair,
+    }
+
+    print(f"{report['pairs']} pairs, {bars} bars | load {report['load_s']}s, eval {report['eval_s']}s")
+    rows = [("ALL", report["total"])]
+    if args.per_pair:
+        rows += list(per_pair.items())
+    for label, by in rows:
+        for step, st in by.items():
+            print(f"{label:<20} {step}  signals {st['signals']:>7}  WR {st['win_rate']:>5}%  "
+                  f"sig/h {st['signals_per_hour']:>6}  max LS {st['max_loss_streak']:>3}  LS {st['loss_streaks']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
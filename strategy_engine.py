@@ -0,0 +1,77 @@
+import random
+import time
+
+
+SELECT_MODES = ("priority", "majority", "weighted", "random")
+
+
+def parse_select(v) -> str:
+    s = str(v).strip().lower()
+    if s not in SELECT_MODES:
+        raise ValueError(f"one of {', '.join(SELECT_MODES)}")
+    return s
+
+
+# =============== Strategy Engine ===============
+class StrategyEngine:
+    """
+    Runs every enabled strategy once over the same closed-candle series
+    and per-asset indicator state (ctx), and returns all votes with
+    their timings: [(name, "CALL" | "PUT" | None, seconds)], in priority
+    order. select() then picks the signal:
+
+      priority  first strategy (in priority order) that votes
+      majority  the side with more votes; a tie is no signal
+      weighted  like majority with per-strategy weights (default 1.0)
+      random    a random voting strategy (the old shuffle-and-take-first)
+
+    For majority / weighted the name is the agreeing strategies joined
+    with "+", e.g. "RSI+EMA".
+    """
+
+    def __init__(self, strategies: dict, mode: str = "priority", priority=None, weights=None,
+                 timer=None, rng=random):
+        order = [n for n in (priority or ()) if n in strategies]
+        order += [n for n in strategies if n not in order]
+        self.strategies = [(n, strategies[n]) for n in order]   # name, fn(candles, ctx)
+        self.mode = parse_select(mode)
+        self.weights = dict(weights or {})
+        self.timer = timer           # histogram with a "strategy" label, or None
+        self.rng = rng
+
+    def evaluate(self, candles, ctx=None, enabled=None, on_error=None) -> list:
+        """on_error(name, exception) is called for a strategy that raises; its vote is None."""
+        votes = []
+        clock = time.perf_counter
+        for name, fn in self.strategies:
+            if enabled is not None and name not in enabled:
+                continue
+            t0 = clock()
+            try:
+                direction = fn(candles, ctx)
+            except Exception as e:
+                direction = None
+                if on_error:
+                    on_error(name, e)
+            took = clock() - t0
+            if self.timer is not None:
+                self.timer.observe(took, strategy=name)
+            votes.append((name, direction if direction in ("CALL", "PUT") else None, took))
+        return votes
+
+    def select(self, votes):
+        """(name, direction) from evaluate()'s votes, or (None, None)."""
+        hits = [(name, d) for name, d, _ in votes if d]
+        if not hits:
+            return None, None
+        if self.mode == "priority":
+            return hits[0]
+        if self.mode == "random":
+            return self.rng.choice(hits)
+        weighted = self.mode == "weighted"
+        score = sum((1 if d == "CALL" else -1) * (self.weights.get(name, 1.0) if weighted else 1)
+                    for name, d in hits)
+        if score == 0:
+            return None, None
+        side = "CALL" if score > 0 else "PUT"
+        return "+".join(name for name, d in hits if d == side), side
@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import time
+
+from metrics import REGISTRY
+
+# Lower number = sent first
+PRIORITY_SIGNAL = 0
+PRIORITY_RESULT = 1
+PRIORITY_SUMMARY = 2
+
+SEND_SECONDS = REGISTRY.histogram("telegram_send_seconds", "sendMessage HTTP round trip")
+DELIVERY_SECONDS = REGISTRY.histogram("telegram_delivery_seconds", "Queued until delivered", ("priority",))
+MESSAGES = REGISTRY.counter("telegram_messages_total", "Telegram send outcomes", ("outcome",))
+
+
+class TokenBucket:
+    """Simple token bucket: `rate` tokens/sec, up to `capacity` stored."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (Telegram retry_after)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# =============== Queued Telegram Sender ===============
+class TelegramSender:
+    """
+    One async outbound queue for sendMessage on a pooled aiohttp session.
+    send() only enqueues, so trading tasks never wait on Telegram. A single
+    worker paces messages with a token bucket, honours 429 retry_after and
+    retries network/5xx errors with backoff. Signals go before results,
+    results before summaries.
+    """
+
+    def __init__(self, token: str, chat_id: str, rate: float = 1.0, burst: int = 3,
+                 timeout: float = 15.0, max_backoff: float = 60.0, log=print,
+                 api_url: str = "https://api.telegram.org"):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.log = log
+        self._seq = itertools.count()
+        self._queue = None
+        self._worker = None
+        self._session = None
+        self._backlog = []           # items left over when close() timed out
+        self._current = None         # item being delivered right now
+        self.sent = 0
+        self.retries = 0
+        self.dropped = 0
+        REGISTRY.gauge("telegram_queue_depth", "Messages waiting to be sent", fn=self.depth)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            return
+        self._queue = asyncio.PriorityQueue()
+        for item in self._backlog:
+            self._queue.put_nowait(item)
+        self._backlog = []
+        self._worker = loop.create_task(self._run(), name="telegram-sender")
+
+    def send(self, text: str, priority: int = PRIORITY_RESULT):
+        """Queue a message (already formatted HTML). Never blocks."""
+        self._ensure_started()
+        self._queue.put_nowait((priority, next(self._seq), text, time.monotonic()))
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            import aiohttp   # deferred, see OTCClient._get_session
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            self._current = item
+            try:
+                await self._deliver(item)
+                self._current = None
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item):
+        priority, seq, text, queued_at = item
+        payload = {"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"}
+        backoff = 1.0
+        while True:
+            await self.bucket.take()
+            started = time.monotonic()
+            try:
+                async with self._get_session().post(self.url, data=payload) as resp:
+                    SEND_SECONDS.observe(time.monotonic() - started)
+                    if resp.status == 200:
+                        self.sent += 1
+                        MESSAGES.inc(outcome="sent")
+                        DELIVERY_SECONDS.observe(time.monotonic() - queued_at, priority=priority)
+                        return
+                    body = await resp.text()
+                    if resp.status == 429:
+                        retry_after = 1.0
+                        try:
+                            retry_after = float((await resp.json(content_type=None))
+                                                .get("parameters", {}).get("retry_after", 1))
+                        except Exception:
+                            pass
+                        self.log(f"⏳ Telegram rate limited, retry after {retry_after:.0f}s")
+                        self.bucket.pause(retry_after)
+                        self.retries += 1
+                        MESSAGES.inc(outcome="rate_limited")
+                        continue
+                    if resp.status < 500:
+                        # bad request / forbidden: retrying won't help
+                        self.dropped += 1
+                        MESSAGES.inc(outcome="dropped")
+                        self.log(f"❌ Telegram send error {resp.status}: {body}")
+                        return
+                    self.log(f"❌ Telegram send error {resp.status}: {body} (retrying)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log(f"❌ Telegram send exception: {e} (retrying)")
+            self.retries += 1
+            MESSAGES.inc(outcome="retried")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def close(self, timeout: float = 20.0):
+        """Flush the queue (up to timeout), then stop the worker and session."""
+        if self._worker is not None and not self._worker.done():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                self.log(f"⚠️ Telegram: {self._queue.qsize()} message(s) still queued")
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            if self._current is not None:
+                self._backlog.append(self._current)
+                self._current = None
+            while not self._queue.empty():
+                self._backlog.append(self._queue.get_nowait())
+        self._worker = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
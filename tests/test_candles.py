@@ -0,0 +1,104 @@
+import asyncio
+import datetime
+
+from candle_archive import CandleArchive
+from candle_feed import CandleFeed
+from candle_series import CandleSeries, now_minute
+from candle_store import CandleStore
+
+
+def bars(times, price=1.0):
+    return CandleSeries.from_rows([(t, price, price + 1, price - 1, price) for t in times])
+
+
+def contiguous(s) -> bool:
+    return list(s.t) == list(range(s.t[0], s.t[0] + len(s)))
+
+
+# =============== CandleStore.merge ===============
+def test_merge_overlapping_response_newer_wins():
+    store = CandleStore(100)
+    store.merge("A", bars(range(0, 10), 1.0))
+    store.merge("A", bars(range(5, 15), 2.0))
+    s = store.series("A")
+    assert list(s.t) == list(range(15))
+    assert list(s.c) == [1.0] * 5 + [2.0] * 10
+
+
+def test_merge_out_of_order_response_is_sorted_in():
+    store = CandleStore(100)
+    store.merge("A", bars(range(20, 30)))
+    store.merge("A", bars(range(10, 20), 3.0))
+    s = store.series("A")
+    assert list(s.t) == list(range(10, 30))
+    assert store.get("A", 15)["mid"]["c"] == 3.0
+    assert store.latest_time("A") == 29
+
+
+def test_merge_keeps_holes_and_trims_to_maxlen():
+    store = CandleStore(15)
+    store.merge("A", bars(range(0, 10)))
+    store.merge("A", bars(range(20, 30)))
+    s = store.series("A")
+    assert len(s) == 15
+    assert list(s.t) == list(range(5, 10)) + list(range(20, 30))
+    assert store.get("A", 15) is None
+
+
+# =============== CandleFeed.candles ===============
+class FakeApi:
+    """Newest `count` bars up to the current minute, like /otcx.php."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, asset, count):
+        self.calls.append(count)
+        now = now_minute()
+        return bars(range(now - count + 1, now + 1))
+
+
+def feed_with(api, **kw):
+    return CandleFeed(api.fetch, datetime.timezone.utc, refresh_count=3, **kw)
+
+
+def test_warm_store_only_tops_up_the_tail():
+    api = FakeApi()
+    feed = feed_with(api)
+    now = now_minute()
+    feed.store.merge("A", bars(range(now - 100, now)))
+    window = asyncio.run(feed.candles("A", 60))
+    assert api.calls == [3]
+    assert len(window) == 60 and contiguous(window) and window.t[-1] == now
+
+
+def test_hole_inside_the_window_is_refetched():
+    api = FakeApi()
+    feed = feed_with(api)
+    now = now_minute()
+    # earlier downtime: a hole from now-61 to now-41, then bars up to now-31
+    feed.store.merge("A", bars(list(range(now - 120, now - 61)) + list(range(now - 40, now - 30))))
+    window = asyncio.run(feed.candles("A", 60))
+    assert api.calls == [33, 60]
+    assert len(window) == 60 and contiguous(window) and window.t[-1] == now
+
+
+def test_cold_store_fetches_the_full_window():
+    api = FakeApi()
+    window = asyncio.run(feed_with(api).candles("A", 60))
+    assert api.calls == [60]
+    assert len(window) == 60 and contiguous(window)
+
+
+def test_preload_keeps_only_the_contiguous_tail(tmp_path):
+    archive = CandleArchive(str(tmp_path / "candles.db"))
+    now = now_minute()
+    archive.append("A", bars(list(range(now - 120, now - 61)) + list(range(now - 40, now - 30))), before_t=now)
+    archive.flush()
+    api = FakeApi()
+    feed = feed_with(api, archive=archive)
+    assert feed.preload(["A"]) == 10
+    assert list(feed.store.series("A").t) == list(range(now - 40, now - 30))
+    window = asyncio.run(feed.candles("A", 60))
+    assert len(window) == 60 and contiguous(window)
+    archive.close()
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from candle_series import CandleSeries
+from indicators import EMA, RSI, AssetIndicators, RollingHighLow, ZigZag
+
+
+# =============== Batch References (towesif.py) ===============
+def ema_value(values, period):
+    if len(values) < period:
+        return None
+    k = 2 / (period + 1)
+    ema = sum(values[:period]) / period
+    for price in values[period:]:
+        ema = (price - ema) * k + ema
+    return ema
+
+
+def ema_trend(closes, period):
+    if len(closes) < period + 1:
+        return "NO_DATA"
+    prev, ema = ema_value(closes[:-1], period), ema_value(closes, period)
+    if ema > prev:
+        return "BULLISH"
+    if ema < prev:
+        return "BEARISH"
+    return "NEUTRAL"
+
+
+def rsi_series(closes, period):
+    if len(closes) < period + 1:
+        return None
+    gains = []
+    losses = []
+    for i in range(1, period + 1):
+        diff = closes[-i] - closes[-i - 1]
+        gains.append(max(diff, 0.0))
+        losses.append(abs(min(diff, 0.0)))
+    avg_gain = sum(gains) / period
+    avg_loss = sum(losses) / period
+    if avg_loss == 0:
+        return 100.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def closes_walk(seed, n=200):
+    rng = random.Random(seed)
+    price, out = 1.1, []
+    for i in range(n):
+        # a flat stretch to hit avg_loss == 0 and NEUTRAL trends
+        price += 0.0 if 80 <= i < 95 else rng.uniform(-0.002, 0.002)
+        out.append(round(price, 5))
+    return out
+
+
+# =============== EMA / RSI / RollingHighLow ===============
+@pytest.mark.parametrize("period", [1, 3, 20])
+def test_ema_matches_batch_on_every_prefix(period):
+    closes = closes_walk(period)
+    ema = EMA(period)
+    for n, x in enumerate(closes, 1):
+        assert ema.update(x) == ema_value(closes[:n], period)   # None during warm-up
+        assert ema.trend() == ema_trend(closes[:n], period)
+
+
+@pytest.mark.parametrize("period", [1, 3, 14])
+def test_rsi_matches_batch_on_every_prefix(period):
+    closes = closes_walk(10 + period)
+    rsi = RSI(period, keep=3)
+    for n, x in enumerate(closes, 1):
+        assert rsi.update(x) == rsi_series(closes[:n], period)  # None during warm-up
+        expected = [rsi_series(closes[:m], period) for m in range(max(1, n - 2), n + 1)]
+        assert list(rsi.values) == [v for v in expected if v is not None]
+
+
+@pytest.mark.parametrize("window", [1, 5, 20])
+def test_rolling_high_low_matches_window_max_min(window):
+    rng = random.Random(window)
+    rolling = RollingHighLow(window)
+    highs, lows = [], []
+    for _ in range(150):
+        h = float(rng.randint(1, 6))          # few levels: equal highs / lows
+        highs.append(h)
+        lows.append(h - rng.randint(0, 2))
+        rolling.update(highs[-1], lows[-1])
+        assert rolling.high == max(highs[-window:])
+        assert rolling.low == min(lows[-window:])
+
+
+# =============== AssetIndicators ===============
+def series(start_t, closes):
+    return CandleSeries.from_rows([(start_t + i, c, c + 0.001, c - 0.001, c) for i, c in enumerate(closes)])
+
+
+def state(ind):
+    return ind.ema.value, list(ind.ema.values), list(ind.rsi.values), ind.zz.recent(50), ind.count, ind.last_t
+
+
+def test_sync_on_sliding_windows_matches_one_pass():
+    closes = closes_walk(5, 150)
+    full = series(1000, closes)
+    live = AssetIndicators(20, 3, (12, 0.001, 3))
+    for end in range(60, len(closes) + 1):
+        live.sync(full[end - 60:end])         # what the bot passes: the last 60 closed bars
+    one_pass = AssetIndicators(20, 3, (12, 0.001, 3)).sync(full)
+    assert state(live) == state(one_pass)
+    zz = ZigZag(12, 0.001, 3).feed(full.h, full.l)
+    assert live.zz.recent(50) == zz.recent(50)
+
+
+def test_sync_rebuilds_after_a_gap():
+    closes = closes_walk(6, 120)
+    ind = AssetIndicators(20, 3, (12, 0.001, 3)).sync(series(1000, closes[:60]))
+    after_gap = series(2000, closes[60:])     # last bar seen is no longer in the series
+    ind.sync(after_gap)
+    assert state(ind) == state(AssetIndicators(20, 3, (12, 0.001, 3)).sync(after_gap))
+
+
+def test_sync_is_idempotent():
+    s = series(1000, closes_walk(7, 80))
+    ind = AssetIndicators(20, 3, (12, 0.001, 3)).sync(s)
+    before = state(ind)
+    assert state(ind.sync(s)) == before
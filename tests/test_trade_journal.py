@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from trade_journal import TradeJournal
+
+
+def write_session(path, events):
+    """Journal events through the real writer, then close it like a clean stop."""
+    j = TradeJournal(str(path))
+    for ev, id, fields in events:
+        j.write(ev, id, **fields)
+    asyncio.run(j.close())
+    return j
+
+
+SIGNAL = {"asset": "EURUSD_otc", "signal_time": "2026-10-18T09:00:05+00:00", "direction": "CALL"}
+TRADE = {"time": "15:01", "asset": "EURUSD_otc", "dir": "CALL", "outcome": "WIN"}
+
+
+def test_replay_results_and_open_trades_with_steps(tmp_path):
+    path = tmp_path / "trades.jsonl"
+    write_session(path, [
+        ("signal", "A@1", SIGNAL),
+        ("step", "A@1", {"mtg_step": 0, "candle": "CALL"}),
+        ("result", "A@1", {"trade": TRADE}),
+        ("signal", "B@2", dict(SIGNAL, asset="GBPJPY_otc")),
+        ("step", "B@2", {"mtg_step": 0, "candle": "PUT"}),
+        ("signal", "C@3", dict(SIGNAL, asset="AUDCAD_otc")),
+        ("dropped", "C@3", {}),
+    ])
+    results, open_trades = TradeJournal(str(path)).replay()
+    assert results == [TRADE]
+    assert [t["id"] for t in open_trades] == ["B@2"]
+    assert open_trades[0]["mtg_step"] == 0
+    assert open_trades[0]["steps"] == {0: "PUT"}
+
+
+def test_replay_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "trades.jsonl"
+    write_session(path, [("result", "A@1", {"trade": TRADE}), ("signal", "B@2", SIGNAL)])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"ev": "result", "id": "B@2", "trade": {"ti')      # killed mid-write
+    results, open_trades = TradeJournal(str(path)).replay()
+    assert results == [TRADE]
+    assert [t["id"] for t in open_trades] == ["B@2"]
+
+
+def test_replay_ignores_events_before_since(tmp_path):
+    path = tmp_path / "trades.jsonl"
+    old = time.time() - 2 * 86400
+    with open(path, "w", encoding="utf-8") as f:      # an earlier day's crashed run
+        f.write(json.dumps({"ev": "result", "id": "A@1", "at": old, "trade": TRADE}) + "\n")
+        f.write(json.dumps(dict(SIGNAL, ev="signal", id="B@2", at=old)) + "\n")
+    write_session(path, [("result", "C@3", {"trade": dict(TRADE, outcome="LOSS")})])
+    results, open_trades = TradeJournal(str(path)).replay(since=time.time() - 86400)
+    assert results == [dict(TRADE, outcome="LOSS")]
+    assert open_trades == []
+    assert len(TradeJournal(str(path)).replay()[0]) == 2
+
+
+def test_rotate_keeps_every_session(tmp_path):
+    path = tmp_path / "trades.jsonl"
+    done = []
+    for n in range(3):                                   # same second: names must not collide
+        j = write_session(path, [("result", f"A@{n}", {"trade": dict(TRADE, time=f"15:0{n}")})])
+        done.append(j.rotate())
+    assert len(set(done)) == 3
+    assert not path.exists()
+    assert TradeJournal(str(path)).replay() == ([], [])
+    for n, p in enumerate(done):
+        results, _ = TradeJournal(p).replay()
+        assert results == [dict(TRADE, time=f"15:0{n}")]
+    assert TradeJournal(str(path)).rotate() is None
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from indicators import ZigZag
+
+
+# =============== Reference ===============
+def reference_zigzag(highs, lows, depth, deviation, backstep):
+    """
+    Full-history MT4 ZigZag recomputed from scratch: high/low buffers
+    with the backstep clean-up, then the alternation pass. Returns
+    (marks, pivots): the surviving buffer marks and all pivots.
+    """
+    n = len(highs)
+    marks = {"H": [None] * n, "L": [None] * n}
+    last = {"H": None, "L": None}
+    for i in range(depth - 1, n):
+        for kind, series, extreme in (("H", highs, max), ("L", lows, min)):
+            val = extreme(series[i - depth + 1:i + 1])
+            if val == last[kind]:
+                continue
+            last[kind] = val
+            if abs(series[i] - val) > deviation:
+                continue
+            buf = marks[kind]
+            for back in range(1, backstep + 1):
+                j = i - back
+                if j >= 0 and buf[j] is not None and (buf[j] < val if kind == "H" else buf[j] > val):
+                    buf[j] = None
+            if series[i] == val:
+                buf[i] = val
+    flat = [(i, kind, marks[kind][i]) for i in range(n) for kind in ("H", "L") if marks[kind][i] is not None]
+    return flat, alternate(flat)
+
+
+def alternate(flat):
+    pivots = []
+    for i, kind, price in flat:
+        if pivots and pivots[-1][1] == kind:
+            if price > pivots[-1][2] if kind == "H" else price < pivots[-1][2]:
+                pivots[-1] = (i, kind, price)
+        else:
+            pivots.append((i, kind, price))
+    return pivots
+
+
+def check_every_prefix(highs, lows, depth, deviation, backstep):
+    zz = ZigZag(depth, deviation, backstep, keep=len(highs) + 1)
+    for n in range(1, len(highs) + 1):
+        zz.update(highs[n - 1], lows[n - 1])
+        marks, pivots = reference_zigzag(highs[:n], lows[:n], depth, deviation, backstep)
+        assert zz.recent(len(highs) + 1) == pivots, f"prefix {n}"
+        # marks older than backstep bars can no longer change
+        assert list(zz.pivots) == alternate([m for m in marks if m[0] <= n - 1 - backstep]), f"prefix {n}"
+
+
+# =============== Series ===============
+def random_walk(rng, n, step=1.0):
+    highs, lows = [], []
+    price = 100.0
+    for _ in range(n):
+        price += rng.uniform(-step, step)
+        spread = rng.uniform(0, step)
+        highs.append(price + spread)
+        lows.append(price - spread)
+    return highs, lows
+
+
+def coarse(rng, n, levels=4):
+    """Few distinct price levels: lots of equal highs / lows."""
+    highs = [float(rng.randint(1, levels)) for _ in range(n)]
+    lows = [h - rng.randint(0, 1) for h in highs]
+    return highs, lows
+
+
+PARAMS = [(3, 0.0, 2), (5, 0.5, 3), (12, 5.0, 3), (20, 20.0, 20), (4, 0.0, 6)]
+
+
+# =============== Tests ===============
+@pytest.mark.parametrize("depth,deviation,backstep", PARAMS)
+def test_random_walk_matches_reference(depth, deviation, backstep):
+    rng = random.Random(depth * 100 + backstep)
+    for _ in range(15):
+        highs, lows = random_walk(rng, 120)
+        check_every_prefix(highs, lows, depth, deviation, backstep)
+
+
+@pytest.mark.parametrize("depth,deviation,backstep", PARAMS)
+def test_equal_highs_and_lows_match_reference(depth, deviation, backstep):
+    rng = random.Random(7 + depth)
+    for _ in range(15):
+        highs, lows = coarse(rng, 120)
+        check_every_prefix(highs, lows, depth, deviation, backstep)
+
+
+def test_flat_runs_match_reference():
+    rng = random.Random(3)
+    highs, lows = random_walk(rng, 40)
+    highs += [highs[-1]] * 30 + highs[:20]
+    lows += [lows[-1]] * 30 + lows[:20]
+    for depth, deviation, backstep in PARAMS:
+        check_every_prefix(highs, lows, depth, deviation, backstep)
+    check_every_prefix([1.0] * 50, [1.0] * 50, 5, 0.0, 3)
+
+
+def test_backstep_replaces_weaker_mark():
+    highs = [1.0, 3.0, 2.0, 4.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+    lows = [0.0] * len(highs)
+    zz = ZigZag(2, 0.0, 3).feed(highs, lows)
+    recent = zz.recent(10)
+    assert (1, "H", 3.0) not in recent
+    assert (3, "H", 4.0) in recent
+    check_every_prefix(highs, lows, 2, 0.0, 3)
+
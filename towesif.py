@@ -1,23 +1,36 @@
 import asyncio
 import datetime
-import random   # just strategy shuffle
 import time
 import os
 import sys
-import requests
 import pytz
-import select
-from colorama import Fore, Style, init
-from termcolor import colored
+from scheduler import AssetScheduler
+from otc_client import OTCClient, OTCFetchError
+from candle_feed import CandleFeed
+from candle_archive import CandleArchive
+from telegram_sender import TelegramSender, PRIORITY_SIGNAL, PRIORITY_RESULT, PRIORITY_SUMMARY
+import metrics
+from profiling import ProfilerConsole
+from indicators import AssetIndicators, ZigZag
+from bot_config import ConfigError, Option, load_config, to_env, non_empty, text, pair_list, int_in, float_min
+import sharding
+from trade_stats import TradeStats
+from trade_journal import TradeJournal
+from bot_log import BotLog, parse_level, parse_format
+from strategy_engine import StrategyEngine, parse_select
 
 # =============== Init ===============
-init(autoreset=True)
-
 # Timezone
 TIMEZONE = pytz.timezone('Asia/Dhaka')
 
-# OTC API URL
-OTC_API_URL = "https://freegiveway.net/otcx.php"
+# OTC API URL (env override points the bot at a local fake, see fake_otc.py)
+OTC_API_URL = os.environ.get("OTC_API_URL", "https://freegiveway.net/otcx.php")
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+OTC_CONN_LIMIT = 32          # pooled keep-alive connections (total)
+OTC_TIMEOUT = 15             # seconds per request
+
+# Local candle archive (closed candles, reused on restart); "" = off
+CANDLE_DB = "candles.db"
 
 # ===== Strategy Params (defaults) =====
 RSI_PERIOD = 3
@@ -26,40 +39,53 @@ RSI_OVERBOUGHT = 70
 RSI_MAX_PERIOD = 3           # last up-to 3 candles context allowed
 
 ZIGZAG_DEPTH = 20            # lookback depth
-ZIGZAG_DEVIATION = 20         # price tolerance
-ZIGZAG_BACKSTEP = 20          # bars separation
+ZIGZAG_DEVIATION = 20         # price tolerance of a new extreme
+ZIGZAG_BACKSTEP = 20          # bars over which a new extreme removes weaker swing points
 
 EMA_PERIOD = 20              # legacy EMA
 EMA_TREND_FILTER = True      # keep legacy trend alignment
+EMA_STREAMING = False        # True: O(1) EMA kept per asset (seeded once, values differ slightly from per-window re-seed)
+
+# All enabled strategies are evaluated every scan; this picks the signal (see strategy_engine.py)
+STRATEGY_SELECT = "priority" # priority | majority | weighted | random (old shuffle-and-take-first)
+STRATEGY_PRIORITY = ["RSI", "ZIGZAG", "COLOR_PATTERN", "EMA"]
+STRATEGY_WEIGHTS = {"RSI": 1.0, "ZIGZAG": 1.0, "COLOR_PATTERN": 1.0, "EMA": 1.0}
+
+# Max pairs processed at the same time (each pair still runs one trade at a time)
+MAX_CONCURRENT_ASSETS = 8
+FETCH_CONCURRENCY = 16        # candle requests in flight during a scan
+
+# Metrics: Prometheus text at http://127.0.0.1:<port>/metrics (0 = off) + JSON snapshot ("" = off)
+METRICS_PORT = 9108
+METRICS_JSON = "metrics.json"
+METRICS_EVERY = 30           # seconds between JSON snapshots
+PROFILE_DIR = "profiles"     # console 'prof' / 'mem' / 'stall' reports go here
+STRATEGY_SECONDS = metrics.REGISTRY.histogram(
+    "strategy_eval_seconds", "Strategy evaluation time", ("strategy",),
+    buckets=(1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 0.01, 0.05),
+)
+ENTRY_SLACK = metrics.REGISTRY.histogram(
+    "signal_entry_slack_seconds", "Signal queued until the entry minute starts (negative = late)",
+    buckets=(-10, -5, -1, 0, 5, 10, 20, 30, 40, 50, 60),
+)
 
 # ===== Trade Result Storage =====
-TRADE_HISTORY = []           # list of dicts: {"time","asset","dir","outcome"}
-
-# =============== Pretty Console Helpers ===============
-def rainbow(text: str) -> str:
-    cols = [Fore.RED, Fore.YELLOW, Fore.GREEN, Fore.CYAN, Fore.BLUE, Fore.MAGENTA]
-    return ''.join(cols[i % len(cols)] + ch for i, ch in enumerate(text)) + Style.RESET_ALL
-
-def banner(text: str): print(rainbow(text))
-def ok(text: str): print(colored(text, "cyan", attrs=["bold"]))
-def info(text: str): print(colored(text, "magenta", attrs=["bold"]))
-def warn(text: str): print(colored(text, "yellow", attrs=["bold"]))
-def err(text: str): print(colored(text, "red", attrs=["bold"]))
-
-# =============== User Inputs (Colorful) ===============
-banner("⚙️  DARKHYDRA V3 — Real Candle Result Engine (OTC Version)")
-TELEGRAM_BOT_TOKEN = input(rainbow("🤖 Enter your Telegram Bot Token: ")).strip()
-TELEGRAM_CHAT_ID = input(rainbow("💬 Enter your Telegram Chat ID: ")).strip()
-TAG_USER_ID = input(rainbow("🏷️ Enter Tag User ID (@username or numeric id): ")).strip()
-
-# Pair input system
-pairs_input = input(rainbow("📊 Enter your OTC Pairs (comma separated): ")).strip()
-ASSETS = [p.strip() for p in pairs_input.split(",") if p.strip()]
-
-# === New: strategy selection (comma or 'all') ===
-strats_raw = input(
-    rainbow("🧠 Strategies to use (comma or 'all') [RSI,ZIGZAG,COLOR,EMA]: ")
-).strip().lower()
+TRADE_WINDOW = 500           # recent trades kept in memory for the summary listing
+TRADE_SPILL = "trades_rolled.jsonl"   # older ones are appended here when the journal is off ("" = drop)
+TRADE_JOURNAL = "trades_journal.jsonl"  # every signal / MTG step / result; replayed after a crash ("" = off)
+RESUME_MAX_AGE = 60          # minutes: open trades older than this are not resumed after a restart
+STATS = TradeStats(TRADE_WINDOW, "" if TRADE_JOURNAL else TRADE_SPILL)
+metrics.REGISTRY.gauge("trades", "Resolved trades this session", ("outcome",),
+                       fn=lambda: {("WIN",): STATS.wins, ("LOSS",): STATS.losses})
+
+# =============== Console Log ===============
+# Queued and written by a background thread; level / format come from the settings below
+# (--log-level info = quiet: no per-poll / per-pair chatter, --log-format color|plain|json)
+LOG = BotLog(colors={"info": "magenta", "debug": "magenta"})
+debug, info, ok, warn, err, banner = LOG.debug, LOG.info, LOG.ok, LOG.warn, LOG.err, LOG.banner
+
+# =============== Settings (CLI / env / config file / prompts) ===============
+ALL_STRATS = ["RSI", "ZIGZAG", "COLOR_PATTERN", "EMA"]
 
 def _norm_name(s: str) -> str:
     s = s.strip().lower()
@@ -69,105 +95,125 @@ def _norm_name(s: str) -> str:
     if s in ("rsi","r"): return "RSI"
     return ""
 
-if strats_raw in ("", "all", "a"):
-    ENABLED_STRATS = ["RSI", "ZIGZAG", "COLOR_PATTERN", "EMA"]
-else:
-    ENABLED_STRATS = [ _norm_name(x) for x in strats_raw.split(",") ]
-    ENABLED_STRATS = [ x for x in ENABLED_STRATS if x ]  # drop unknowns
-    if not ENABLED_STRATS:
-        ENABLED_STRATS = ["RSI", "ZIGZAG", "COLOR_PATTERN", "EMA"]
+def parse_strategies(v) -> list:
+    """Comma list or 'all'; unknown names are dropped, nothing left = all."""
+    items = v if isinstance(v, list) else str(v).split(",")
+    if [str(x).strip().lower() for x in items] in ([""], ["all"], ["a"]):
+        return list(ALL_STRATS)
+    names = [n for n in (_norm_name(str(x)) for x in items) if n]
+    return [n for n in ALL_STRATS if n in names] if names else list(ALL_STRATS)
+
+OPTIONS = [
+    Option("token", "🤖 Enter your Telegram Bot Token: ", "TELEGRAM_BOT_TOKEN", non_empty),
+    Option("chat_id", "💬 Enter your Telegram Chat ID: ", "TELEGRAM_CHAT_ID", non_empty),
+    Option("tag", "🏷️ Enter Tag User ID (@username or numeric id): ", "TAG_USER_ID", text, default=""),
+    Option("pairs", "📊 Enter your OTC Pairs (comma separated): ", "OTC_PAIRS", pair_list),
+    Option("strategies", "🧠 Strategies to use (comma or 'all') [RSI,ZIGZAG,COLOR,EMA]: ", "STRATEGIES",
+           parse_strategies, default=ALL_STRATS),
+    Option("zigzag_depth", f"🔧 ZigZag depth [{ZIGZAG_DEPTH}]: ", "ZIGZAG_DEPTH", int_in(1), default=ZIGZAG_DEPTH),
+    Option("zigzag_deviation", f"🔧 ZigZag deviation [{ZIGZAG_DEVIATION}]: ", "ZIGZAG_DEVIATION",
+           float_min(0), default=ZIGZAG_DEVIATION),
+    Option("zigzag_backstep", f"🔧 ZigZag backstep [{ZIGZAG_BACKSTEP}]: ", "ZIGZAG_BACKSTEP",
+           int_in(0), default=ZIGZAG_BACKSTEP),
+    Option("strategy_select", None, "STRATEGY_SELECT", parse_select, default=STRATEGY_SELECT,
+           help="signal pick when several strategies vote: priority | majority | weighted | random"),
+    Option("shards", None, "BOT_SHARDS", int_in(0), default=0,
+           help="worker processes, each scanning a slice of the pairs (0/1 = single process)"),
+    Option("log_level", None, "BOT_LOG_LEVEL", parse_level, default="debug",
+           help="console detail: debug | info (quiet) | warn | error"),
+    Option("log_format", None, "BOT_LOG_FORMAT", parse_format, default="auto",
+           help="console output: auto | color | plain | json"),
+]
 
-# === New: ZigZag params from user (blank = default) ===
+banner("⚙️  DARKHYDRA V3 — Real Candle Result Engine (OTC Version)")
 try:
-    _depth = input(rainbow(f"🔧 ZigZag depth [{ZIGZAG_DEPTH}]: ")).strip()
-    if _depth: ZIGZAG_DEPTH = int(_depth)
-    _dev = input(rainbow(f"🔧 ZigZag deviation [{ZIGZAG_DEVIATION}]: ")).strip()
-    if _dev: ZIGZAG_DEVIATION = float(_dev)
-    _back = input(rainbow(f"🔧 ZigZag backstep [{ZIGZAG_BACKSTEP}]: ")).strip()
-    if _back: ZIGZAG_BACKSTEP = int(_back)
-except Exception as _:
-    warn("Using default ZigZag params.")
+    CONFIG = load_config(
+        OPTIONS, argv=sys.argv[1:] if __name__ == "__main__" else [],
+        ask=lambda prompt: input(LOG.prompt(prompt)), warn=warn,
+        description="DARKHYDRA V3 OTC signal bot",
+    )
+except ConfigError as e:
+    err(f"❌ {e}")
+    sys.exit(2)
+LOG.configure(CONFIG["log_level"], CONFIG["log_format"])
+
+TELEGRAM_BOT_TOKEN = CONFIG["token"]
+TELEGRAM_CHAT_ID = CONFIG["chat_id"]
+TAG_USER_ID = CONFIG["tag"]
+ASSETS = CONFIG["pairs"]
+ENABLED_STRATS = CONFIG["strategies"]
+ZIGZAG_DEPTH = CONFIG["zigzag_depth"]
+ZIGZAG_DEVIATION = CONFIG["zigzag_deviation"]
+ZIGZAG_BACKSTEP = CONFIG["zigzag_backstep"]
+STRATEGY_SELECT = CONFIG["strategy_select"]
+SHARDS = CONFIG["shards"]
+
+# Shard worker (started by a --shards supervisor): own slice of pairs, metrics port and files
+SHARD = sharding.worker_shard()
+if SHARD is not None:
+    ASSETS = sharding.shard_of(ASSETS, SHARD[0], SHARD[1])
+    METRICS_PORT = METRICS_PORT and METRICS_PORT + 1 + SHARD[0]
+    METRICS_JSON = METRICS_JSON and f"metrics.shard{SHARD[0]}.json"
+    PROFILE_DIR = os.path.join(PROFILE_DIR, f"shard{SHARD[0]}")
+    TRADE_JOURNAL = TRADE_JOURNAL and f"trades_journal.shard{SHARD[0]}.jsonl"
+    LOG.context["shard"] = SHARD[0]
+
+JOURNAL = TradeJournal(TRADE_JOURNAL) if TRADE_JOURNAL else None
 
 # =============== OTC Data Fetching ===============
-def fetch_otc_candles(instrument: str, count: int = 60):
+OTC = OTCClient(OTC_API_URL, TIMEZONE, limit=OTC_CONN_LIMIT, timeout=OTC_TIMEOUT)
+
+async def fetch_otc_candles(instrument: str, count: int = 60):
     """
-    Fetch OTC candles from the API. Returns list of dicts with keys:
-    time (str 'YYYY-MM-DD HH:MM:SS'), mid{o,h,l,c}, complete=True
+    Fetch OTC candles from the API. Returns a CandleSeries (columns t,o,h,l,c);
+    candles[i] still supports the old dict access: time, mid{o,h,l,c}, complete.
     """
     try:
-        params = {"pair": instrument, "count": count}
-        r = requests.get(OTC_API_URL, params=params, timeout=15)
-        data = r.json()
-        if "data" not in data:
-            err(f"❌ No data for {instrument}")
-            return []
-        candles = []
-        for item in data["data"]:
-            dt_str = item["time"]
-            if "T" in dt_str:
-                dt_str = dt_str.replace("T", " ").split(".")[0]
-            if len(dt_str) == 16:  # "YYYY-MM-DD HH:MM"
-                dt_str += ":00"
-            candles.append({
-                "time": dt_str,
-                "mid": {
-                    "o": str(item["open"]),
-                    "h": str(item["high"]),
-                    "l": str(item["low"]),
-                    "c": str(item["close"]),
-                },
-                "complete": True
-            })
-        return candles
+        return await OTC.fetch_candles(instrument, count)
+    except OTCFetchError as e:
+        err(f"❌ {e}")
+        return []
     except Exception as e:
         err(f"❌ Fetch error for {instrument}: {e}")
         return []
 
-def last_completed_candle(instrument: str):
-    c = fetch_otc_candles(instrument, count=3)
+# Shared candle buffer: every reader below is served from it
+ARCHIVE = CandleArchive(CANDLE_DB) if CANDLE_DB else None
+FEED = CandleFeed(fetch_otc_candles, TIMEZONE, archive=ARCHIVE, timing=OTC.timing)
+
+async def last_completed_candle(instrument: str):
+    c = await FEED.candles(instrument, count=3)
     c = only_closed(c or [])
     return c[-1] if c else None
 
 # =============== Candle Time Helpers (to avoid running candle) ===============
-def _parse_ts(s: str) -> datetime.datetime:
-    # normalize various formats
-    s = s.replace("T", " ").split(".")[0]
-    if len(s) == 16:  # "YYYY-MM-DD HH:MM"
-        s += ":00"
-    dt = datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-    return TIMEZONE.localize(dt)
-
-def is_candle_closed(candle) -> bool:
+def only_closed(candles):
     """
-    A candle is considered closed if now >= candle_time + 1 minute.
-    Ensures we never analyze the running candle.
+    Return only fully closed candles. Candles are oldest first, so only
+    the newest ones can still be running; a bar opening at minute t is
+    closed once the server's current minute is past t (one clock read
+    for the whole batch).
+    Slicing keeps the series type.
     """
-    ct = _parse_ts(candle["time"])
-    now = datetime.datetime.now(TIMEZONE)
-    return now >= ct + datetime.timedelta(minutes=1)
-
-def only_closed(candles):
-    """Return only fully closed candles."""
-    return [c for c in candles if is_candle_closed(c)]
+    now_min = FEED.now_minute()
+    n = len(candles)
+    while n and candles.t[n - 1] >= now_min:
+        n -= 1
+    return candles[:n]
 
 # =============== Telegram Sender (Always Bold) ===============
-async def send_telegram_message_bold(message: str):
+if SHARD is None:
+    TELEGRAM = TelegramSender(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, api_url=TELEGRAM_API_URL, log=warn)
+else:
+    # a worker's messages go through the supervisor's sender
+    TELEGRAM = sharding.ShardLink(SHARD[0], SHARD[2], on_command=lambda line: CONSOLE.handle(line),
+                                  on_lost=sharding.stop_self, log=warn)
+
+async def send_telegram_message_bold(message: str, priority: int = PRIORITY_RESULT):
     """
-    Send Telegram message using official Web API (requests).
+    Queue Telegram message for the background sender (pooled, rate limited).
     """
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    text = f"<b>{message}</b>"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": text,
-        "parse_mode": "HTML"
-    }
-    try:
-        resp = await asyncio.to_thread(requests.post, url, data=payload, timeout=15)
-        if resp.status_code != 200:
-            print(f"❌ Telegram send error {resp.status_code}: {resp.text}")
-    except Exception as e:
-        print(f"❌ Telegram send exception: {e}")
+    TELEGRAM.send(f"<b>{message}</b>", priority)
 
 # =============== OTC Helpers ===============
 def candle_direction(candle) -> str:
@@ -179,26 +225,31 @@ def candle_direction(candle) -> str:
     elif c < o: return "PUT"
     else: return "FLAT"
 
-def get_candle_at_time(instrument: str, target_time: datetime.datetime, retries: int = 90, sleep_s: float = 1.0):
+async def wait_for_candle(asset: str, minute: datetime.datetime, trade_id: str = None, mtg_step: int = 0):
     """
-    Poll until we find a candle for the specific target time.
+    Wait (without blocking other tasks) for the candle opening at `minute`.
+    With trade_id the outcome is journaled as that trade's MTG step.
     """
-    target_str = target_time.astimezone(TIMEZONE).strftime("%Y-%m-%d %H:%M:00")
-    for i in range(retries):
-        info(f"Attempt {i+1}/{retries} to get candle for {target_str}")
-        candles = fetch_otc_candles(instrument, count=12)
-        if candles:
-            for candle in candles:
-                candle_time = candle.get("time", "")
-                # Normalize if any 'T'
-                if "T" in candle_time:
-                    candle_time = candle_time.replace("T", " ").split(".")[0]
-                if target_str in candle_time:
-                    info(f"✅ Found candle for {target_str}: {candle_time}")
-                    return candle
-        time.sleep(sleep_s)
-    err(f"❌ Could not find candle for {target_str} after {retries} attempts")
-    return None
+    on_poll = None if LOG.quiet else lambda attempt, key: debug(f"Attempt {attempt} to get candle for {key}")
+    candle = await FEED.wait_for_candle(asset, minute, on_poll=on_poll)
+    key = FEED.minute_key(minute)
+    if candle:
+        debug(f"✅ Found candle for {key}: {candle['time']}")
+    else:
+        err(f"❌ Could not find candle for {key} after {FEED.timeout:.0f}s")
+    if trade_id and JOURNAL is not None:
+        JOURNAL.write("step", trade_id, mtg_step=mtg_step, candle=candle_direction(candle) if candle else None)
+    return candle
+
+async def step_direction(asset: str, minute: datetime.datetime, trade_id: str, mtg_step: int, seen=None):
+    """
+    Direction of a trade step's candle, None if it never showed up.
+    seen: mtg_step -> direction journaled before a restart (not waited for again).
+    """
+    if seen and mtg_step in seen:
+        return seen[mtg_step]
+    candle = await wait_for_candle(asset, minute, trade_id, mtg_step)
+    return candle_direction(candle) if candle else None
 
 # =============== Indicators / Strategies ===============
 def ema_value(values, period=EMA_PERIOD):
@@ -214,22 +265,18 @@ def calculate_ema_trend(candles, period=EMA_PERIOD):
     """Return (ema_value, trend) where trend in {BULLISH, BEARISH, NEUTRAL, NO_DATA}"""
     if len(candles) < (period + 1):
         return None, "NO_DATA"
-    closes = [float(c["mid"]["c"]) for c in candles]
-    # compute EMA up to last 2 points for direction
+    closes = candles.c
+    # only the last 2 EMA points are needed for the direction
     k = 2 / (period + 1)
-    ema_list = []
-    ema = sum(closes[:period]) / period
-    ema_list.append(ema)
+    ema = prev = sum(closes[:period]) / period
     for price in closes[period:]:
+        prev = ema
         ema = (price - ema) * k + ema
-        ema_list.append(ema)
-    if len(ema_list) < 2:
-        return ema_list[-1], "NEUTRAL"
-    if ema_list[-1] > ema_list[-2]:
-        return ema_list[-1], "BULLISH"
-    if ema_list[-1] < ema_list[-2]:
-        return ema_list[-1], "BEARISH"
-    return ema_list[-1], "NEUTRAL"
+    if ema > prev:
+        return ema, "BULLISH"
+    if ema < prev:
+        return ema, "BEARISH"
+    return ema, "NEUTRAL"
 
 def rsi_series(closes, period=RSI_PERIOD):
     """Compute RSI only for the most recent point based on Wilder's method (simple last-step)."""
@@ -248,14 +295,22 @@ def rsi_series(closes, period=RSI_PERIOD):
     rs = avg_gain / avg_loss
     return 100 - (100 / (1 + rs))
 
-def rsi_strategy(candles):
+def rsi_strategy(candles, ind=None):
     """
     If RSI < 30 within last up-to RSI_MAX_PERIOD bars -> CALL
     If RSI > 70 within last up-to RSI_MAX_PERIOD bars -> PUT
+    ind: AssetIndicators synced to candles (reuses its last RSI values)
     """
-    closes = [float(c["mid"]["c"]) for c in candles]
+    closes = candles.c
     if len(closes) < RSI_PERIOD + RSI_MAX_PERIOD:
         return None
+    if ind is not None:
+        for rsi in reversed(ind.rsi.values):
+            if rsi < RSI_OVERSOLD:
+                return "CALL"
+            if rsi > RSI_OVERBOUGHT:
+                return "PUT"
+        return None
     # Evaluate RSI at last t offsets (0=last, 1=prev, ... up to MAX_PERIOD-1)
     for back in range(RSI_MAX_PERIOD):
         sub = closes[:len(closes) - back]
@@ -268,38 +323,32 @@ def rsi_strategy(candles):
             return "PUT"
     return None
 
-def zigzag_strategy(candles, depth=12, deviation=5, backstep=3):
+def zigzag_strategy(candles, depth=12, deviation=5, backstep=3, ind=None):
     """
-    ZigZag strategy with depth, deviation, backstep.
-    Detect reversal at pivot candle[-2].
-    - If pivot high is MAX high within depth & last close < pivot close -> PUT
-    - If pivot low  is MIN low within depth & last close > pivot close -> CALL
+    ZigZag reversal at the pivot candle[-2] (see indicators.ZigZag):
+    - [-2] is a swing high (new `depth`-bar high, not undercut within
+      `backstep` bars, kept by the high/low alternation) & last close < pivot close -> PUT
+    - [-2] is a swing low likewise & last close > pivot close -> CALL
+    ind: AssetIndicators synced to candles (reuses its ZigZag state and pivots)
     """
     if len(candles) < depth + backstep:
         return None
 
-    window = candles[-depth:]
-    pivot = candles[-2]
-    last = candles[-1]
-
-    pivot_high = float(pivot["mid"]["h"])
-    pivot_low  = float(pivot["mid"]["l"])
-    pivot_close = float(pivot["mid"]["c"])
-    last_close  = float(last["mid"]["c"])
-
-    highs = [float(c["mid"]["h"]) for c in window]
-    lows  = [float(c["mid"]["l"]) for c in window]
+    if ind is not None and ind.zz.params == (depth, deviation, backstep):
+        zz = ind.zz
+    else:
+        zz = ZigZag(depth, deviation, backstep, keep=2).feed(candles.h, candles.l)
 
-    # --- Apply deviation filter (absolute price tolerance) ---
-    max_high = max(highs)
-    min_low  = min(lows)
+    kinds = [kind for i, kind, _ in zz.recent(2) if i == zz.n - 2]
+    pivot_close = candles.c[-2]
+    last_close  = candles.c[-1]
 
     # top reversal
-    if pivot_high >= (max_high - deviation) and last_close < pivot_close:
+    if "H" in kinds and last_close < pivot_close:
         return "PUT"
 
     # bottom reversal
-    if pivot_low <= (min_low + deviation) and last_close > pivot_close:
+    if "L" in kinds and last_close > pivot_close:
         return "CALL"
 
     return None
@@ -308,6 +357,9 @@ def color_of(candle):
     d = candle_direction(candle)
     return "GREEN" if d == "CALL" else ("RED" if d == "PUT" else "DOJI")
 
+def _color(o, c):
+    return "GREEN" if c > o else ("RED" if c < o else "DOJI")
+
 def color_pattern_strategy(candles):
     """
     Predict 5th candle based on last 4:
@@ -316,21 +368,24 @@ def color_pattern_strategy(candles):
     """
     if len(candles) < 4:
         return None
-    last4 = candles[-4:]
-    colors = [color_of(c) for c in last4]
+    colors = [_color(o, c) for o, c in zip(candles.o[-4:], candles.c[-4:])]
     if colors == ["RED", "GREEN", "RED", "GREEN"]:
         return "PUT"
     if colors == ["GREEN", "RED", "GREEN", "RED"]:
         return "CALL"
     return None
 
-def ema_strategy(candles):
+def ema_strategy(candles, ind=None):
     """
     Legacy EMA filter strategy:
     - Get last candle direction (CALL/PUT) from real body.
     - Only allow if aligns with EMA20 trend.
+    ind: AssetIndicators synced to candles (used when EMA_STREAMING is on)
     """
-    ema_val, trend = calculate_ema_trend(candles, period=EMA_PERIOD)
+    if ind is not None and EMA_STREAMING:
+        trend = ind.ema.trend()
+    else:
+        ema_val, trend = calculate_ema_trend(candles, period=EMA_PERIOD)
     if trend in ("NO_DATA", "NEUTRAL"):
         return None
     last_candle = candles[-1]
@@ -344,36 +399,29 @@ def ema_strategy(candles):
             return None
     return dir_
 
-# =============== Strategy Priority Selector ===============
-def choose_strategy(asset, candles, enabled, zz_depth, zz_dev, zz_back):
+# =============== Strategy Selector ===============
+STRATEGIES = {
+    "RSI":           lambda cs, ind: rsi_strategy(cs, ind),
+    "ZIGZAG":        lambda cs, ind: zigzag_strategy(cs, ZIGZAG_DEPTH, ZIGZAG_DEVIATION, ZIGZAG_BACKSTEP, ind),
+    "COLOR_PATTERN": lambda cs, ind: color_pattern_strategy(cs),
+    "EMA":           lambda cs, ind: ema_strategy(cs, ind),
+}
+ENGINE = StrategyEngine(STRATEGIES, STRATEGY_SELECT, STRATEGY_PRIORITY, STRATEGY_WEIGHTS, timer=STRATEGY_SECONDS)
+
+def choose_strategy(asset, candles, enabled, ind=None):
     """
-    Shuffle enabled strategies once per analysis and pick first valid signal.
+    Run every enabled strategy once on the closed candles and pick the
+    signal by STRATEGY_SELECT. Returns (strategy_name, direction).
+    candles: CandleSeries of closed bars; ind: AssetIndicators synced to it.
     """
-    all_map = {
-        "RSI":          (lambda cs: rsi_strategy(cs), "RSI"),
-        "ZIGZAG":       (lambda cs: zigzag_strategy(cs, zz_depth, zz_dev, zz_back), "ZIGZAG"),
-        "COLOR_PATTERN":(lambda cs: color_pattern_strategy(cs), "COLOR_PATTERN"),
-        "EMA":          (lambda cs: ema_strategy(cs), "EMA"),
-    }
-
-    # Filter to enabled only
-    pairs = [all_map[name] for name in all_map if name in enabled]
-
-    # Shuffle order
-    random.shuffle(pairs)
-
-    for fn, name in pairs:
-        try:
-            direction = fn(candles)
-        except Exception as e:
-            warn(f"{asset}: {name} error: {e}")
-            continue
-        if direction in ("CALL", "PUT"):
-            info(f"✅ {asset}: {name} strategy → {direction}")
-            return name, direction
-
-    warn(f"ℹ️ {asset}: No strategy matched.")
-    return None, None
+    votes = ENGINE.evaluate(candles, ind, enabled, on_error=lambda name, e: warn(f"{asset}: {name} error: {e}"))
+    name, direction = ENGINE.select(votes)
+    debug(lambda: f"🗳️ {asset}: " + ", ".join(f"{n} {d or '-'} ({t * 1e6:.0f} µs)" for n, d, t in votes))
+    if direction:
+        debug(f"✅ {asset}: {name} strategy → {direction}")
+    else:
+        debug(f"ℹ️ {asset}: No strategy matched.")
+    return name, direction
 
 # =============== Formatting (Your Styles) ===============
 def format_signal(asset: str, signal_time: datetime.datetime, direction: str, taguserid: str) -> str:
@@ -420,11 +468,10 @@ def format_result(asset: str, signal_time: datetime.datetime, direction: str, ou
 """.strip()
 
 def format_summary():
-    wins = sum(1 for r in TRADE_HISTORY if r["outcome"]=="WIN")
-    losses = sum(1 for r in TRADE_HISTORY if r["outcome"]=="LOSS")
-    total = len(TRADE_HISTORY)
-    wr = round((wins/total)*100, 1) if total>0 else 0.0
-    lines = [f"{r['time']} - {r['asset']} - {r['dir']}  {'☑' if r['outcome']=='WIN' else '✖'}" for r in TRADE_HISTORY]
+    wins, losses, wr = STATS.wins, STATS.losses, STATS.win_rate()
+    lines = [f"{r['time']} - {r['asset']} - {r['dir']}  {'☑' if r['outcome']=='WIN' else '✖'}" for r in STATS.recent]
+    if STATS.rolled:
+        lines.insert(0, f"… {STATS.rolled} earlier trades")
     summary = "\n".join(lines) if lines else "(no trades)"
     return f"""
 〄•━‼️𝗗𝗔𝗥𝗞𝗕𝗬𝗧𝗘 𝗥𝗘𝗦𝗨𝗟𝗧𝗦 ‼️━•〄
@@ -436,36 +483,89 @@ def format_summary():
 """.strip()
 
 # =============== Core Signal Generation ===============
-def generate_signal_for_asset(asset: str):
+INDICATORS = {}              # asset -> AssetIndicators (fed once per closed candle)
+
+def indicators_for(asset: str) -> AssetIndicators:
+    ind = INDICATORS.get(asset)
+    zigzag = (ZIGZAG_DEPTH, ZIGZAG_DEVIATION, ZIGZAG_BACKSTEP)
+    if ind is None or ind.zigzag != zigzag:
+        ind = AssetIndicators(EMA_PERIOD, RSI_PERIOD, zigzag, keep=max(RSI_MAX_PERIOD, 2))
+        INDICATORS[asset] = ind
+    return ind
+
+async def generate_signal_for_asset(asset: str):
     """
-    Use multi-strategy priority to decide direction.
+    Evaluate the enabled strategies and pick a direction (STRATEGY_SELECT).
     Returns (direction, base_candle_used_for_time_ref, strategy_name)
     """
-    raw = fetch_otc_candles(asset, count=60)
+    raw = await FEED.candles(asset, count=60)
     candles = only_closed(raw)  # <<< NEW: only closed candles
     if not candles or len(candles) < 25:
         warn(f"⚠️ {asset}: Not enough closed data.")
         return None, None, None
 
-    strat_name, direction = choose_strategy(
-        asset,
-        candles,
-        ENABLED_STRATS,
-        ZIGZAG_DEPTH,
-        ZIGZAG_DEVIATION,
-        ZIGZAG_BACKSTEP
-    )
+    strat_name, direction = choose_strategy(asset, candles, ENABLED_STRATS, indicators_for(asset).sync(candles))
     if not direction:
         return None, candles[-1], None
 
     return direction, candles[-1], strat_name
 
 # =============== Trade Process ===============
+def trade_id(asset: str, signal_time: datetime.datetime) -> str:
+    return f"{asset}@{int(signal_time.timestamp())}"
+
+def replay_journal(scheduler=None):
+    """
+    After a crash: rebuild today's STATS from the journal and (with a
+    scheduler) finish the trades that were still open, from the MTG step
+    they had reached, with stored/fetched candles.
+    """
+    started = time.perf_counter()
+    today = datetime.datetime.now(TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+    results, open_trades = JOURNAL.replay(since=today.timestamp())
+    if SHARD is None:
+        for trade in results:
+            STATS.add(trade)
+    resumed = 0
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for sig in open_trades if scheduler is not None else ():
+        signal_time = datetime.datetime.fromisoformat(sig["signal_time"])
+        if (now - signal_time).total_seconds() > RESUME_MAX_AGE * 60:
+            warn(f"⚠️ {sig['asset']}: open trade from {signal_time.astimezone(TIMEZONE):%H:%M} is too old to resume")
+            JOURNAL.write("dropped", sig["id"])
+            continue
+        job = lambda s=sig, t=signal_time: resolve_trade(s["asset"], t, s["direction"], s.get("strategy", ""),
+                                                          seen=s.get("steps"))
+        if scheduler.submit(sig["asset"], job):
+            resumed += 1
+    if results or open_trades:
+        info(f"📒 Journal: {len(results)} results replayed, {resumed} open trades resumed "
+             f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+def record_result(asset: str, signal_time: datetime.datetime, direction: str, outcome: str,
+                  mtg_step: int = 0, strategy: str = "", log=info):
+    """Announce, journal and store one resolved trade (a shard worker hands it to the supervisor)."""
+    trade = {
+        "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
+        "asset": asset, "dir": direction, "outcome": outcome, "strategy": strategy, "mtg_step": mtg_step,
+    }
+    if JOURNAL is not None:
+        JOURNAL.write("result", trade_id(asset, signal_time), trade=trade)
+    if SHARD is not None:
+        TELEGRAM.result(asset=asset, signal_time=signal_time.isoformat(), direction=direction,
+                        outcome=outcome, mtg_step=mtg_step, strategy=strategy)
+        log(f"🏁 {asset}: {direction} {outcome} (MTG {mtg_step})")
+        return
+    STATS.add(trade)
+    res_msg = format_result(asset, signal_time, direction, outcome, TAG_USER_ID, mtg_step=mtg_step)
+    log("\n" + res_msg + "\n")
+    TELEGRAM.send(f"<b>{res_msg}</b>", PRIORITY_RESULT)
+
 async def process_asset(asset: str):
     # 1) Generate signal using priority strategies (based on last CLOSED candle set)
-    direction, base_candle, strat_name = generate_signal_for_asset(asset)
+    direction, base_candle, strat_name = await generate_signal_for_asset(asset)
     if not direction:
-        warn(f"⚠️ {asset}: No clear signal. Skipping.")
+        debug(f"⚠️ {asset}: No clear signal. Skipping.")
         return
 
     # Signal time = now (when we alert)
@@ -474,120 +574,230 @@ async def process_asset(asset: str):
     # Announce Signal
     sig_msg = format_signal(asset, signal_time, direction, TAG_USER_ID)
     ok("\n" + sig_msg + "\n")
-    await send_telegram_message_bold(sig_msg)
+    await send_telegram_message_bold(sig_msg, PRIORITY_SIGNAL)
+    if JOURNAL is not None:
+        JOURNAL.write("signal", trade_id(asset, signal_time), asset=asset, signal_time=signal_time.isoformat(),
+                      direction=direction, strategy=strat_name)
+
+    trade_place_time = (signal_time + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
+    ENTRY_SLACK.observe((trade_place_time - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    # the result wait runs after the scheduler has released this pair's slot
+    return resolve_trade(asset, signal_time, direction, strat_name)
+
+async def resolve_trade(asset: str, signal_time: datetime.datetime, direction: str, strat_name: str = '',
+                        seen=None):
+    """
+    Wait for the trade candle (and MTG candles) and record the outcome; also
+    resumes journaled trades (seen: the step directions journaled so far).
+    """
+    tid = trade_id(asset, signal_time)
 
     # 2) Determine trade candle time (signal +1 minute) and wait till it's available
     trade_place_time = (signal_time + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
-    info(f"⏳ Waiting trade candle at {trade_place_time.astimezone(TIMEZONE)} for {asset}...")
-    trade_candle = get_candle_at_time(asset, trade_place_time, retries=120, sleep_s=2.0)
+    debug(f"⏳ Waiting trade candle at {trade_place_time.astimezone(TIMEZONE)} for {asset}...")
+    trade_dir = await step_direction(asset, trade_place_time, tid, 0, seen)
 
-    if not trade_candle:
+    if not trade_dir:
         err(f"❌ {asset}: Could not get trade candle in time.")
-        res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=0)
-        info("\n" + res_msg + "\n")
-        await send_telegram_message_bold(res_msg)
-        TRADE_HISTORY.append({
-            "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-            "asset": asset, "dir": direction, "outcome": "LOSS"
-        })
+        record_result(asset, signal_time, direction, "LOSS", mtg_step=0, strategy=strat_name)
         return
 
-    trade_dir = candle_direction(trade_candle)
-    info(f"Trade candle direction: {trade_dir}, Signal: {direction}")
+    debug(f"Trade candle direction: {trade_dir}, Signal: {direction}")
 
     if (direction == "CALL" and trade_dir == "CALL") or (direction == "PUT" and trade_dir == "PUT"):
         # WIN non-MTG
-        res_msg = format_result(asset, signal_time, direction, "WIN", TAG_USER_ID, mtg_step=0)
-        info("\n" + res_msg + "\n")
-        await send_telegram_message_bold(res_msg)
-        TRADE_HISTORY.append({
-            "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-            "asset": asset, "dir": direction, "outcome": "WIN"
-        })
+        record_result(asset, signal_time, direction, "WIN", mtg_step=0, strategy=strat_name)
         return
     else:
         # 3) MTG1: next candle
         mtg_time = trade_place_time + datetime.timedelta(minutes=1)
-        info(f"🧪 MTG1: wait candle at {mtg_time.astimezone(TIMEZONE)} for {asset} ...")
-        mtg1_candle = get_candle_at_time(asset, mtg_time, retries=120, sleep_s=2.0)
-        if not mtg1_candle:
+        debug(f"🧪 MTG1: wait candle at {mtg_time.astimezone(TIMEZONE)} for {asset} ...")
+        mtg1_dir = await step_direction(asset, mtg_time, tid, 1, seen)
+        if not mtg1_dir:
             err(f"❌ {asset}: MTG1 candle not found.")
-            res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=1)
-            info("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "LOSS"
-            })
+            record_result(asset, signal_time, direction, "LOSS", mtg_step=1, strategy=strat_name)
             return
 
-        mtg1_dir = candle_direction(mtg1_candle)
-        info(f"MTG1 candle direction: {mtg1_dir}, Signal: {direction}")
+        debug(f"MTG1 candle direction: {mtg1_dir}, Signal: {direction}")
         if (direction == "CALL" and mtg1_dir == "CALL") or (direction == "PUT" and mtg1_dir == "PUT"):
-            res_msg = format_result(asset, signal_time, direction, "WIN", TAG_USER_ID, mtg_step=1)
-            info("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "WIN"
-            })
+            record_result(asset, signal_time, direction, "WIN", mtg_step=1, strategy=strat_name)
         else:
-            res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=1)
-            info("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "LOSS"
-            })
+            record_result(asset, signal_time, direction, "LOSS", mtg_step=1, strategy=strat_name)
 
-# =============== Scheduler + OFF Command ===============
-async def main_loop():
-    asset_index = 0
-    while True:
-        # OFF command (non-blocking)
-        try:
-            if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                cmd = sys.stdin.readline().strip().lower()
-                if cmd == "off":
-                    summary = format_summary()
-                    ok("\n" + summary + "\n")
-                    await send_telegram_message_bold(summary)
-                    break
-        except Exception:
-            # Some environments may not support select on stdin; ignore
-            pass
+async def end_journal():
+    """Clean end of the session: move the journal aside so the next start begins empty."""
+    if JOURNAL is not None:
+        await JOURNAL.close()
+        done = JOURNAL.rotate()
+        if done:
+            info(f"📒 Journal saved as {done}")
 
-        now = datetime.datetime.now(TIMEZONE)
-        banner(f"⏰ Current time: {now.strftime('%Y-%m-%d %H:%M:%S')} | Scanning...")
-
-        # Process one asset per cycle (round-robin)
-        asset = ASSETS[asset_index]
-        info(f"📊 Processing {asset}...")
-        await process_asset(asset)
+# =============== Scheduler + OFF Command ===============
+# stdin commands: off + profiling (prof / mem / stall on|off|dump, see profiling.py)
+CONSOLE = ProfilerConsole(PROFILE_DIR, log=info)
 
-        # Next asset
-        asset_index = (asset_index + 1) % len(ASSETS)
+async def start_metrics():
+    """Start the /metrics endpoint and the JSON snapshot task (either may be off)."""
+    runner = snapshots = None
+    if METRICS_PORT:
+        try:
+            runner = await metrics.serve(port=METRICS_PORT)
+            ok(f"📈 Metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            warn(f"⚠️ Metrics endpoint disabled: {e}")
+    if METRICS_JSON:
+        snapshots = asyncio.create_task(metrics.snapshot_loop(METRICS_JSON, METRICS_EVERY))
+    return runner, snapshots
+
+async def stop_metrics(runner, snapshots):
+    if snapshots is not None:
+        snapshots.cancel()
+        metrics.REGISTRY.write_json(METRICS_JSON)
+    if runner is not None:
+        await runner.cleanup()
 
-        # Sleep to align roughly to minute boundary
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-        sleep_secs = 60 - (now_utc.second)
-        if sleep_secs < 5:
-            sleep_secs += 60
-        info(f"🕒 Sleeping ~{sleep_secs}s to align with next M1 window...")
-        await asyncio.sleep(sleep_secs)
+async def main_loop():
+    scheduler = AssetScheduler(
+        process_asset,
+        max_concurrent=MAX_CONCURRENT_ASSETS,
+        on_error=lambda a, e: err(f"❌ {a}: task error: {e}"),
+        on_start=lambda a, queued: debug(f"📊 Processing {a}... (queued {queued * 1000:.0f} ms)"),
+    )
+    if ARCHIVE is not None:
+        bars = FEED.preload(ASSETS)
+        info(f"💾 Loaded {bars} archived candles for {len(ASSETS)} pairs")
+    if JOURNAL is not None:
+        replay_journal(scheduler)
+    metrics_runner, metrics_snapshots = await start_metrics()
+    if SHARD is not None:
+        TELEGRAM.start()
+        info(f"🧩 Shard {SHARD[0]}/{SHARD[1]}: {len(ASSETS)} pairs")
+    console = asyncio.create_task(CONSOLE.run(), name="console")
+    info("⌨️ Console: type 'help' for profiling commands")
+    try:
+        while True:
+            # OFF command (non-blocking; profiling commands are handled by CONSOLE)
+            cmd = CONSOLE.pop()
+            if cmd == "stats":
+                info(STATS.report())
+            elif cmd == "off":
+                summary = format_summary()
+                ok("\n" + summary + "\n")
+                await send_telegram_message_bold(summary, PRIORITY_SUMMARY)
+                await end_journal()
+                break
+
+            now = datetime.datetime.now(TIMEZONE)
+            banner(f"⏰ Current time: {now.strftime('%Y-%m-%d %H:%M:%S')} | Scanning...")
+
+            # Pairs still resolving a trade are skipped
+            idle = []
+            for asset in ASSETS:
+                if scheduler.busy(asset):
+                    debug(f"⏳ {asset}: trade still running, skip this scan.")
+                else:
+                    idle.append(asset)
+
+            # Fetch idle pairs together; each pair's task starts as its candles land
+            slowest, slowest_s = None, 0.0
+            async for asset, _, took in FEED.candles_many(idle, count=60, concurrency=FETCH_CONCURRENCY):
+                if took > slowest_s:
+                    slowest, slowest_s = asset, took
+                scheduler.submit(asset)
+            if slowest:
+                info(f"📡 Fetched {len(idle)} pairs, slowest {slowest} {slowest_s * 1000:.0f} ms")
+
+            fs = OTC.flight.stats()
+            info(f"🔁 OTC requests: {fs['upstream']} sent, {fs['shared']} shared ({fs['saved_pct']}% saved)")
+
+            ts = OTC.timing.snapshot()
+            info(f"🕰️ Server clock {ts['clock_offset_s']:+.2f}s, candle publish lag ~{ts['lag_s']:.2f}s")
+
+            # Wake just after the next bar should be published (server clock)
+            sleep_secs = OTC.timing.until_next_minute() + OTC.timing.lag() + OTC.timing.margin
+            if sleep_secs < 5:
+                sleep_secs += 60
+            debug(f"🕒 Sleeping ~{sleep_secs:.1f}s to align with next M1 window...")
+            await asyncio.sleep(sleep_secs)
+    finally:
+        console.cancel()
+        CONSOLE.stalls.stop()
+        await stop_metrics(metrics_runner, metrics_snapshots)
+        await OTC.close()
+        await TELEGRAM.close()
+        if ARCHIVE is not None:
+            ARCHIVE.close()
+        STATS.close()
+        if JOURNAL is not None:
+            await JOURNAL.close()
+
+# =============== Sharded Mode (Supervisor) ===============
+def on_shard_result(msg: dict):
+    record_result(msg["asset"], datetime.datetime.fromisoformat(msg["signal_time"]),
+                  msg["direction"], msg["outcome"], msg.get("mtg_step", 0), msg.get("strategy", ""))
+
+async def supervise():
+    """
+    --shards N: N worker processes each scan and resolve a slice of ASSETS.
+    This process sends every Telegram message and keeps STATS,
+    so results and the summary cover all pairs.
+    """
+    sup = sharding.ShardSupervisor(
+        os.path.abspath(__file__), SHARDS, dict(to_env(OPTIONS, CONFIG), BOT_SHARDS="0"),
+        on_send=TELEGRAM.send, on_result=on_shard_result, log=info, echo=LOG.raw,
+    )
+    metrics_runner, metrics_snapshots = await start_metrics()
+    console = asyncio.create_task(CONSOLE.run(), name="console")
+    if JOURNAL is not None:
+        replay_journal()
+    await sup.start()
+    info(f"🧩 {len(ASSETS)} pairs over {SHARDS} workers. Console: off, shards, restart <n>, shard <n> <command>")
+    try:
+        while True:
+            cmd = CONSOLE.pop()
+            if cmd == "stats":
+                info(STATS.report())
+            elif cmd == "off":
+                await sup.stop()     # workers flush their results first
+                summary = format_summary()
+                ok("\n" + summary + "\n")
+                await send_telegram_message_bold(summary, PRIORITY_SUMMARY)
+                await end_journal()
+                break
+            elif cmd and not sup.handle(cmd):
+                warn(f"Unknown command: {cmd}")
+                info(sharding.HELP)
+            await asyncio.sleep(0.25)
+    finally:
+        console.cancel()
+        CONSOLE.stalls.stop()
+        await sup.stop()
+        await stop_metrics(metrics_runner, metrics_snapshots)
+        await OTC.close()
+        await TELEGRAM.close()
+        if ARCHIVE is not None:
+            ARCHIVE.close()
+        STATS.close()
+        if JOURNAL is not None:
+            await JOURNAL.close()
 
 # =============== Entry ===============
 if __name__ == "__main__":
     try:
-        asyncio.run(main_loop())
+        asyncio.run(supervise() if SHARDS > 1 and SHARD is None else main_loop())
     except KeyboardInterrupt:
         warn("\n👋 Exiting gracefully...")
+        if SHARD is not None:
+            asyncio.run(end_journal())
+            raise SystemExit(0)      # the supervisor sends the combined summary
         # On Ctrl+C also send summary
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             summ = format_summary()
             ok("\n" + summ + "\n")
-            loop.run_until_complete(send_telegram_message_bold(summ))
+            loop.run_until_complete(send_telegram_message_bold(summ, PRIORITY_SUMMARY))
+            loop.run_until_complete(TELEGRAM.close())
+            loop.run_until_complete(end_journal())
         except Exception:
             pass
\ No newline at end of file
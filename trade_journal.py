@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import time
+
+
+# =============== Crash-Safe Trade Journal ===============
+class TradeJournal:
+    """
+    Append-only JSON lines log of every signal, MTG step and result of the
+    current session. write() only buffers; a background task appends and
+    fsyncs the batch every `flush_every` seconds in a worker thread, so
+    trading tasks never wait on the disk (a hard kill loses at most that
+    window). replay() rebuilds the session after a crash; rotate() closes
+    the session on a clean exit so the next start begins empty.
+
+    Events (all carry "ev", "id" and "at"):
+      signal  asset, signal_time (ISO, UTC), direction, strategy
+      step    mtg_step, candle (direction of the candle, or null if missing)
+      result  trade (the dict given to TradeStats.add)
+      dropped (an open trade that could not be resumed)
+    """
+
+    def __init__(self, path: str, flush_every: float = 0.5):
+        self.path = path
+        self.flush_every = flush_every
+        self._buf = []
+        self._file = None
+        self._lock = None
+        self._worker = None
+        self.written = 0
+
+    def write(self, ev: str, id: str, **fields):
+        self._buf.append(json.dumps(dict(fields, ev=ev, id=id, at=round(time.time(), 3)),
+                                    ensure_ascii=False))
+        self._ensure_started()
+
+    def _ensure_started(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return                   # no loop (shutdown path): close()/rotate() write it
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            return
+        self._lock = asyncio.Lock()
+        self._worker = loop.create_task(self._run(), name="trade-journal")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_every)
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if self._buf:
+                lines, self._buf = self._buf, []
+                await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.written += len(lines)
+
+    def replay(self, since: float = None):
+        """
+        Read the journal back: (results, open_trades). results are the
+        trade dicts in order; open_trades are signal events with no result
+        yet, with the last journaled mtg_step and "steps" (mtg_step ->
+        candle direction) if any. Events before `since` (epoch seconds,
+        e.g. an earlier day's crashed run) are ignored. A torn last line
+        from a crash is skipped.
+        """
+        results, open_trades = [], {}
+        try:
+            f = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            return results, []
+        with f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                if since is not None and e.get("at", 0) < since:
+                    continue
+                ev = e.get("ev")
+                if ev == "signal":
+                    open_trades[e["id"]] = e
+                elif ev == "step" and e["id"] in open_trades:
+                    sig = open_trades[e["id"]]
+                    sig["mtg_step"] = e.get("mtg_step")
+                    sig.setdefault("steps", {})[e.get("mtg_step")] = e.get("candle")
+                elif ev == "result":
+                    open_trades.pop(e["id"], None)
+                    results.append(e["trade"])
+                elif ev == "dropped":
+                    open_trades.pop(e["id"], None)
+        return results, list(open_trades.values())
+
+    async def close(self):
+        """Stop the background task and write what's buffered."""
+        if self._worker is not None and not self._worker.done():
+            await self.flush()       # also waits for a batch already being written
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._sync_close()
+
+    def _sync_close(self):
+        if self._buf:
+            lines, self._buf = self._buf, []
+            self._append(lines)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotate(self):
+        """
+        End the session (after close()): move the journal aside as
+        <name>-YYYYmmdd-HHMMSS.jsonl (-1, -2 ... if that exists already).
+        Returns the new path, or None.
+        """
+        self._sync_close()
+        if not os.path.exists(self.path):
+            return None
+        root, ext = os.path.splitext(self.path)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        done, n = f"{root}-{stamp}{ext}", 0
+        while os.path.exists(done):
+            n += 1
+            done = f"{root}-{stamp}-{n}{ext}"
+        os.replace(self.path, done)
+        return done
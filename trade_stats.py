@@ -0,0 +1,80 @@
+import json
+from collections import deque
+
+
+# =============== Running Trade Statistics ===============
+class TradeStats:
+    """
+    Session results, updated once per resolved trade instead of rescanning
+    a growing list: totals plus win/loss counters per asset, strategy, MTG
+    step and entry hour. Only the last `window` trades are kept in memory
+    (for the summary listing); older ones are appended to `spill` as JSON
+    lines, so memory stays flat over multi-day sessions.
+    """
+
+    def __init__(self, window: int = 500, spill: str = None):
+        self.window = max(1, int(window))
+        self.spill = spill           # JSON lines file for rolled-off trades ("" / None = drop them)
+        self.recent = deque()        # trade dicts: time, asset, dir, outcome, strategy, mtg_step
+        self.wins = 0
+        self.losses = 0
+        self.rolled = 0              # trades no longer in `recent`
+        self.by_asset = {}           # key -> [wins, losses]
+        self.by_strategy = {}
+        self.by_mtg = {}
+        self.by_hour = {}
+        self._spill_file = None
+
+    @property
+    def total(self) -> int:
+        return self.wins + self.losses
+
+    def win_rate(self) -> float:
+        return round(self.wins / self.total * 100, 1) if self.total else 0.0
+
+    def add(self, trade: dict):
+        """trade: time ("HH:MM" entry), asset, dir, outcome (WIN/LOSS), optional strategy, mtg_step."""
+        col = 0 if trade["outcome"] == "WIN" else 1
+        if col == 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        for table, key in ((self.by_asset, trade["asset"]),
+                           (self.by_strategy, trade.get("strategy") or "-"),
+                           (self.by_mtg, trade.get("mtg_step", 0)),
+                           (self.by_hour, trade["time"][:2])):
+            counts = table.get(key)
+            if counts is None:
+                counts = table[key] = [0, 0]
+            counts[col] += 1
+        self.recent.append(trade)
+        if len(self.recent) > self.window:
+            self._roll(self.recent.popleft())
+
+    def _roll(self, trade: dict):
+        self.rolled += 1
+        if not self.spill:
+            return
+        if self._spill_file is None:
+            self._spill_file = open(self.spill, "a", encoding="utf-8", buffering=1)
+        self._spill_file.write(json.dumps(trade, ensure_ascii=False) + "\n")
+
+    def report(self) -> str:
+        """Console breakdown (per strategy / MTG step / hour / asset)."""
+        lines = [f"Trades: {self.total} (WIN {self.wins} / LOSS {self.losses}, {self.win_rate()}%)"
+                 + (f", {self.rolled} rolled off to {self.spill or 'nowhere'}" if self.rolled else "")]
+        for title, table in (("strategy", self.by_strategy), ("MTG step", self.by_mtg),
+                             ("hour", self.by_hour), ("asset", self.by_asset)):
+            if not table:
+                continue
+            lines.append(f"  by {title}:")
+            by_key = table is self.by_mtg or table is self.by_hour
+            order = (lambda kv: str(kv[0])) if by_key else (lambda kv: (-sum(kv[1]), str(kv[0])))
+            for key, (w, l) in sorted(table.items(), key=order):
+                lines.append(f"    {str(key):<14} {w:5d} W {l:5d} L  {w / (w + l) * 100:5.1f}%")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -4,12 +4,20 @@ import random
 import time
 import os
 import sys
-import requests
 import pytz
-import select
-from colorama import Fore, Style, init
-from termcolor import colored
 import html
+from scheduler import AssetScheduler
+from otc_client import OTCClient, OTCFetchError
+from candle_feed import CandleFeed
+from candle_archive import CandleArchive
+from telegram_sender import TelegramSender, PRIORITY_SIGNAL, PRIORITY_RESULT, PRIORITY_SUMMARY
+import metrics
+from profiling import ProfilerConsole
+from bot_config import ConfigError, Option, load_config, to_env, non_empty, text, pair_list, int_in
+import sharding
+from trade_stats import TradeStats
+from trade_journal import TradeJournal
+from bot_log import BotLog, parse_level, parse_format
 
 expiry_date = datetime.datetime(2025, 10, 30)  # Set your expiry date here
 
@@ -18,144 +26,157 @@ if datetime.datetime.now() > expiry_date:
     exit()
 
 # =============== Init ===============
-init(autoreset=True)
-
 # Timezone
 TIMEZONE = pytz.timezone('Asia/Dhaka')
 
-# OTC API URL
-OTC_API_URL = "https://freegiveway.net/otcx.php"
+# OTC API URL (env override points the bot at a local fake, see fake_otc.py)
+OTC_API_URL = os.environ.get("OTC_API_URL", "https://freegiveway.net/otcx.php")
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+OTC_CONN_LIMIT = 32          # pooled keep-alive connections (total)
+OTC_TIMEOUT = 15             # seconds per request
+
+# Local candle archive (closed candles, reused on restart); "" = off
+CANDLE_DB = "candles.db"
+
+# Max pairs processed at the same time (each pair still runs one trade at a time)
+MAX_CONCURRENT_ASSETS = 8
+FETCH_CONCURRENCY = 16        # candle requests in flight during a scan
+
+# Metrics: Prometheus text at http://127.0.0.1:<port>/metrics (0 = off) + JSON snapshot ("" = off)
+METRICS_PORT = 9108
+METRICS_JSON = "metrics.json"
+METRICS_EVERY = 30           # seconds between JSON snapshots
+PROFILE_DIR = "profiles"     # console 'prof' / 'mem' / 'stall' reports go here
+STRATEGY_SECONDS = metrics.REGISTRY.histogram(
+    "strategy_eval_seconds", "Strategy evaluation time", ("strategy",),
+    buckets=(1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 0.01, 0.05),
+)
+ENTRY_SLACK = metrics.REGISTRY.histogram(
+    "signal_entry_slack_seconds", "Signal queued until the entry minute starts (negative = late)",
+    buckets=(-10, -5, -1, 0, 5, 10, 20, 30, 40, 50, 60),
+)
 
 # ===== Trade Result Storage =====
-TRADE_HISTORY = []           # list of dicts: {"time","asset","dir","outcome"}
-
-# =============== Pretty Console Helpers ===============
-def rainbow(text: str) -> str:
-    cols = [Fore.RED, Fore.YELLOW, Fore.GREEN, Fore.CYAN, Fore.BLUE, Fore.MAGENTA]
-    return ''.join(cols[i % len(cols)] + ch for i, ch in enumerate(text)) + Style.RESET_ALL
+TRADE_WINDOW = 500           # recent trades kept in memory for the summary listing
+TRADE_SPILL = "trades_rolled.jsonl"   # older ones are appended here when the journal is off ("" = drop)
+TRADE_JOURNAL = "trades_journal.jsonl"  # every signal / MTG step / result; replayed after a crash ("" = off)
+RESUME_MAX_AGE = 60          # minutes: open trades older than this are not resumed after a restart
+STATS = TradeStats(TRADE_WINDOW, "" if TRADE_JOURNAL else TRADE_SPILL)
+metrics.REGISTRY.gauge("trades", "Resolved trades this session", ("outcome",),
+                       fn=lambda: {("WIN",): STATS.wins, ("LOSS",): STATS.losses})
+
+# =============== Console Log ===============
+# Queued and written by a background thread; level / format come from the settings below
+# (--log-level info = quiet: no per-poll / per-pair chatter, --log-format color|plain|json)
+LOG = BotLog()
+debug, info, ok, warn, err, banner = LOG.debug, LOG.info, LOG.ok, LOG.warn, LOG.err, LOG.banner
+
+# =============== Settings (CLI / env / config file / prompts) ===============
+OPTIONS = [
+    Option("name", "BOT NAME :", "BOT_NAME", text, default=""),
+    Option("token", "🤖 Enter your Telegram Bot Token: ", "TELEGRAM_BOT_TOKEN", non_empty),
+    Option("chat_id", "💬 Enter your Telegram Chat ID: ", "TELEGRAM_CHAT_ID", non_empty),
+    Option("tag", "🏷️ Enter Tag User ID (@username or numeric id): ", "TAG_USER_ID", text, default=""),
+    Option("pairs", "📊 Enter your OTC Pairs (comma separated): ", "OTC_PAIRS", pair_list),
+    Option("mtg_step", "🔢 Enter MTG Step (0, 1, or 2): ", "MTG_STEP", int_in(0, 2), default=0),
+    Option("shards", None, "BOT_SHARDS", int_in(0), default=0,
+           help="worker processes, each scanning a slice of the pairs (0/1 = single process)"),
+    Option("log_level", None, "BOT_LOG_LEVEL", parse_level, default="debug",
+           help="console detail: debug | info (quiet) | warn | error"),
+    Option("log_format", None, "BOT_LOG_FORMAT", parse_format, default="auto",
+           help="console output: auto | color | plain | json"),
+]
 
-def banner(text: str): print(rainbow(text))
-def ok(text: str): print(colored(text, "cyan", attrs=["bold"]))
-def info(text: str): print(colored(text, "white", attrs=["bold"]))
-def warn(text: str): print(colored(text, "yellow", attrs=["bold"]))
-def err(text: str): print(colored(text, "red", attrs=["bold"]))
-
-
-# =============== User Inputs (Colorful) ===============
 banner("⚙️  XHUNTER  V3 — Real Candle Result Engine (OTC Version)")
-name = input(rainbow("BOT NAME :")).strip()
-TELEGRAM_BOT_TOKEN = input(rainbow("🤖 Enter your Telegram Bot Token: ")).strip()
-TELEGRAM_CHAT_ID = input(rainbow("💬 Enter your Telegram Chat ID: ")).strip()
-TAG_USER_ID = input(rainbow("🏷️ Enter Tag User ID (@username or numeric id): ")).strip()
-
-# Pair input system
-pairs_input = input(rainbow("📊 Enter your OTC Pairs (comma separated): ")).strip()
-ASSETS = [p.strip() for p in pairs_input.split(",") if p.strip()]
-
-# MTG Step input
-MTG_STEP = int(input(rainbow("🔢 Enter MTG Step (0, 1, or 2): ")).strip())
-if MTG_STEP not in [0, 1, 2]:
-    warn("⚠️ Invalid MTG Step. Using default: 0")
-    MTG_STEP = 0
+try:
+    CONFIG = load_config(
+        OPTIONS, argv=sys.argv[1:] if __name__ == "__main__" else [],
+        ask=lambda prompt: input(LOG.prompt(prompt)), warn=warn,
+        description="XHUNTER V3 OTC signal bot",
+    )
+except ConfigError as e:
+    err(f"❌ {e}")
+    sys.exit(2)
+LOG.configure(CONFIG["log_level"], CONFIG["log_format"])
+
+name = CONFIG["name"]
+TELEGRAM_BOT_TOKEN = CONFIG["token"]
+TELEGRAM_CHAT_ID = CONFIG["chat_id"]
+TAG_USER_ID = CONFIG["tag"]
+ASSETS = CONFIG["pairs"]
+MTG_STEP = CONFIG["mtg_step"]
+SHARDS = CONFIG["shards"]
+
+# Shard worker (started by a --shards supervisor): own slice of pairs, metrics port and files
+SHARD = sharding.worker_shard()
+if SHARD is not None:
+    ASSETS = sharding.shard_of(ASSETS, SHARD[0], SHARD[1])
+    METRICS_PORT = METRICS_PORT and METRICS_PORT + 1 + SHARD[0]
+    METRICS_JSON = METRICS_JSON and f"metrics.shard{SHARD[0]}.json"
+    PROFILE_DIR = os.path.join(PROFILE_DIR, f"shard{SHARD[0]}")
+    TRADE_JOURNAL = TRADE_JOURNAL and f"trades_journal.shard{SHARD[0]}.jsonl"
+    LOG.context["shard"] = SHARD[0]
+
+JOURNAL = TradeJournal(TRADE_JOURNAL) if TRADE_JOURNAL else None
 
 info(f"✅ Using MTG Step: {MTG_STEP}")
 
 # =============== OTC Data Fetching ===============
-def fetch_otc_candles(instrument: str, count: int = 60):
+OTC = OTCClient(OTC_API_URL, TIMEZONE, limit=OTC_CONN_LIMIT, timeout=OTC_TIMEOUT)
+
+async def fetch_otc_candles(instrument: str, count: int = 60):
     """
-    Fetch OTC candles from the API. Returns list of dicts with keys:
-    time (str 'YYYY-MM-DD HH:MM:SS'), mid{o,h,l,c}, complete=True
+    Fetch OTC candles from the API. Returns a CandleSeries (columns t,o,h,l,c);
+    candles[i] still supports the old dict access: time, mid{o,h,l,c}, complete.
     """
     try:
-        params = {"pair": instrument, "count": count}
-        r = requests.get(OTC_API_URL, params=params, timeout=15)
-        
-        # Check if response is empty or not JSON
-        if not r.content:
-            err(f"❌ Empty response for {instrument}")
-            return []
-            
-        # Try to parse JSON
-        try:
-            data = r.json()
-        except requests.exceptions.JSONDecodeError:
-            err(f"❌ Invalid JSON response for {instrument}: {r.text[:100]}")
-            return []
-            
-        if "data" not in data:
-            err(f"❌ No data for {instrument}")
-            return []
-            
-        candles = []
-        for item in data["data"]:
-            dt_str = item["time"]
-            if "T" in dt_str:
-                dt_str = dt_str.replace("T", " ").split(".")[0]
-            if len(dt_str) == 16:  # "YYYY-MM-DD HH:MM"
-                dt_str += ":00"
-            candles.append({
-                "time": dt_str,
-                "mid": {
-                    "o": str(item["open"]),
-                    "h": str(item["high"]),
-                    "l": str(item["low"]),
-                    "c": str(item["close"]),
-                },
-                "complete": True
-            })
-        return candles
+        return await OTC.fetch_candles(instrument, count)
+    except OTCFetchError as e:
+        err(f"❌ {e}")
+        return []
     except Exception as e:
         err(f"❌ Fetch error for {instrument}: {e}")
         return []
 
-def last_completed_candle(instrument: str):
-    c = fetch_otc_candles(instrument, count=3)
+# Shared candle buffer: every reader below is served from it
+ARCHIVE = CandleArchive(CANDLE_DB) if CANDLE_DB else None
+FEED = CandleFeed(fetch_otc_candles, TIMEZONE, archive=ARCHIVE, timing=OTC.timing)
+
+async def last_completed_candle(instrument: str):
+    c = await FEED.candles(instrument, count=3)
     c = only_closed(c or [])
     return c[-1] if c else None
 
 # =============== Candle Time Helpers (to avoid running candle) ===============
 
-def _parse_ts(s: str) -> datetime.datetime:
-    # normalize various formats
-    s = s.replace("T", " ").split(".")[0]
-    if len(s) == 16:  # "YYYY-MM-DD HH:MM"
-        s += ":00"
-    dt = datetime.datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-    return TIMEZONE.localize(dt)
-
-def is_candle_closed(candle) -> bool:
+def only_closed(candles):
     """
-    A candle is considered closed if now >= candle_time + 1 minute.
-    Ensures we never analyze the running candle.
+    Return only fully closed candles. Candles are oldest first, so only
+    the newest ones can still be running; a bar opening at minute t is
+    closed once the server's current minute is past t (one clock read
+    for the whole batch).
+    Slicing keeps the series type.
     """
-    ct = _parse_ts(candle["time"])
-
-    now = datetime.datetime.now(TIMEZONE)
-    return now >= ct + datetime.timedelta(minutes=1)
-
-def only_closed(candles):
-    """Return only fully closed candles."""
-    return [c for c in candles if is_candle_closed(c)]
+    now_min = FEED.now_minute()
+    n = len(candles)
+    while n and candles.t[n - 1] >= now_min:
+        n -= 1
+    return candles[:n]
 
 # =============== Telegram Sender (Always Bold) ===============
-async def send_telegram_message_bold(message: str):
+if SHARD is None:
+    TELEGRAM = TelegramSender(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, api_url=TELEGRAM_API_URL, log=warn)
+else:
+    # a worker's messages go through the supervisor's sender
+    TELEGRAM = sharding.ShardLink(SHARD[0], SHARD[2], on_command=lambda line: CONSOLE.handle(line),
+                                  on_lost=sharding.stop_self, log=warn)
+
+async def send_telegram_message_bold(message: str, priority: int = PRIORITY_RESULT):
     """
-    Send Telegram message to Telegram chat in bold text.
+    Queue Telegram message to Telegram chat in bold text (sent in the background).
     """
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     # Escape message safely for HTML, then wrap in bold
-    safe_message = f"<b>{html.escape(message)}</b>"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": safe_message,
-        "parse_mode": "HTML"
-    }
-    try:
-        resp = await asyncio.to_thread(requests.post, url, data=payload, timeout=15)
-        if resp.status_code != 200:
-            print(f"❌ Telegram send error {resp.status_code}: {resp.text}")
-    except Exception as e:
-        print(f"❌ Telegram send exception: {e}")
+    TELEGRAM.send(f"<b>{html.escape(message)}</b>", priority)
 
 # =============== OTC Helpers ===============
 def candle_direction(candle) -> str:
@@ -167,26 +188,31 @@ def candle_direction(candle) -> str:
     elif c < o: return "PUT"
     else: return "FLAT"
 
-def get_candle_at_time(instrument: str, target_time: datetime.datetime, retries: int = 90, sleep_s: float = 1.0):
+async def wait_for_candle(asset: str, minute: datetime.datetime, trade_id: str = None, mtg_step: int = 0):
     """
-    Poll until we find a candle for the specific target time.
+    Wait (without blocking other tasks) for the candle opening at `minute`.
+    With trade_id the outcome is journaled as that trade's MTG step.
     """
-    target_str = target_time.astimezone(TIMEZONE).strftime("%Y-%m-%d %H:%M:00")
-    for i in range(retries):
-        info(f"CANDEL MOVE ...{i+1}/{retries}")
-        candles = fetch_otc_candles(instrument, count=12)
-        if candles:
-            for candle in candles:
-                candle_time = candle.get("time", "")
-                # Normalize if any 'T'
-                if "T" in candle_time:
-                    candle_time = candle_time.replace("T", " ").split(".")[0]
-                if target_str in candle_time:
-                    ok(f"✅ Found candle for {target_str}: {candle_time}")
-                    return candle
-        time.sleep(sleep_s)
-    err(f"❌ Could not find candle for {target_str} after {retries} attempts")
-    return None
+    on_poll = None if LOG.quiet else lambda attempt, key: debug(f"CANDEL MOVE ...{attempt} ({key})")
+    candle = await FEED.wait_for_candle(asset, minute, on_poll=on_poll)
+    key = FEED.minute_key(minute)
+    if candle:
+        debug(f"✅ Found candle for {key}: {candle['time']}")
+    else:
+        err(f"❌ Could not find candle for {key} after {FEED.timeout:.0f}s")
+    if trade_id and JOURNAL is not None:
+        JOURNAL.write("step", trade_id, mtg_step=mtg_step, candle=candle_direction(candle) if candle else None)
+    return candle
+
+async def step_direction(asset: str, minute: datetime.datetime, trade_id: str, mtg_step: int, seen=None):
+    """
+    Direction of a trade step's candle, None if it never showed up.
+    seen: mtg_step -> direction journaled before a restart (not waited for again).
+    """
+    if seen and mtg_step in seen:
+        return seen[mtg_step]
+    candle = await wait_for_candle(asset, minute, trade_id, mtg_step)
+    return candle_direction(candle) if candle else None
 
 # =============== 3-Candle Trend Strategy ===============
 def get_trend(open_price, close_price):
@@ -197,14 +223,14 @@ def get_trend(open_price, close_price):
     else:
         return "DOJI"
 
-def generate_3candle_signal(asset: str):
+async def generate_3candle_signal(asset: str):
     """
     Generate signal based on last 3 candle trends.
     Returns (direction, base_candle)
     """
     try:
         # Fetch last 3 candles
-        candles = fetch_otc_candles(asset, count=3)
+        candles = await FEED.candles(asset, count=3)
         if not candles or len(candles) < 3:
             warn(f"⚠️ {asset}: Not enough data for 3-candle analysis.")
             return None, None
@@ -212,27 +238,23 @@ def generate_3candle_signal(asset: str):
         # Take last 3 candles
         last_3 = candles[-3:]
         
-        # Detect trends
-        trends = []
-        for candle in last_3:
-            open_price = float(candle["mid"]["o"])
-            close_price = float(candle["mid"]["c"])
-            trend = get_trend(open_price, close_price)
-            trends.append(trend)
-        
-        # Count UP and DOWN
-        up_count = trends.count("UP")
-        down_count = trends.count("DOWN")
+        with STRATEGY_SECONDS.time(strategy="3CANDLE"):
+            # Detect trends
+            trends = [get_trend(o, c) for o, c in zip(last_3.o, last_3.c)]
+
+            # Count UP and DOWN
+            up_count = trends.count("UP")
+            down_count = trends.count("DOWN")
         
         # Final Signal
         if up_count > down_count:
             direction = "CALL"
-            info(f"✅ {asset}: 3-Candle UPTREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
+            debug(f"✅ {asset}: 3-Candle UPTREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
         elif down_count > up_count:
             direction = "PUT"
-            info(f"✅ {asset}: 3-Candle DOWNTREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
+            debug(f"✅ {asset}: 3-Candle DOWNTREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
         else:
-            info(f"⏸️ {asset}: NO CLEAR TREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
+            debug(f"⏸️ {asset}: NO CLEAR TREND - Trends: {trends} (UP: {up_count}, DOWN: {down_count})")
             return None, None
             
         return direction, candles[-1]
@@ -268,13 +290,8 @@ import pytz
 # Timezone
 TIMEZONE = pytz.timezone("Asia/Dhaka")
 
-# Global counters
-TOTAL_WINS = 0
-TOTAL_LOSSES = 0
-
 def format_result(asset: str, signal_time: datetime.datetime, direction: str, outcome: str, taguserid: str, mtg_step: int = 0) -> str:
-    global TOTAL_WINS, TOTAL_LOSSES
-
+    """The WIN/LOSS line shows STATS, so record the trade first (record_result does)."""
     trade_place_time = (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M")
     direction_icon = '🟢 CALL' if direction == 'CALL' else '🔴 PUT'
 
@@ -288,15 +305,6 @@ def format_result(asset: str, signal_time: datetime.datetime, direction: str, ou
     else:
         result_line = "📌𝚁𝙴𝚂𝚄𝙻𝚃>🚫 LOSS 🚫"
 
-    # === Count update ===
-    if outcome == "WIN":
-        TOTAL_WINS += 1
-    elif outcome == "LOSS":
-        TOTAL_LOSSES += 1
-
-    total_trades = TOTAL_WINS + TOTAL_LOSSES
-    win_rate = round((TOTAL_WINS / total_trades) * 100, 1) if total_trades > 0 else 0.0
-
     return f"""
 ≡≡ ¤𝗥𝗘𝗦𝗨𝗟𝗧𝗔𝗗𝗢¤ ≡≡
 
@@ -305,7 +313,7 @@ def format_result(asset: str, signal_time: datetime.datetime, direction: str, ou
 📊 DIRECTION<⊱ {direction_icon}
 <><><><><><><><><><><><><><>
 
-🏆 WIN> {TOTAL_WINS} _/- LOSS> {TOTAL_LOSSES}
+🏆 WIN> {STATS.wins} _/- LOSS> {STATS.losses}
 
 {result_line}
 
@@ -325,19 +333,17 @@ def to_mono(text: str) -> str:
     return text.translate(MONO_MAP)
 
 def format_summary():
-    wins = sum(1 for r in TRADE_HISTORY if r["outcome"] == "WIN")
-    losses = sum(1 for r in TRADE_HISTORY if r["outcome"] == "LOSS")
-    total = len(TRADE_HISTORY)
-    wr = round((wins / total) * 100, 1) if total > 0 else 0.0
+    wins, losses, total, wr = STATS.wins, STATS.losses, STATS.total, STATS.win_rate()
 
-    # ✅ সব WIN signals detail সহ (monospace এ)
-    win_lines = [
-        to_mono(f"{r['time']} ╏ {r['asset']} ╏ {r['dir']}  ✅")
-        for r in TRADE_HISTORY if r["outcome"] == "WIN"
-    ]
-
-    # ❌ শুধু loss times list (monospace এ)
-    loss_times = [to_mono(r["time"]) for r in TRADE_HISTORY if r["outcome"] == "LOSS"]
+    # ✅ সব WIN signals detail সহ (monospace এ), ❌ শুধু loss times list — one pass over the recent window
+    win_lines, loss_times = [], []
+    for r in STATS.recent:
+        if r["outcome"] == "WIN":
+            win_lines.append(to_mono(f"{r['time']} ╏ {r['asset']} ╏ {r['dir']}  ✅"))
+        else:
+            loss_times.append(to_mono(r["time"]))
+    if STATS.rolled:
+        win_lines.insert(0, to_mono(f"... {STATS.rolled} earlier trades"))
 
     summary = f"""
 {to_mono("==========  PARTIAL  ==========")}
@@ -366,12 +372,12 @@ def format_summary():
 """
     return summary
 
-def generate_signal_for_asset(asset: str):
+async def generate_signal_for_asset(asset: str):
     """
     Generate signal using 3-candle trend counting strategy.
     Returns (direction, base_candle_used_for_time_ref)
     """
-    direction, base_candle = generate_3candle_signal(asset)
+    direction, base_candle = await generate_3candle_signal(asset)
     
     if not direction:
         return None, None
@@ -379,11 +385,60 @@ def generate_signal_for_asset(asset: str):
     return direction, base_candle
 
 # =============== Trade Process ===============
+def trade_id(asset: str, signal_time: datetime.datetime) -> str:
+    return f"{asset}@{int(signal_time.timestamp())}"
+
+def replay_journal(scheduler=None):
+    """
+    After a crash: rebuild today's STATS from the journal and (with a
+    scheduler) finish the trades that were still open, from the MTG step
+    they had reached, with stored/fetched candles.
+    """
+    started = time.perf_counter()
+    today = datetime.datetime.now(TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+    results, open_trades = JOURNAL.replay(since=today.timestamp())
+    if SHARD is None:
+        for trade in results:
+            STATS.add(trade)
+    resumed = 0
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for sig in open_trades if scheduler is not None else ():
+        signal_time = datetime.datetime.fromisoformat(sig["signal_time"])
+        if (now - signal_time).total_seconds() > RESUME_MAX_AGE * 60:
+            warn(f"⚠️ {sig['asset']}: open trade from {signal_time.astimezone(TIMEZONE):%H:%M} is too old to resume")
+            JOURNAL.write("dropped", sig["id"])
+            continue
+        job = lambda s=sig, t=signal_time: resolve_trade(s["asset"], t, s["direction"], seen=s.get("steps"))
+        if scheduler.submit(sig["asset"], job):
+            resumed += 1
+    if results or open_trades:
+        info(f"📒 Journal: {len(results)} results replayed, {resumed} open trades resumed "
+             f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+def record_result(asset: str, signal_time: datetime.datetime, direction: str, outcome: str,
+                  mtg_step: int = 0, strategy: str = "3CANDLE", log=info):
+    """Announce, journal and store one resolved trade (a shard worker hands it to the supervisor)."""
+    trade = {
+        "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
+        "asset": asset, "dir": direction, "outcome": outcome, "strategy": strategy, "mtg_step": mtg_step,
+    }
+    if JOURNAL is not None:
+        JOURNAL.write("result", trade_id(asset, signal_time), trade=trade)
+    if SHARD is not None:
+        TELEGRAM.result(asset=asset, signal_time=signal_time.isoformat(), direction=direction,
+                        outcome=outcome, mtg_step=mtg_step, strategy=strategy)
+        log(f"🏁 {asset}: {direction} {outcome} (MTG {mtg_step})")
+        return
+    STATS.add(trade)
+    res_msg = format_result(asset, signal_time, direction, outcome, TAG_USER_ID, mtg_step=mtg_step)
+    log("\n" + res_msg + "\n")
+    TELEGRAM.send(f"<b>{html.escape(res_msg)}</b>", PRIORITY_RESULT)   # result text has literal < >
+
 async def process_asset(asset: str):
     # 1) Generate signal using 3-candle trend strategy
-    direction, base_candle = generate_signal_for_asset(asset)
+    direction, base_candle = await generate_signal_for_asset(asset)
     if not direction:
-        warn(f"⚠️ {asset}: No clear signal. Skipping.")
+        debug(f"⚠️ {asset}: No clear signal. Skipping.")
         return "NO_SIGNAL"
 
     # Signal time = now (when we alert)
@@ -392,167 +447,249 @@ async def process_asset(asset: str):
     # Announce Signal
     sig_msg = format_signal(asset, signal_time, direction, TAG_USER_ID)
     ok("\n" + sig_msg + "\n")
-    await send_telegram_message_bold(sig_msg)
+    await send_telegram_message_bold(sig_msg, PRIORITY_SIGNAL)
+    if JOURNAL is not None:
+        JOURNAL.write("signal", trade_id(asset, signal_time), asset=asset, signal_time=signal_time.isoformat(),
+                      direction=direction, strategy="3CANDLE")
+
+    trade_place_time = (signal_time + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
+    ENTRY_SLACK.observe((trade_place_time - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    # the result wait runs after the scheduler has released this pair's slot
+    return resolve_trade(asset, signal_time, direction)
+
+async def resolve_trade(asset: str, signal_time: datetime.datetime, direction: str, seen=None):
+    """
+    Wait for the trade candle (and MTG candles) and record the outcome; also
+    resumes journaled trades (seen: the step directions journaled so far).
+    """
+    tid = trade_id(asset, signal_time)
 
     # 2) Determine trade candle time (signal +1 minute) and wait till its available
     trade_place_time = (signal_time + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
-    info(f"⏳ Waiting trade candle at {trade_place_time.astimezone(TIMEZONE)} for {asset}...")
-    trade_candle = get_candle_at_time(asset, trade_place_time, retries=120, sleep_s=2.0)
+    debug(f"⏳ Waiting trade candle at {trade_place_time.astimezone(TIMEZONE)} for {asset}...")
+    trade_dir = await step_direction(asset, trade_place_time, tid, 0, seen)
 
-    if not trade_candle:
+    if not trade_dir:
         err(f"❌ {asset}: Could not get trade candle in time.")
-        res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=0)
-        info("\n" + res_msg + "\n")
-        await send_telegram_message_bold(res_msg)
-        TRADE_HISTORY.append({
-            "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-            "asset": asset, "dir": direction, "outcome": "LOSS"
-        })
+        record_result(asset, signal_time, direction, "LOSS", mtg_step=0)
         return "LOSS"
 
-    trade_dir = candle_direction(trade_candle)
-    info(f"Trade candle direction: {trade_dir}, Signal: {direction}")
+    debug(f"Trade candle direction: {trade_dir}, Signal: {direction}")
 
     if (direction == "CALL" and trade_dir == "CALL") or (direction == "PUT" and trade_dir == "PUT"):
         # WIN non-MTG
-        res_msg = format_result(asset, signal_time, direction, "WIN", TAG_USER_ID, mtg_step=0)
-        info("\n" + res_msg + "\n")
-        await send_telegram_message_bold(res_msg)
-        TRADE_HISTORY.append({
-            "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-            "asset": asset, "dir": direction, "outcome": "WIN"
-        })
+        record_result(asset, signal_time, direction, "WIN", mtg_step=0)
         return "WIN"
     elif MTG_STEP == 0:
         # LOSS at MTG Step 0
-        res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=0)
-        info("\n" + res_msg + "\n")
-        await send_telegram_message_bold(res_msg)
-        TRADE_HISTORY.append({
-            "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-            "asset": asset, "dir": direction, "outcome": "LOSS"
-        })
+        record_result(asset, signal_time, direction, "LOSS", mtg_step=0)
         return "LOSS"
     else:
         # 3) MTG1: next candle
         mtg_time = trade_place_time + datetime.timedelta(minutes=1)
-        info(f"🧪 MTG1: wait candle at {mtg_time.astimezone(TIMEZONE)} for {asset} ...")
-        mtg1_candle = get_candle_at_time(asset, mtg_time, retries=120, sleep_s=2.0)
-        if not mtg1_candle:
+        debug(f"🧪 MTG1: wait candle at {mtg_time.astimezone(TIMEZONE)} for {asset} ...")
+        mtg1_dir = await step_direction(asset, mtg_time, tid, 1, seen)
+        if not mtg1_dir:
             err(f"❌ {asset}: MTG1 candle not found.")
-            res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=1)
-            warn("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "LOSS"
-            })
+            record_result(asset, signal_time, direction, "LOSS", mtg_step=1, log=warn)
             return "LOSS"
 
-        mtg1_dir = candle_direction(mtg1_candle)
-        info(f"MTG1 candle direction: {mtg1_dir}, Signal: {direction}")
+        debug(f"MTG1 candle direction: {mtg1_dir}, Signal: {direction}")
         if (direction == "CALL" and mtg1_dir == "CALL") or (direction == "PUT" and mtg1_dir == "PUT"):
-            res_msg = format_result(asset, signal_time, direction, "WIN", TAG_USER_ID, mtg_step=1)
-            warn("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "WIN"
-            })
+            record_result(asset, signal_time, direction, "WIN", mtg_step=1, log=warn)
             return "WIN"
         elif MTG_STEP == 1:
             # LOSS at MTG Step 1
-            res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=1)
-            info("\n" + res_msg + "\n")
-            await send_telegram_message_bold(res_msg)
-            TRADE_HISTORY.append({
-                "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                "asset": asset, "dir": direction, "outcome": "LOSS"
-            })
+            record_result(asset, signal_time, direction, "LOSS", mtg_step=1)
             return "LOSS"
         else:
             # 4) MTG2: next candle
             mtg2_time = mtg_time + datetime.timedelta(minutes=1)
-            info(f"🧪 MTG2: wait candle at {mtg2_time.astimezone(TIMEZONE)} for {asset} ...")
-            mtg2_candle = get_candle_at_time(asset, mtg2_time, retries=120, sleep_s=2.0)
-            if not mtg2_candle:
+            debug(f"🧪 MTG2: wait candle at {mtg2_time.astimezone(TIMEZONE)} for {asset} ...")
+            mtg2_dir = await step_direction(asset, mtg2_time, tid, 2, seen)
+            if not mtg2_dir:
                 err(f"❌ {asset}: MTG2 candle not found.")
-                res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=2)
-                warn("\n" + res_msg + "\n")
-                await send_telegram_message_bold(res_msg)
-                TRADE_HISTORY.append({
-                    "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                    "asset": asset, "dir": direction, "outcome": "LOSS"
-                })
+                record_result(asset, signal_time, direction, "LOSS", mtg_step=2, log=warn)
                 return "LOSS"
 
-            mtg2_dir = candle_direction(mtg2_candle)
-            info(f"MTG2 candle direction: {mtg2_dir}, Signal: {direction}")
+            debug(f"MTG2 candle direction: {mtg2_dir}, Signal: {direction}")
             if (direction == "CALL" and mtg2_dir == "CALL") or (direction == "PUT" and mtg2_dir == "PUT"):
-                res_msg = format_result(asset, signal_time, direction, "WIN", TAG_USER_ID, mtg_step=2)
-                warn("\n" + res_msg + "\n")
-                await send_telegram_message_bold(res_msg)
-                TRADE_HISTORY.append({
-                    "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                    "asset": asset, "dir": direction, "outcome": "WIN"
-                })
+                record_result(asset, signal_time, direction, "WIN", mtg_step=2, log=warn)
                 return "WIN"
             else:
                 # LOSS at MTG Step 2
-                res_msg = format_result(asset, signal_time, direction, "LOSS", TAG_USER_ID, mtg_step=2)
-                info("\n" + res_msg + "\n")
-                await send_telegram_message_bold(res_msg)
-                TRADE_HISTORY.append({
-                    "time": (signal_time.astimezone(TIMEZONE) + datetime.timedelta(minutes=1)).strftime("%H:%M"),
-                    "asset": asset, "dir": direction, "outcome": "LOSS"
-                })
+                record_result(asset, signal_time, direction, "LOSS", mtg_step=2)
                 return "LOSS"
 
+async def end_journal():
+    """Clean end of the session: move the journal aside so the next start begins empty."""
+    if JOURNAL is not None:
+        await JOURNAL.close()
+        done = JOURNAL.rotate()
+        if done:
+            info(f"📒 Journal saved as {done}")
+
 # =============== Scheduler + OFF Command ===============
-async def main_loop():
-    current_asset_index = 0
-    
-    while True:
-        # OFF command (non-blocking)
+# stdin commands: off + profiling (prof / mem / stall on|off|dump, see profiling.py)
+CONSOLE = ProfilerConsole(PROFILE_DIR, log=info)
+
+async def start_metrics():
+    """Start the /metrics endpoint and the JSON snapshot task (either may be off)."""
+    runner = snapshots = None
+    if METRICS_PORT:
         try:
-            if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                cmd = sys.stdin.readline().strip().lower()
-                if cmd == "off":
-                    summary = format_summary()
-                    ok("\n" + summary + "\n")
-                    await send_telegram_message_bold(summary)
-        except Exception:
-            # কিছু environment এ select কাজ নাও করতে পারে
-            pass
+            runner = await metrics.serve(port=METRICS_PORT)
+            ok(f"📈 Metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            warn(f"⚠️ Metrics endpoint disabled: {e}")
+    if METRICS_JSON:
+        snapshots = asyncio.create_task(metrics.snapshot_loop(METRICS_JSON, METRICS_EVERY))
+    return runner, snapshots
+
+async def stop_metrics(runner, snapshots):
+    if snapshots is not None:
+        snapshots.cancel()
+        metrics.REGISTRY.write_json(METRICS_JSON)
+    if runner is not None:
+        await runner.cleanup()
 
-        now = datetime.datetime.now(TIMEZONE)
-        banner(f"⏰ Current time: {now.strftime('%Y-%m-%d %H:%M:%S')} | Scanning...")
+async def main_loop():
+    scheduler = AssetScheduler(
+        process_asset,
+        max_concurrent=MAX_CONCURRENT_ASSETS,
+        on_error=lambda a, e: err(f"❌ {a}: task error: {e}"),
+        on_start=lambda a, queued: debug(f"📊 Processing {a}... (queued {queued * 1000:.0f} ms)"),
+    )
+
+    if ARCHIVE is not None:
+        bars = FEED.preload(ASSETS)
+        info(f"💾 Loaded {bars} archived candles for {len(ASSETS)} pairs")
+    if JOURNAL is not None:
+        replay_journal(scheduler)
+    metrics_runner, metrics_snapshots = await start_metrics()
+    if SHARD is not None:
+        TELEGRAM.start()
+        info(f"🧩 Shard {SHARD[0]}/{SHARD[1]}: {len(ASSETS)} pairs")
+    console = asyncio.create_task(CONSOLE.run(), name="console")
+    info("⌨️ Console: type 'help' for profiling commands")
+    try:
+        while True:
+            # OFF command (non-blocking; profiling commands are handled by CONSOLE)
+            cmd = CONSOLE.pop()
+            if cmd == "stats":
+                info(STATS.report())
+            elif cmd == "off":
+                summary = format_summary()
+                ok("\n" + summary + "\n")
+                await send_telegram_message_bold(summary, PRIORITY_SUMMARY)
+
+            now = datetime.datetime.now(TIMEZONE)
+            banner(f"⏰ Current time: {now.strftime('%Y-%m-%d %H:%M:%S')} | Scanning...")
 
         
-        # 🔀 Shuffle assets each round
-        shuffled_assets = ASSETS[:]
-        random.shuffle(shuffled_assets)
-
-        # Process each asset in shuffled order
-        for asset in shuffled_assets:
-            info(f"📊 Processing {asset}...")
-            await process_asset(asset)
-
-        # Sleep before next scan
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-        sleep_secs = 60 - now_utc.second
-        if sleep_secs < 5:
-            sleep_secs += 60
-        info(f"🕒 Sleeping ~{sleep_secs}s before next scan...")
-        await asyncio.sleep(sleep_secs)
+            # 🔀 Shuffle assets each round
+            shuffled_assets = ASSETS[:]
+            random.shuffle(shuffled_assets)
+
+            # Pairs still resolving a trade are skipped
+            idle = []
+            for asset in shuffled_assets:
+                if scheduler.busy(asset):
+                    debug(f"⏳ {asset}: trade still running, skip this scan.")
+                else:
+                    idle.append(asset)
+
+            # Fetch idle pairs together; each pair's task starts as its candles land
+            slowest, slowest_s = None, 0.0
+            async for asset, _, took in FEED.candles_many(idle, count=3, concurrency=FETCH_CONCURRENCY):
+                if took > slowest_s:
+                    slowest, slowest_s = asset, took
+                scheduler.submit(asset)
+            if slowest:
+                info(f"📡 Fetched {len(idle)} pairs, slowest {slowest} {slowest_s * 1000:.0f} ms")
+
+            fs = OTC.flight.stats()
+            info(f"🔁 OTC requests: {fs['upstream']} sent, {fs['shared']} shared ({fs['saved_pct']}% saved)")
+
+            ts = OTC.timing.snapshot()
+            info(f"🕰️ Server clock {ts['clock_offset_s']:+.2f}s, candle publish lag ~{ts['lag_s']:.2f}s")
+
+            # Wake just after the next bar should be published (server clock)
+            sleep_secs = OTC.timing.until_next_minute() + OTC.timing.lag() + OTC.timing.margin
+            if sleep_secs < 5:
+                sleep_secs += 60
+            debug(f"🕒 Sleeping ~{sleep_secs:.1f}s before next scan...")
+            await asyncio.sleep(sleep_secs)
+    finally:
+        console.cancel()
+        CONSOLE.stalls.stop()
+        await stop_metrics(metrics_runner, metrics_snapshots)
+        await OTC.close()
+        await TELEGRAM.close()
+        if ARCHIVE is not None:
+            ARCHIVE.close()
+        STATS.close()
+        if JOURNAL is not None:
+            await JOURNAL.close()
+
+
+# =============== Sharded Mode (Supervisor) ===============
+def on_shard_result(msg: dict):
+    record_result(msg["asset"], datetime.datetime.fromisoformat(msg["signal_time"]),
+                  msg["direction"], msg["outcome"], msg.get("mtg_step", 0), msg.get("strategy", ""))
+
+async def supervise():
+    """
+    --shards N: N worker processes each scan and resolve a slice of ASSETS.
+    This process sends every Telegram message, formats the results (one
+    WIN/LOSS count) and keeps STATS, so the summary covers all pairs.
+    """
+    sup = sharding.ShardSupervisor(
+        os.path.abspath(__file__), SHARDS, dict(to_env(OPTIONS, CONFIG), BOT_SHARDS="0"),
+        on_send=TELEGRAM.send, on_result=on_shard_result, log=info, echo=LOG.raw,
+    )
+    metrics_runner, metrics_snapshots = await start_metrics()
+    console = asyncio.create_task(CONSOLE.run(), name="console")
+    if JOURNAL is not None:
+        replay_journal()
+    await sup.start()
+    info(f"🧩 {len(ASSETS)} pairs over {SHARDS} workers. Console: off, shards, restart <n>, shard <n> <command>")
+    try:
+        while True:
+            cmd = CONSOLE.pop()
+            if cmd == "stats":
+                info(STATS.report())
+            elif cmd == "off":
+                summary = format_summary()
+                ok("\n" + summary + "\n")
+                await send_telegram_message_bold(summary, PRIORITY_SUMMARY)
+            elif cmd and not sup.handle(cmd):
+                warn(f"Unknown command: {cmd}")
+                info(sharding.HELP)
+            await asyncio.sleep(0.25)
+    finally:
+        console.cancel()
+        CONSOLE.stalls.stop()
+        await sup.stop()
+        await stop_metrics(metrics_runner, metrics_snapshots)
+        await OTC.close()
+        await TELEGRAM.close()
+        if ARCHIVE is not None:
+            ARCHIVE.close()
+        STATS.close()
+        if JOURNAL is not None:
+            await JOURNAL.close()
 
 
 # =============== Entry ===============
 if __name__ == "__main__":
     try:
-        asyncio.run(main_loop())
+        asyncio.run(supervise() if SHARDS > 1 and SHARD is None else main_loop())
     except KeyboardInterrupt:
         warn("\n👋 Exiting gracefully...")
+        if SHARD is not None:
+            asyncio.run(end_journal())
+            raise SystemExit(0)      # the supervisor sends the combined summary
 
         # Ctrl+C দিলে summary send + exit
         try:
@@ -560,6 +697,8 @@ if __name__ == "__main__":
             asyncio.set_event_loop(loop)
             summ = format_summary()
             ok("\n" + summ + "\n")
-            loop.run_until_complete(send_telegram_message_bold(summ))
+            loop.run_until_complete(send_telegram_message_bold(summ, PRIORITY_SUMMARY))
+            loop.run_until_complete(TELEGRAM.close())
+            loop.run_until_complete(end_journal())
         except Exception:
             pass